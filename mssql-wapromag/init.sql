@@ -298,6 +298,8 @@ CREATE INDEX IX_DokumentyMagazynowe_Numer ON DokumentyMagazynowe(Numer);
 CREATE INDEX IX_DokumentyMagazynowe_DataWystawienia ON DokumentyMagazynowe(DataWystawienia);
 CREATE INDEX IX_RuchMagazynowy_ProduktID_DataOperacji ON RuchMagazynowy(ProduktID, DataOperacji);
 CREATE INDEX IX_StanyMagazynowe_ProduktID_Magazyn ON StanyMagazynowe(ProduktID, Magazyn);
+-- Jedna drukarka na adres - klucz MERGE w discover.py --sync-db
+CREATE UNIQUE INDEX UX_KonfiguracjaDrukarek_AdresIP_Port ON KonfiguracjaDrukarek(AdresIP, Port);
 
 -- Procedura do aktualizacji stanu magazynowego
 IF OBJECT_ID('dbo.AktualizujStanMagazynowy', 'P') IS NOT NULL
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Discovery benchmark for WAPRO Network Mock
+Simulates a network of mock devices on loopback addresses (127.x.y.z, no
+network namespaces or root needed on Linux) and runs discover_all against it.
+
+Simulated hosts:
+    zebra  - socket server on 9100 driven by ZebraPrinterMock (zebra-printer-1)
+    mssql  - TDS PRELOGIN responder on 1433
+    http   - HTTP server on 8080
+    drop   - port 9100 with a full accept queue, SYNs are dropped (connect timeout)
+    delay  - Zebra printer answering only after --delay-ms
+
+Usage:
+    python3 bench_discover.py                     # quick + full, default network
+    python3 bench_discover.py --zebra 40 --mode quick --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import argparse
+import threading
+import contextlib
+import socketserver
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+ZEBRA_MOCK_DIR = os.path.join(PROJECT_DIR, 'zebra-printer-1')
+
+sys.path.insert(0, ZEBRA_MOCK_DIR)
+from zebra_mock import ZebraPrinterMock  # noqa: E402  (needs zebra-printer-1/requirements.txt)
+
+import discover  # noqa: E402
+
+DEFAULT_NETWORK = '127.77.0.0/24'
+ZEBRA_MODELS = ['ZT230', 'ZT410', 'ZD420', 'GK420d']
+MSSQL_VERSION = (16, 0, 1000)      # SQL Server 2022
+
+
+# =============================================================================
+# SIMULATED DEVICES
+# =============================================================================
+
+class ZebraHandler(socketserver.BaseRequestHandler):
+    """ZPL socket - command handling is ZebraPrinterMock.handle_client"""
+
+    def handle(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.server.printer.handle_client(self.request, self.client_address)
+
+
+class TdsHandler(socketserver.BaseRequestHandler):
+    """Answers TDS PRELOGIN with VERSION and ENCRYPTION options"""
+
+    def handle(self):
+        try:
+            header = self.request.recv(8)
+        except OSError:
+            return
+        if len(header) < 8 or header[0] != 0x12:
+            return
+        major, minor, build = MSSQL_VERSION
+        options = [
+            (0x00, bytes([major, minor]) + build.to_bytes(2, 'big') + b'\x00\x00'),
+            (0x01, b'\x02'),
+        ]
+        offset = len(options) * 5 + 1
+        table = b''
+        data = b''
+        for token, value in options:
+            table += bytes([token]) + (offset + len(data)).to_bytes(2, 'big') + len(value).to_bytes(2, 'big')
+            data += value
+        payload = table + b'\xff' + data
+        response = bytes([0x04, 0x01]) + (len(payload) + 8).to_bytes(2, 'big') + b'\x00\x00\x01\x00'
+        self.request.sendall(response + payload)
+
+
+class HttpHandler(BaseHTTPRequestHandler):
+    server_version = 'WaproBench/1.0'
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SimulatedNetwork:
+    """Mock devices bound to loopback addresses of one network"""
+
+    def __init__(self, network=DEFAULT_NETWORK, zebra=20, mssql=3, http=10, drop=5, delay=5,
+                 delay_ms=300, seed=1):
+        self.network = network
+        self.counts = {'zebra': zebra, 'mssql': mssql, 'http': http, 'drop': drop, 'delay': delay}
+        self.delay = delay_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.hosts = []             # [{'kind', 'host', 'port', 'model'}]
+        self.servers = []
+        self.blocked = []           # sockets filling accept queues of 'drop' hosts
+
+    def start(self):
+        addresses = [str(ip) for ip in discover.parse_networks([self.network])[0].hosts()]
+        needed = sum(self.counts.values())
+        if needed > len(addresses):
+            raise ValueError(f"{needed} devices do not fit in {self.network}")
+        chosen = self.rng.sample(addresses, needed)
+
+        for kind, count in self.counts.items():
+            for _ in range(count):
+                host = chosen.pop()
+                self.hosts.append(self._start_device(kind, host))
+        return self
+
+    def _start_device(self, kind, host):
+        if kind in ('zebra', 'delay'):
+            model = self.rng.choice(ZEBRA_MODELS)
+            printer = ZebraPrinterMock(f"ZEBRA-{host}", model, host=host, port=9100)
+            server = ThreadingTCPServer((host, 9100), ZebraHandler)
+            server.printer = printer
+            server.delay = self.delay if kind == 'delay' else 0
+            self._serve(server)
+            return {'kind': kind, 'host': host, 'port': 9100, 'model': model}
+
+        if kind == 'mssql':
+            self._serve(ThreadingTCPServer((host, discover.MSSQL_PORT), TdsHandler))
+            return {'kind': kind, 'host': host, 'port': discover.MSSQL_PORT,
+                    'version': '.'.join(map(str, MSSQL_VERSION))}
+
+        if kind == 'http':
+            self._serve(ThreadingHTTPServer((host, 8080), HttpHandler))
+            return {'kind': kind, 'host': host, 'port': 8080, 'server': HttpHandler.server_version}
+
+        # drop: listen(0) and never accept - once the queue is full, SYNs are dropped
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, 9100))
+        sock.listen(0)
+        self.blocked.append(sock)
+        for _ in range(2):
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            filler.connect_ex((host, 9100))
+            self.blocked.append(filler)
+        return {'kind': kind, 'host': host, 'port': 9100}
+
+    def _serve(self, server):
+        # short poll interval - stop() shuts down dozens of servers one by one
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.servers.append(server)
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        for sock in self.blocked:
+            sock.close()
+
+    def expected(self, quick=False):
+        """(type, host, port) that discovery should find in a given mode"""
+        networks = discover.parse_networks([self.network])
+        ports = {'zebra': discover.ZEBRA_PORTS, 'mssql': [discover.MSSQL_PORT],
+                 'http': [] if quick else discover.HTTP_PORTS}
+        expected = set()
+        for h in self.hosts:
+            kind = 'zebra' if h['kind'] == 'delay' else h['kind']
+            if kind == 'drop' or h['port'] not in ports[kind]:
+                continue
+            if discover.in_sweep(h['host'], networks, quick):
+                expected.add((kind, h['host'], h['port']))
+        return expected
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def run_mode(sim, quick, rate):
+    """Run discover_all once, return measurements"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.monotonic()
+        results = discover.discover_all(quick=quick, networks=[sim.network], rate=rate,
+                                        results_file=None)
+        wall = time.monotonic() - started
+
+    found = {(d['type'], d['host'], d['port'])
+             for group in results['devices'].values() for d in group}
+    expected = sim.expected(quick)
+    hits = found & expected
+
+    # Fingerprint accuracy - model/version/server matches the simulated device
+    truth = {h['host']: h for h in sim.hosts}
+    identified = 0
+    for group in results['devices'].values():
+        for d in group:
+            h = truth.get(d['host'], {})
+            if (d['type'] == 'zebra' and h.get('model') and h['model'] in (d.get('model') or '')) \
+                    or (d['type'] == 'mssql' and d.get('version') == h.get('version')) \
+                    or (d['type'] == 'http' and d.get('server', '').startswith(h.get('server') or '\0')):
+                identified += 1
+
+    stats = results['scan_stats']
+    return {
+        'mode': 'quick' if quick else 'full',
+        'wall_time': round(wall, 3),
+        'probes': stats['probes'],
+        'probes_per_sec': round(stats['probes'] / wall, 1) if wall else 0.0,
+        'expected': len(expected),
+        'found': len(found),
+        'recall': round(len(hits) / len(expected), 3) if expected else 1.0,
+        'precision': round(len(hits) / len(found), 3) if found else 1.0,
+        'fingerprinted': round(identified / len(hits), 3) if hits else 1.0,
+        'missed': sorted(f"{t}:{h}:{p}" for t, h, p in expected - found),
+    }
+
+
+def print_report(sim, reports):
+    print("")
+    print("=" * 60)
+    print("     WAPRO Network Mock - Discovery Benchmark")
+    print("=" * 60)
+    print(f"  Network:  {sim.network}")
+    print("  Devices:  " + ', '.join(f"{k}={v}" for k, v in sim.counts.items()))
+    print(f"  Delay:    {int(sim.delay * 1000)} ms")
+    print("")
+    print(f"  {'mode':<6} {'wall[s]':>8} {'probes':>7} {'probes/s':>9} {'found':>9} "
+          f"{'recall':>7} {'precision':>9} {'fingerpr.':>9}")
+    for r in reports:
+        print(f"  {r['mode']:<6} {r['wall_time']:>8.2f} {r['probes']:>7} {r['probes_per_sec']:>9.1f} "
+              f"{str(r['found']) + '/' + str(r['expected']):>9} {r['recall']:>7.3f} "
+              f"{r['precision']:>9.3f} {r['fingerprinted']:>9.3f}")
+    for r in reports:
+        if r['missed']:
+            print(f"  [!] {r['mode']} missed: {', '.join(r['missed'])}")
+    print("")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark discover.py against simulated devices')
+    parser.add_argument('--network', default=DEFAULT_NETWORK, help=f'loopback network (default: {DEFAULT_NETWORK})')
+    parser.add_argument('--mode', choices=['quick', 'full', 'both'], default='both')
+    parser.add_argument('--zebra', type=int, default=20, help='responsive Zebra printers')
+    parser.add_argument('--mssql', type=int, default=3, help='MSSQL servers')
+    parser.add_argument('--http', type=int, default=10, help='HTTP services')
+    parser.add_argument('--drop', type=int, default=5, help='hosts dropping SYNs (connect timeout)')
+    parser.add_argument('--delay', type=int, default=5, help='Zebra printers answering late')
+    parser.add_argument('--delay-ms', type=int, default=300, help='reply delay of slow printers')
+    parser.add_argument('--rate', type=float, default=discover.MAX_RATE, help='discovery --rate')
+    parser.add_argument('--seed', type=int, default=1, help='device placement seed')
+    parser.add_argument('--json', action='store_true', help='print JSON report')
+    args = parser.parse_args()
+
+    # ZebraPrinterMock logs every connection at INFO
+    logging.getLogger('zebra_mock').setLevel(logging.WARNING)
+
+    sim = SimulatedNetwork(args.network, zebra=args.zebra, mssql=args.mssql, http=args.http,
+                           drop=args.drop, delay=args.delay, delay_ms=args.delay_ms, seed=args.seed)
+    sim.start()
+    try:
+        modes = {'quick': [True], 'full': [False], 'both': [True, False]}[args.mode]
+        reports = [run_mode(sim, quick, args.rate) for quick in modes]
+    finally:
+        sim.stop()
+
+    if args.json:
+        print(json.dumps({'network': sim.network, 'devices': sim.counts, 'reports': reports}, indent=2))
+    else:
+        print_report(sim, reports)
+
+
+if __name__ == '__main__':
+    main()
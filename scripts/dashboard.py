@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Live dashboard for WAPRO Network Mock (wapro-cli watch)
+top-style view: printers (jobs/sec from /api/status), services, containers
+and the tail of the webenv make log.
+
+Polling cost per refresh is bounded: one concurrent HealthChecker run over a
+shared keep-alive HTTP session, container state only every CONTAINER_INTERVAL
+seconds (Docker API when DOCKER_BACKEND=api, else docker ps), and only the
+appended part of the make log is read.
+Redraw is line-level: unchanged lines are skipped, a changed line is rewritten
+whole (printer rows change on most ticks - their latency does).
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+from collections import deque
+from datetime import datetime
+
+from health import HealthChecker, HttpSession, checks_from_env
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+MAKE_LOG_FILE = os.path.join(PROJECT_DIR, 'logs', 'webenv_make.log')
+
+WATCH_INTERVAL = 2
+CONTAINER_INTERVAL = 10         # docker ps is the expensive poll
+MAKE_LOG_LINES = 8
+
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+RED = '\033[0;31m'
+CYAN = '\033[0;36m'
+BOLD = '\033[1m'
+NC = '\033[0m'
+
+
+class LogTail:
+    """Last lines of a growing file - reads only what was appended since the last poll"""
+
+    def __init__(self, path, lines=MAKE_LOG_LINES):
+        self.path = path
+        self.lines = deque(maxlen=lines)
+        self.offset = 0
+        self.partial = b''
+
+    def poll(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return list(self.lines)
+        if size < self.offset:          # truncated / rotated
+            self.offset = 0
+            self.partial = b''
+            self.lines.clear()
+        if size > self.offset:
+            # First read: only the end of a big log is interesting
+            start = max(self.offset, size - 64 * 1024)
+            skipped = start > self.offset
+            with open(self.path, 'rb') as f:
+                # One byte earlier when skipping ahead - tells a cut line from a whole one
+                f.seek(start - 1 if skipped else start)
+                chunk = f.read()
+                end = f.tell()
+            if skipped:
+                chunk = chunk.partition(b'\n')[2]       # the line the seek landed in
+            else:
+                chunk = self.partial + chunk
+            self.offset = end
+            *complete, self.partial = chunk.split(b'\n')
+            self.lines.extend(line.decode('utf-8', errors='replace').rstrip() for line in complete)
+        return list(self.lines)
+
+
+class ContainerState:
+    """Containers of the compose project, refreshed at most every `interval` seconds
+
+    docker - dockerapi.DockerClient (one kept-alive socket), None = docker ps
+    """
+
+    def __init__(self, project, interval=CONTAINER_INTERVAL, docker=None):
+        self.project = project
+        self.interval = interval
+        self.docker = docker
+        self.checked = 0.0
+        self.rows = []
+        self.error = None
+
+    def poll(self):
+        if time.monotonic() - self.checked < self.interval:
+            return self.rows
+        self.checked = time.monotonic()
+        if self.docker is not None:
+            from dockerapi import DockerError
+            try:
+                containers = self.docker.containers(project=self.project)
+            except DockerError as e:
+                self.error = str(e)
+                self.rows = []
+                return self.rows
+            self.error = None
+            self.rows = [[c['name'], c['state'], c['status']] for c in containers]
+            return self.rows
+        cmd = ['docker', 'ps', '-a', '--filter', f'label=com.docker.compose.project={self.project}',
+               '--format', '{{.Names}}\t{{.State}}\t{{.Status}}']
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.error = str(e)
+            self.rows = []
+            return self.rows
+        self.error = proc.stderr.strip() if proc.returncode else None
+        self.rows = sorted(line.split('\t') for line in proc.stdout.splitlines() if line.count('\t') == 2)
+        return self.rows
+
+
+class JobRate:
+    """jobs/sec from successive jobs_printed counters"""
+
+    def __init__(self):
+        self.last = {}
+
+    def update(self, name, jobs, now):
+        previous = self.last.get(name)
+        self.last[name] = (jobs, now)
+        if previous is None or jobs < previous[0] or now <= previous[1]:
+            return None
+        return (jobs - previous[0]) / (now - previous[1])
+
+
+class Screen:
+    """Rewrites the lines that differ from the previous frame, each one whole"""
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.previous = []
+        self.size = None
+
+    def start(self):
+        # alternate screen, no line wrap, hidden cursor
+        self.out.write('\033[?1049h\033[?7l\033[?25l\033[H\033[2J')
+        self.out.flush()
+
+    def stop(self):
+        self.out.write('\033[?25h\033[?7h\033[?1049l')
+        self.out.flush()
+
+    def draw(self, lines):
+        size = shutil.get_terminal_size()
+        if size != self.size:
+            self.size = size
+            self.previous = []
+            self.out.write('\033[H\033[2J')
+        lines = lines[:size.lines]
+        parts = []
+        for row, line in enumerate(lines):
+            if row >= len(self.previous) or self.previous[row] != line:
+                parts.append(f'\033[{row + 1};1H{line}\033[K')
+        for row in range(len(lines), len(self.previous)):
+            parts.append(f'\033[{row + 1};1H\033[K')
+        if parts:
+            self.out.write(''.join(parts))
+            self.out.flush()
+        self.previous = lines
+        return len(parts)
+
+
+def _status(result):
+    colour = GREEN if result.ok else (YELLOW if result.status.startswith('HTTP') else RED)
+    return f"{colour}{result.status:<8}{NC}"
+
+
+def _latency(result):
+    return f"{result.latency_ms:>7.1f} ms" if result.latency is not None else f"{'-':>10}"
+
+
+class Dashboard:
+    """Polls everything once per refresh and renders a frame"""
+
+    def __init__(self, config, interval=WATCH_INTERVAL, log_file=MAKE_LOG_FILE, docker=None):
+        self.interval = interval
+        self.session = HttpSession()
+        self.checker = HealthChecker(checks_from_env(config, session=self.session))
+        self.containers = ContainerState(config.get('COMPOSE_PROJECT_NAME', 'prinet'), docker=docker)
+        self.log = LogTail(log_file)
+        self.rates = JobRate()
+
+    def frame(self):
+        now = time.monotonic()
+        results = {r.name: r for r in self.checker.run()}
+        lines = [
+            f"{BOLD}WAPRO Network Mock - watch{NC}   {datetime.now().strftime('%H:%M:%S')}"
+            f"   (every {self.interval:g}s, Ctrl+C to quit)",
+            "",
+            f"{CYAN}PRINTERS      HTTP          LATENCY   ZPL           LATENCY     JOBS   JOBS/S  STATE{NC}",
+        ]
+        for name in [n for n in results if n.startswith('Zebra') and not n.endswith('ZPL')]:
+            web = results[name]
+            zpl = results.get(f'{name} ZPL')
+            data = web.data or {}
+            jobs = data.get('jobs_printed')
+            rate = self.rates.update(name, jobs, now) if isinstance(jobs, int) else None
+            zpl_cells = f"{_status(zpl)} {_latency(zpl)}" if zpl else f"{'':<8} {'':>10}"
+            lines.append(f"  {name:<11} {_status(web)} {_latency(web)}   {zpl_cells}"
+                         f"  {jobs if jobs is not None else '-':>6}  "
+                         f"{f'{rate:.2f}' if rate is not None else '-':>7}  {data.get('status', '')}")
+
+        lines += ["", f"{CYAN}SERVICES      STATUS        LATENCY   TARGET{NC}"]
+        for name, r in results.items():
+            if not name.startswith('Zebra'):
+                lines.append(f"  {name:<11} {_status(r)} {_latency(r)}   {r.target}")
+
+        lines += ["", f"{CYAN}CONTAINERS{NC}"]
+        rows = self.containers.poll()
+        if self.containers.error:
+            lines.append(f"  {RED}{self.containers.error.splitlines()[0]}{NC}")
+        elif not rows:
+            lines.append("  (no containers)")
+        for name, state, status in rows:
+            colour = GREEN if state == 'running' else RED
+            lines.append(f"  {name:<26} {colour}{state:<10}{NC} {status}")
+
+        lines += ["", f"{CYAN}MAKE LOG{NC} ({os.path.relpath(self.log.path, PROJECT_DIR)})"]
+        lines += [f"  {line}" for line in self.log.poll()] or ["  (empty)"]
+        return lines
+
+    def run(self):
+        screen = Screen()
+        screen.start()
+        try:
+            while True:
+                started = time.monotonic()
+                screen.draw(self.frame())
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            screen.stop()
+            self.close()
+
+    def close(self):
+        self.checker.close()
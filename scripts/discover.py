@@ -3,16 +3,34 @@
 Network Device Discovery for WAPRO Network Mock
 Discovers: Zebra printers, MSSQL servers, HTTP services
 Outputs: JSON file with discovered devices
+
+Library use (wapro-cli, webenv):
+    from discover import Scanner
+    with Scanner(quick=True, on_device=print) as scanner:
+        result = scanner.run()
 """
 
 import os
 import sys
 import json
+import time
 import socket
+import bisect
+import argparse
+import ipaddress
+import itertools
 import subprocess
+import heapq
+import random
+import sqlite3
 import threading
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from envstore import get_store
 
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,6 +46,15 @@ HTTP_PORTS = [80, 8080, 8081, 8082, 8091, 8092]
 # Timeouts
 SCAN_TIMEOUT = 1
 MAX_WORKERS = 50
+MAX_PENDING = MAX_WORKERS * 4   # futures in flight - hosts are generated lazily
+MAX_RATE = 0                    # global probes/sec limit, 0 = unlimited
+MAX_BURST = 0                   # token bucket size, 0 = rate / 10 (at least 1)
+MAX_PER_HOST = 2                # concurrent probes per host
+
+# Networks
+DEFAULT_PREFIX = 24
+# Quick scan addresses - common device IPs (last octet)
+QUICK_OCTETS = frozenset(list(range(1, 51)) + list(range(100, 151)) + list(range(200, 255)))
 
 
 def get_local_ips():
@@ -72,12 +99,203 @@ def get_local_ips():
     return ips[:1]  # Return only first IP
 
 
-def get_network_range(ip):
-    """Get network range from IP (first 3 octets)"""
-    parts = ip.split('.')
-    if len(parts) >= 3:
-        return '.'.join(parts[:3])
-    return None
+def get_network_range(ip, prefix=DEFAULT_PREFIX):
+    """Get network of an IP address (default /24)"""
+    try:
+        return ipaddress.ip_network(f"{ip}/{prefix}", strict=False)
+    except ValueError:
+        return None
+
+
+def get_local_networks(interfaces=None):
+    """Get IPv4 networks of local interfaces (all non-loopback or only given names)"""
+    networks = []
+    try:
+        # Parse: "2: eth0    inet 192.168.8.10/22 brd 192.168.11.255 scope global eth0"
+        result = subprocess.run(['ip', '-o', '-4', 'addr', 'show'], capture_output=True, text=True)
+        for line in result.stdout.split('\n'):
+            parts = line.split()
+            if len(parts) < 4 or parts[2] != 'inet':
+                continue
+            if interfaces and parts[1] not in interfaces:
+                continue
+            iface = ipaddress.ip_interface(parts[3])
+            if not iface.is_loopback:
+                networks.append(iface.network)
+    except:
+        pass
+
+    if not networks and not interfaces:
+        networks = [get_network_range(ip) for ip in get_local_ips()]
+    return [n for n in networks if n is not None]
+
+
+def parse_networks(specs):
+    """Parse CIDR specs ("192.168.8.0/22", "10.0.5.7"), merging overlapping ranges"""
+    networks = []
+    for spec in specs:
+        try:
+            networks.append(ipaddress.ip_network(spec.strip(), strict=False))
+        except ValueError:
+            print(f"  [!] Invalid network: {spec}")
+    return list(ipaddress.collapse_addresses(n for n in networks if n.version == 4))
+
+
+def iter_hosts(networks, quick=False):
+    """Yield host addresses of all networks lazily (quick: common last octets only)"""
+    for network in networks:
+        narrow = quick and network.prefixlen <= DEFAULT_PREFIX
+        for ip in network.hosts():
+            if narrow and (int(ip) & 0xFF) not in QUICK_OCTETS:
+                continue
+            yield str(ip)
+
+
+def in_sweep(host, networks, quick=False):
+    """Whether iter_hosts(networks, quick) yields host"""
+    ip = ipaddress.ip_address(host)
+    for network in networks:
+        if ip not in network:
+            continue
+        if network.prefixlen < 31 and ip in (network.network_address, network.broadcast_address):
+            return False
+        narrow = quick and network.prefixlen <= DEFAULT_PREFIX
+        return not narrow or (int(ip) & 0xFF) in QUICK_OCTETS
+    return False
+
+
+def count_hosts(network, quick=False):
+    """Number of hosts iter_hosts() yields for a network"""
+    if quick and network.prefixlen <= DEFAULT_PREFIX:
+        return (network.num_addresses // 256 or 1) * len(QUICK_OCTETS)
+    return max(network.num_addresses - 2, 1) if network.prefixlen < 31 else network.num_addresses
+
+
+class TokenBucket:
+    """Probe scheduler shared by all scan workers
+    
+    Global token bucket (rate probes/sec, burst tokens) plus a per-host
+    concurrency limit. Counts probes so the achieved rate can be reported.
+    """
+
+    def __init__(self, rate=MAX_RATE, burst=MAX_BURST, per_host=MAX_PER_HOST):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate / 10)
+        self.per_host = per_host
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.hosts = {}             # host -> [semaphore, users], dropped when idle
+        self.probes = 0
+        self.started = None
+
+    def acquire(self):
+        """Take one token, sleeping until it is available"""
+        with self.lock:
+            now = time.monotonic()
+            if self.started is None:
+                self.started = now
+            self.probes += 1
+            if not self.rate:
+                return
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token even if it is not there yet - waiters queue up fairly
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, host):
+        """Per-host concurrency slot + one token for a probe of host"""
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is None:
+                entry = self.hosts[host] = [threading.Semaphore(self.per_host), 0]
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            self.acquire()
+            yield
+        finally:
+            entry[0].release()
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.hosts[host]
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+        return {
+            'probes': self.probes,
+            'elapsed': round(elapsed, 3),
+            'rate': round(self.probes / elapsed, 1) if elapsed > 0 else 0.0,
+            'rate_limit': self.rate,
+            'per_host': self.per_host,
+        }
+
+
+def run_bounded(executor, fn, tasks, max_pending=MAX_PENDING):
+    """Submit tasks lazily, keeping at most max_pending futures in flight"""
+    pending = set()
+    for task in tasks:
+        pending.add(executor.submit(fn, *task))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(pending):
+        yield future.result()
+
+
+class EventStream:
+    """NDJSON discovery events (one JSON object per line, flushed immediately)
+    
+    Events: scan_started, probe, device, progress, fingerprint, done
+    """
+
+    def __init__(self, target):
+        if target == '-':
+            self.file = sys.stdout
+            self.owned = False
+        elif isinstance(target, str):
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            self.file = open(target, 'w', buffering=1)
+            self.owned = True
+        else:
+            self.file = target
+            self.owned = False
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({'event': event, 'ts': round(time.time(), 3), **fields})
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+
+
+class Progress:
+    """Counts finished probes of a stage and emits progress events on each whole percent"""
+
+    def __init__(self, emit, stage, total):
+        self.emit = emit
+        self.stage = stage
+        self.total = max(total, 1)
+        self.done = 0
+        self.percent = -1
+
+    def step(self):
+        self.done += 1
+        percent = min(100, self.done * 100 // self.total)
+        if percent != self.percent:
+            self.percent = percent
+            self.emit('progress', stage=self.stage, done=self.done,
+                      total=self.total, percent=percent)
 
 
 def scan_port(host, port, timeout=SCAN_TIMEOUT):
@@ -92,186 +310,1168 @@ def scan_port(host, port, timeout=SCAN_TIMEOUT):
         return False
 
 
-def identify_zebra_printer(host, port):
-    """Try to identify Zebra printer model"""
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        sock.connect((host, port))
-        # Send ZPL status command
-        sock.send(b'~HS\r\n')
-        response = sock.recv(1024).decode('utf-8', errors='ignore')
-        sock.close()
+# =============================================================================
+# FINGERPRINTING - runs after the port sweep, only on discovered endpoints
+# =============================================================================
+
+FINGERPRINT_WORKERS = 16
+FINGERPRINT_TIMEOUTS = {
+    'zebra': 2,
+    'mssql': 2,
+    'http': 2,
+}
+
+# Zebra model prefixes (ZT230, ZD420, GK420d, ZE500, ZQ520...)
+ZEBRA_MODEL_PREFIXES = ('ZT', 'ZD', 'ZE', 'ZM', 'ZQ', 'ZR', 'GK', 'GX', 'GT', 'QL', '105', '110')
+ZEBRA_SGD_VARS = {
+    'product_name': 'device.product_name',
+    'firmware': 'appl.name',
+    'serial': 'device.unique_id',
+    'friendly_name': 'device.friendly_name',
+}
+
+# SQL Server major version -> product name
+MSSQL_VERSIONS = {
+    10: 'SQL Server 2008',
+    11: 'SQL Server 2012',
+    12: 'SQL Server 2014',
+    13: 'SQL Server 2016',
+    14: 'SQL Server 2017',
+    15: 'SQL Server 2019',
+    16: 'SQL Server 2022',
+}
+TDS_ENCRYPTION = {0: 'off', 1: 'on', 2: 'not_supported', 3: 'required'}
+
+
+def _recv_all(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def fingerprint_zebra(host, port, timeout=FINGERPRINT_TIMEOUTS['zebra']):
+    """Identify Zebra printer with ~HI and SGD getvar queries"""
+    info = {'protocol': 'zpl'}
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        # ~HI -> "ZT230-200dpi,V72.20.01Z,8,8192KB" (mock: "NAME,MODEL,V1.0,12345,READY")
+        sock.sendall(b'~HI\r\n')
+        try:
+            hi = sock.recv(1024).decode('utf-8', errors='ignore').strip().strip('\x02\x03')
+        except socket.timeout:
+            hi = ''
+        if hi:
+            info['hi'] = hi[:100]
+            fields = [f.strip() for f in hi.split(',')]
+            model = next((f for f in fields if f.upper().startswith(ZEBRA_MODEL_PREFIXES)
+                          and not f.upper().startswith('ZEBRA')), None)
+            firmware = next((f for f in fields if f[:1] in ('V', 'v') and any(c.isdigit() for c in f)), None)
+            if model:
+                info['model'] = model
+            if firmware:
+                info['firmware'] = firmware
         
-        if 'ZT' in response or 'ZD' in response or 'GK' in response:
-            return response.strip()[:50]
-    except:
-        pass
+        # SGD: ! U1 getvar "device.product_name" -> "ZT230-200dpi"
+        for key, var in ZEBRA_SGD_VARS.items():
+            sock.sendall(f'! U1 getvar "{var}"\r\n'.encode())
+            try:
+                reply = sock.recv(1024).decode('utf-8', errors='ignore').strip()
+            except socket.timeout:
+                break
+            if reply.startswith('"') and reply.count('"') >= 2:
+                value = reply.split('"')[1].strip()
+                if value and value != '?':
+                    info[key] = value
+    
+    if 'product_name' in info:
+        info['model'] = info['product_name']
+    return info
+
+
+def build_tds_prelogin():
+    """Build TDS PRELOGIN packet (VERSION, ENCRYPTION, INSTOPT, THREADID, MARS)"""
+    options = [
+        (0x00, b'\x00' * 6),        # VERSION - client version, unused by server
+        (0x01, b'\x02'),            # ENCRYPTION - ENCRYPT_NOT_SUP
+        (0x02, b'\x00'),            # INSTOPT - default instance
+        (0x03, b'\x00' * 4),        # THREADID
+        (0x04, b'\x00'),            # MARS - off
+    ]
+    offset = len(options) * 5 + 1
+    table = b''
+    data = b''
+    for token, value in options:
+        table += bytes([token]) + (offset + len(data)).to_bytes(2, 'big') + len(value).to_bytes(2, 'big')
+        data += value
+    payload = table + b'\xff' + data
+    # Header: type=PRELOGIN, status=EOM, length, SPID=0, packet id=1, window=0
+    header = bytes([0x12, 0x01]) + (len(payload) + 8).to_bytes(2, 'big') + b'\x00\x00\x01\x00'
+    return header + payload
+
+
+def parse_tds_prelogin(payload):
+    """Parse PRELOGIN response payload into option token -> bytes"""
+    options = {}
+    pos = 0
+    while pos + 5 <= len(payload) and payload[pos] != 0xFF:
+        token = payload[pos]
+        offset = int.from_bytes(payload[pos + 1:pos + 3], 'big')
+        length = int.from_bytes(payload[pos + 3:pos + 5], 'big')
+        options[token] = payload[offset:offset + length]
+        pos += 5
+    return options
+
+
+def fingerprint_mssql(host, port, timeout=FINGERPRINT_TIMEOUTS['mssql']):
+    """Identify SQL Server version with a TDS PRELOGIN exchange"""
+    info = {'protocol': 'tds'}
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(build_tds_prelogin())
+        header = _recv_all(sock, 8)
+        if len(header) < 8 or header[0] != 0x04:
+            return info
+        length = int.from_bytes(header[2:4], 'big')
+        options = parse_tds_prelogin(_recv_all(sock, length - 8))
+    
+    version = options.get(0x00, b'')
+    if len(version) >= 4:
+        major, minor = version[0], version[1]
+        build = int.from_bytes(version[2:4], 'big')
+        info['version'] = f"{major}.{minor}.{build}"
+        info['product'] = MSSQL_VERSIONS.get(major, 'SQL Server')
+    encryption = options.get(0x01, b'')
+    if encryption:
+        info['encryption'] = TDS_ENCRYPTION.get(encryption[0], str(encryption[0]))
+    return info
+
+
+def fingerprint_http(host, port, timeout=FINGERPRINT_TIMEOUTS['http']):
+    """Identify HTTP service with a HEAD request (status and Server header)"""
+    import http.client
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('HEAD', '/')
+        resp = conn.getresponse()
+        info = {'protocol': 'http', 'status': resp.status}
+        server = resp.getheader('Server')
+        if server:
+            info['server'] = server
+        return info
+    finally:
+        conn.close()
+
+
+FINGERPRINTERS = {
+    'zebra': fingerprint_zebra,
+    'mssql': fingerprint_mssql,
+    'http': fingerprint_http,
+}
+
+
+# =============================================================================
+# NEIGHBOUR TABLE - zero-probe classification by MAC vendor (OUI)
+# =============================================================================
+
+ARP_TABLE = '/proc/net/arp'
+OUI_FILE = os.path.join(SCRIPT_DIR, 'oui_vendors.txt')
+_oui_tables = {}
+
+
+def load_oui_table(path=OUI_FILE):
+    """Sorted OUI table as parallel lists: prefixes (int) and (category, vendor), cached"""
+    if path not in _oui_tables:
+        rows = []
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    prefix, category, vendor = line.rstrip('\n').split('\t', 2)
+                    rows.append((int(prefix, 16), (category, vendor)))
+        except FileNotFoundError:
+            pass
+        # lookup_oui bisects - a line added out of order must not break it
+        rows.sort(key=lambda row: row[0])
+        _oui_tables[path] = ([prefix for prefix, _ in rows], [entry for _, entry in rows])
+    return _oui_tables[path]
+
+
+def lookup_oui(mac, table=None):
+    """(category, vendor) for a MAC address, or None - binary search on the OUI"""
+    prefixes, entries = table or load_oui_table()
+    try:
+        oui = int(mac.replace(':', '').replace('-', '')[:6], 16)
+    except ValueError:
+        return None
+    i = bisect.bisect_left(prefixes, oui)
+    if i < len(prefixes) and prefixes[i] == oui:
+        return entries[i]
     return None
 
 
-def scan_network(network_range, ports, device_type='generic'):
-    """Scan a network range for open ports"""
-    devices = []
-    hosts_to_scan = []
+def read_arp_table(path=None):
+    """Complete entries of the kernel neighbour table: [{'ip', 'mac', 'interface'}]"""
+    neighbours = []
+    try:
+        with open(path or ARP_TABLE, 'r') as f:
+            next(f, None)   # header
+            for line in f:
+                # IP address  HW type  Flags  HW address  Mask  Device
+                parts = line.split()
+                if len(parts) < 6 or parts[2] == '0x0' or parts[3] == '00:00:00:00:00:00':
+                    continue
+                neighbours.append({'ip': parts[0], 'mac': parts[3].lower(), 'interface': parts[5]})
+    except OSError:
+        pass
+    return neighbours
+
+
+def classify_neighbours(networks=None, path=None):
+    """Neighbours (optionally within networks) tagged with vendor and category
     
-    # Generate host list (1-254)
-    for i in range(1, 255):
-        hosts_to_scan.append(f"{network_range}.{i}")
+    category: 'printer' (Zebra, Intermec), 'rpi' or None for unknown vendors
+    """
+    classified = {}
+    for entry in read_arp_table(path):
+        if networks:
+            ip = ipaddress.ip_address(entry['ip'])
+            if not any(ip in n for n in networks):
+                continue
+        match = lookup_oui(entry['mac'])
+        entry['category'], entry['vendor'] = match if match else (None, None)
+        classified[entry['ip']] = entry
+    return classified
+
+
+# =============================================================================
+# SCANNER - importable API (wapro-cli, webenv run discovery in-process)
+# =============================================================================
+
+# Device type -> results group in discovered_devices.json
+DEVICE_GROUPS = {
+    'zebra': 'zebra_printers',
+    'mssql': 'mssql_servers',
+    'http': 'http_services',
+}
+
+
+@dataclass
+class Device:
+    """Discovered endpoint"""
+    host: str
+    port: int
+    type: str
+    discovered_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    model: Optional[str] = None         # zebra
+    version: Optional[str] = None       # mssql
+    server: Optional[str] = None        # http
+    mac: Optional[str] = None           # from neighbour table
+    vendor: Optional[str] = None        # MAC OUI vendor
+    fingerprint: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Device':
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if v not in (None, {})}
+
+
+@dataclass
+class ScanResult:
+    """Result of one Scanner.run() - serializes to discovered_devices.json format"""
+    scan_date: str
+    quick: bool
+    local_ips: List[str] = field(default_factory=list)
+    networks: List[str] = field(default_factory=list)
+    devices: Dict[str, List[Device]] = field(
+        default_factory=lambda: {group: [] for group in DEVICE_GROUPS.values()})
+    neighbours: List[Dict[str, Any]] = field(default_factory=list)
+    scan_stats: Dict[str, Any] = field(default_factory=dict)
+    cancelled: bool = False
+
+    @property
+    def all_devices(self) -> List[Device]:
+        return [d for group in self.devices.values() for d in group]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'scan_date': self.scan_date,
+            'quick': self.quick,
+            'local_ips': self.local_ips,
+            'networks': self.networks,
+            'devices': {group: [d.to_dict() for d in items] for group, items in self.devices.items()},
+            'neighbours': self.neighbours,
+            'scan_stats': self.scan_stats,
+            'cancelled': self.cancelled,
+        }
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class Scanner:
+    """Reusable network scanner
     
-    def check_host_port(host, port):
-        if scan_port(host, port):
-            device = {
-                'host': host,
-                'port': port,
-                'type': device_type,
-                'discovered_at': datetime.now().isoformat()
-            }
-            
-            # Try to identify Zebra printer
-            if device_type == 'zebra' and port == 9100:
-                model = identify_zebra_printer(host, port)
-                if model:
-                    device['model'] = model
-            
-            return device
-        return None
+    Keeps its worker pool and resolved networks between runs, so a long-lived
+    process (wapro-cli interactive mode, webenv) pays the setup cost once.
     
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = []
-        for host in hosts_to_scan:
+    Callbacks are called from the thread that calls run() - workers only
+    probe, results are handled as they come back:
+        on_device(device)                         - endpoint found (Device)
+        on_progress(stage, done, total, percent)  - on each whole percent of a stage
+        on_event(event, **fields)                 - every event, e.g. EventStream.emit;
+                                                    'probe' events come from worker threads
+        log(message)                              - human readable output (default: none)
+    """
+
+    def __init__(self, quick=False, networks=None, interfaces=None, rate=MAX_RATE,
+                 burst=MAX_BURST, per_host=MAX_PER_HOST, fingerprint=True,
+                 results_file=RESULTS_FILE, on_device=None, on_progress=None,
+                 on_event=None, log=None, arp_only=False):
+        self.quick = quick
+        self.arp_only = arp_only
+        self.networks = networks
+        self.interfaces = interfaces
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host
+        self.fingerprint = fingerprint
+        self.results_file = results_file
+        self.on_device = on_device
+        self.on_progress = on_progress
+        self.on_event = on_event
+        self.log = log or (lambda message: None)
+        self.last_result: Optional[ScanResult] = None
+        self._cancel = threading.Event()
+        self._run_lock = threading.Lock()
+        self._executor = None
+        self._resolved = None
+
+    # --- lifecycle ---------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker pool (a later run() starts a new one)"""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def cancel(self) -> None:
+        """Stop the running scan - no new probes are started, run() returns early"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._run_lock.locked()
+
+    def resolve_networks(self, refresh=False) -> List[Any]:
+        """Networks to scan, cached between runs (interface lookup spawns `ip`)"""
+        if self._resolved is None or refresh:
+            if self.networks:
+                self._resolved = parse_networks(self.networks)
+            else:
+                self._resolved = parse_networks(str(n) for n in get_local_networks(self.interfaces))
+        return self._resolved
+
+    # --- scanning ----------------------------------------------------------
+
+    def run(self, quick=None) -> ScanResult:
+        """Run one discovery pass; raises RuntimeError if a scan is already running"""
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError('Scan already running')
+        try:
+            self._cancel.clear()
+            return self._run(self.quick if quick is None else quick)
+        except KeyboardInterrupt:
+            self.cancel()
+            raise
+        finally:
+            self._run_lock.release()
+
+    def _run(self, quick) -> ScanResult:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        
+        result = ScanResult(scan_date=datetime.now().isoformat(), quick=quick)
+        
+        self.log("[i] Detecting local network...")
+        result.local_ips = get_local_ips()
+        for ip in result.local_ips:
+            self.log(f"    Local IP: {ip}")
+        self.log("")
+        
+        networks = self.resolve_networks()
+        result.networks = [str(n) for n in networks]
+        if not networks:
+            self.log("[!] No networks to scan")
+            self.log("")
+        for network in networks:
+            self.log(f"[i] Scanning network: {network} ({count_hosts(network, quick)} hosts)")
+        self.log("")
+        self._emit('scan_started', quick=quick, networks=result.networks,
+                   hosts=sum(count_hosts(n, quick) for n in networks))
+        
+        # All networks are scanned together, sharing one worker pool and probe scheduler
+        limiter = TokenBucket(self.rate, self.burst, self.per_host)
+        if self.rate:
+            self.log(f"[i] Probe rate limit: {self.rate:g}/s "
+                     f"(burst {limiter.capacity:g}, {self.per_host} per host)")
+            self.log("")
+        
+        # Zero-probe classification: neighbours with a printer vendor OUI are probed first
+        neighbours = classify_neighbours(networks)
+        likely_printers = [ip for ip, n in neighbours.items() if n['category'] == 'printer']
+        if neighbours:
+            self.log(f"[i] Neighbour table: {len(neighbours)} hosts, "
+                     f"{len(likely_printers)} likely printers")
+            for ip in likely_printers:
+                self.log(f"    {ip} {neighbours[ip]['mac']} {neighbours[ip]['vendor']}")
+            self.log("")
+        self._emit('neighbours', neighbours=list(neighbours.values()))
+        # --arp-only: probe only hosts the kernel already knows, printers first
+        only = None
+        if self.arp_only:
+            likely = set(likely_printers)
+            only = likely_printers + [ip for ip in neighbours if ip not in likely]
+        
+        stages = [
+            ('zebra', ZEBRA_PORTS, "[i] Looking for Zebra printers (ports 9100, 6101)..."),
+            ('mssql', [MSSQL_PORT], "[i] Looking for MSSQL servers (port 1433)..."),
+        ]
+        # HTTP services (only in full scan)
+        if not quick:
+            stages.append(('http', HTTP_PORTS, "[i] Looking for HTTP services..."))
+        
+        for device_type, ports, message in stages:
+            if self.cancelled:
+                break
+            self.log(message)
+            first = likely_printers if device_type == 'zebra' else ()
+            found = self._scan(networks, ports, device_type, quick, limiter, first=first, only=only)
+            result.devices[DEVICE_GROUPS[device_type]].extend(found)
+            self.log("")
+        
+        # Probes filled the neighbour table - tag every found device with its vendor
+        neighbours.update(classify_neighbours(networks))
+        for device in result.all_devices:
+            entry = neighbours.get(device.host)
+            if entry:
+                device.mac = entry['mac']
+                device.vendor = entry['vendor']
+        result.neighbours = list(neighbours.values())
+        
+        # Fingerprinting stage - separate pass over found endpoints only
+        found = result.all_devices
+        if self.fingerprint and found and not self.cancelled:
+            self.log(f"[i] Fingerprinting {len(found)} endpoints...")
+            self._fingerprint(found, limiter)
+            self.log("")
+        
+        result.scan_stats = limiter.stats()
+        result.cancelled = self.cancelled
+        self.last_result = result
+        
+        # A cancelled scan is partial - keep the previous results file
+        if self.results_file and not result.cancelled:
+            result.save(self.results_file)
+            self.log(f"[+] Results saved to: {self.results_file}")
+            self.log("")
+        
+        self._emit('done', results_file=self.results_file, stats=result.scan_stats,
+                   cancelled=result.cancelled,
+                   summary={k: len(v) for k, v in result.devices.items()})
+        return result
+
+    def _emit(self, event, **fields):
+        if self.on_event:
+            self.on_event(event, **fields)
+        if event == 'progress' and self.on_progress:
+            self.on_progress(fields['stage'], fields['done'], fields['total'], fields['percent'])
+
+    def _scan(self, networks, ports, device_type, quick, limiter, first=(), only=None) -> List[Device]:
+        """Scan networks (list of ipaddress networks) for open ports
+        
+        first - hosts probed before the sweep (the sweep skips them)
+        only  - probe just these hosts instead of sweeping the networks
+        """
+        devices = []
+        
+        def probe(host, port):
+            with limiter.slot(host):
+                is_open = scan_port(host, port)
+            self._emit('probe', host=host, port=port, open=is_open)
+            return is_open
+        
+        def check_host_port(host, port):
+            if not self.cancelled and probe(host, port):
+                return Device(host=host, port=port, type=device_type)
+            return None
+        
+        def check_host(host):
+            # Quick scan - first open port only
             for port in ports:
-                futures.append(executor.submit(check_host_port, host, port))
+                if self.cancelled:
+                    break
+                if probe(host, port):
+                    return Device(host=host, port=port, type=device_type)
+            return None
         
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                devices.append(result)
-                print(f"  [+] Found {device_type}: {result['host']}:{result['port']}")
-    
-    return devices
+        def until_cancelled(tasks):
+            for task in tasks:
+                if self.cancelled:
+                    return
+                yield task
+        
+        if only is not None:
+            hosts = list(only)
+            total = len(hosts)
+        else:
+            skip = set(first)
+            sweep = (host for host in iter_hosts(networks, quick=quick) if host not in skip)
+            hosts = itertools.chain(first, sweep)
+            total = sum(count_hosts(n, quick) for n in networks)
+            total += sum(1 for host in first if not in_sweep(host, networks, quick))
+        if quick:
+            tasks = ((host,) for host in hosts)
+            check = check_host
+        else:
+            tasks = ((host, port) for host in hosts for port in ports)
+            check = check_host_port
+            total *= len(ports)
+        progress = Progress(self._emit, device_type, total)
+        
+        for device in run_bounded(self._executor, check, until_cancelled(tasks)):
+            if device:
+                devices.append(device)
+                self.log(f"  [+] Found {device_type}: {device.host}:{device.port}")
+                self._emit('device', device=device.to_dict())
+                if self.on_device:
+                    self.on_device(device)
+            progress.step()
+        
+        return devices
+
+    def _fingerprint(self, devices, limiter) -> None:
+        """Fingerprint devices concurrently, storing results on each Device"""
+        
+        def identify(device):
+            probe = FINGERPRINTERS.get(device.type)
+            if not probe or self.cancelled:
+                return device
+            try:
+                with limiter.slot(device.host):
+                    device.fingerprint = probe(device.host, device.port)
+            except Exception as e:
+                device.fingerprint = {'error': str(e) or e.__class__.__name__}
+                return device
+            
+            # Flat summary fields for consumers (.env suggestions, webenv)
+            device.model = device.fingerprint.get('model') or device.model
+            device.version = device.fingerprint.get('version') or device.version
+            device.server = device.fingerprint.get('server') or device.server
+            return device
+        
+        tasks = ((d,) for d in devices)
+        for device in run_bounded(self._executor, identify, tasks, max_pending=FINGERPRINT_WORKERS):
+            summary = device.model or device.version or device.server
+            if summary:
+                self.log(f"  [+] {device.type} {device.host}:{device.port} -> {summary}")
+            self._emit('fingerprint', device=device.to_dict())
 
 
-def discover_all(quick=False):
-    """Discover all devices"""
+def discover_all(quick=False, networks=None, interfaces=None, rate=MAX_RATE, fingerprint=True,
+                 events=None, burst=MAX_BURST, per_host=MAX_PER_HOST, arp_only=False,
+                 results_file=RESULTS_FILE):
+    """Discover all devices (CLI wrapper around Scanner, returns results dict)
+    
+    networks     - list of CIDR strings to scan (default: local interface networks)
+    interfaces   - restrict local networks to these interface names
+    rate         - global probes/sec limit shared by all networks (0 = unlimited)
+    burst        - token bucket size for rate (0 = rate / 10)
+    per_host     - max concurrent probes of a single host
+    fingerprint  - identify found endpoints (ZPL ~HI/SGD, TDS prelogin, HTTP HEAD)
+    events       - EventStream receiving NDJSON progress events while scanning
+    arp_only     - probe only hosts from the neighbour table
+    results_file - where to save results JSON (None = do not save)
+    """
     print("")
     print("=" * 60)
     print("     WAPRO Network Mock - Device Discovery")
     print("=" * 60)
     print("")
     
-    results = {
-        'scan_date': datetime.now().isoformat(),
-        'local_ips': [],
-        'networks': [],
-        'devices': {
-            'zebra_printers': [],
-            'mssql_servers': [],
-            'http_services': []
+    with Scanner(quick=quick, networks=networks, interfaces=interfaces, rate=rate, burst=burst,
+                 per_host=per_host, fingerprint=fingerprint, arp_only=arp_only,
+                 results_file=results_file, on_event=events.emit if events else None,
+                 log=print) as scanner:
+        result = scanner.run()
+    
+    # Summary
+    print("=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"  Zebra printers: {len(result.devices['zebra_printers'])}")
+    print(f"  MSSQL servers:  {len(result.devices['mssql_servers'])}")
+    print(f"  HTTP services:  {len(result.devices['http_services'])}")
+    stats = result.scan_stats
+    limit = f", limit {stats['rate_limit']:g}/s" if stats['rate_limit'] else ''
+    print(f"  Probes:         {stats['probes']} in {stats['elapsed']:.1f}s ({stats['rate']:g}/s{limit})")
+    print("")
+    
+    return result.to_dict()
+
+
+# =============================================================================
+# DATABASE SYNC - discovered printers -> KonfiguracjaDrukarek (one MERGE per scan)
+# =============================================================================
+
+SYNC_TABLE = 'KonfiguracjaDrukarek'
+SYNC_STATUS = 'ONLINE'
+SQLCMD_PATHS = ('/opt/mssql-tools18/bin/sqlcmd', '/opt/mssql-tools/bin/sqlcmd')
+SQLCMD_TIMEOUT = 60
+
+
+def read_env(path=ENV_FILE):
+    """KEY=VALUE pairs from .env (empty dict if missing)"""
+    return get_store(path).load()
+
+
+def printer_rows(devices):
+    """KonfiguracjaDrukarek source rows for discovered printers, one per (AdresIP, Port)"""
+    rows = {}
+    for device in devices:
+        if isinstance(device, Device):
+            device = device.to_dict()
+        if device.get('type') != 'zebra':
+            continue
+        try:
+            ip = str(ipaddress.IPv4Address(device['host']))      # AdresIP nvarchar(15)
+        except ValueError:
+            continue
+        port = int(device['port'])
+        model = (device.get('model') or '')[:50] or None
+        if (ip, port) in rows and not model:
+            continue
+        rows[(ip, port)] = {
+            'NazwaDrukarki': f"ZEBRA-{ip}",
+            'AdresIP': ip,
+            'Port': port,
+            'ModelDrukarki': model,
         }
-    }
+    return list(rows.values())
+
+
+def _sql_literal(value, dialect='mssql'):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, int):
+        return str(value)
+    quoted = "'" + str(value).replace("'", "''") + "'"
+    return 'N' + quoted if dialect == 'mssql' else quoted
+
+
+def build_printer_upsert(rows, checked_at, dialect='mssql'):
+    """Single set-based upsert of all rows (MSSQL MERGE or SQLite ON CONFLICT)"""
+    columns = ('NazwaDrukarki', 'AdresIP', 'Port', 'ModelDrukarki')
+    checked = _sql_literal(checked_at, dialect)
+    status = _sql_literal(SYNC_STATUS, dialect)
     
-    # Get local IPs
-    print("[i] Detecting local network...")
-    local_ips = get_local_ips()
-    results['local_ips'] = local_ips
+    if dialect == 'sqlite':
+        values = ',\n    '.join(
+            '(' + ', '.join([_sql_literal(row[c], dialect) for c in columns] + [status, checked]) + ')'
+            for row in rows)
+        return f"""INSERT INTO {SYNC_TABLE} ({', '.join(columns)}, StatusPolaczenia, DataOstatniegoBadania)
+VALUES
+    {values}
+ON CONFLICT (AdresIP, Port) DO UPDATE SET
+    ModelDrukarki = COALESCE(excluded.ModelDrukarki, ModelDrukarki),
+    StatusPolaczenia = excluded.StatusPolaczenia,
+    DataOstatniegoBadania = excluded.DataOstatniegoBadania,
+    DataModyfikacji = CURRENT_TIMESTAMP;"""
     
-    for ip in local_ips:
-        print(f"    Local IP: {ip}")
-    print("")
+    values = ',\n    '.join('(' + ', '.join(_sql_literal(row[c]) for c in columns) + ')' for row in rows)
+    return f"""SET NOCOUNT ON;
+MERGE {SYNC_TABLE} WITH (HOLDLOCK) AS t
+USING (VALUES
+    {values}
+) AS s ({', '.join(columns)})
+ON t.AdresIP = s.AdresIP AND t.Port = s.Port
+WHEN MATCHED THEN UPDATE SET
+    ModelDrukarki = COALESCE(s.ModelDrukarki, t.ModelDrukarki),
+    StatusPolaczenia = {status},
+    DataOstatniegoBadania = {checked},
+    DataModyfikacji = GETDATE()
+WHEN NOT MATCHED BY TARGET THEN
+    INSERT ({', '.join(columns)}, StatusPolaczenia, DataOstatniegoBadania)
+    VALUES (s.NazwaDrukarki, s.AdresIP, s.Port, s.ModelDrukarki, {status}, {checked})
+OUTPUT $action;"""
+
+
+class SqlcmdDatabase:
+    """WAPROMAG database in the MSSQL container - batches go through docker exec sqlcmd"""
+    dialect = 'mssql'
+
+    def __init__(self, env_file=ENV_FILE):
+        config = read_env(env_file)
+        self.container = config.get('MSSQL_CONTAINER_NAME') or 'wapromag-mssql'
+        self.password = config.get('MSSQL_SA_PASSWORD') or config.get('MSSQL_PASSWORD') or 'WapromagPass123!'
+        self.database = config.get('MSSQL_DATABASE') or 'WAPROMAG_TEST'
+
+    def execute(self, sql):
+        """Run one batch, return non-empty output lines"""
+        output = ''
+        for sqlcmd in SQLCMD_PATHS:
+            cmd = ['docker', 'exec', '-i', '-e', 'SQLCMDPASSWORD', self.container, sqlcmd,
+                   '-S', 'localhost', '-U', 'sa', '-d', self.database, '-b', '-h', '-1', '-W']
+            if 'tools18' in sqlcmd:
+                cmd.append('-C')
+            proc = subprocess.run(cmd, input=sql + '\nGO\n', capture_output=True, text=True,
+                                  timeout=SQLCMD_TIMEOUT, env={**os.environ, 'SQLCMDPASSWORD': self.password})
+            output = (proc.stdout + proc.stderr).strip()
+            if proc.returncode == 0:
+                return [line.strip() for line in proc.stdout.splitlines() if line.strip()]
+            if proc.returncode not in (126, 127):     # sqlcmd exists, the batch failed
+                break
+        raise RuntimeError(f"sqlcmd failed: {output}")
+
+    def upsert(self, sql):
+        """Run upsert, return (inserted, updated) from MERGE OUTPUT $action"""
+        actions = self.execute(sql)
+        return actions.count('INSERT'), actions.count('UPDATE')
+
+
+class SqliteStandIn:
+    """Local SQLite copy of KonfiguracjaDrukarek for tests and dry runs without MSSQL"""
+    dialect = 'sqlite'
+    SCHEMA = f"""CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        NazwaDrukarki TEXT NOT NULL,
+        AdresIP TEXT NOT NULL,
+        Port INTEGER DEFAULT 9100,
+        ModelDrukarki TEXT,
+        TypDrukarki TEXT DEFAULT 'ZEBRA',
+        CzyAktywna INTEGER DEFAULT 1,
+        DataOstatniegoBadania TEXT,
+        StatusPolaczenia TEXT DEFAULT 'NIEZNANY',
+        DataUtworzenia TEXT DEFAULT CURRENT_TIMESTAMP,
+        DataModyfikacji TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (AdresIP, Port)
+    )"""
+
+    def __init__(self, path=':memory:'):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(self.SCHEMA)
+
+    def upsert(self, sql):
+        """Run upsert, return (inserted, updated)"""
+        count = f"SELECT COUNT(*) FROM {SYNC_TABLE}"
+        with self.conn:
+            before = self.conn.execute(count).fetchone()[0]
+            changed = self.conn.execute(sql).rowcount
+            inserted = self.conn.execute(count).fetchone()[0] - before
+        return inserted, changed - inserted
+
+    def printers(self):
+        return [dict(row) for row in self.conn.execute(f"SELECT * FROM {SYNC_TABLE} ORDER BY ID")]
+
+    def close(self):
+        self.conn.close()
+
+
+def sync_printers(devices, db=None, checked_at=None):
+    """Upsert discovered printers into KonfiguracjaDrukarek in one round-trip
     
-    # Get network ranges
-    networks = set()
-    for ip in local_ips:
-        network = get_network_range(ip)
-        if network:
-            networks.add(network)
+    devices    - Device objects or dicts (discovered_devices.json 'zebra_printers')
+    db         - SqlcmdDatabase (default) or SqliteStandIn
+    checked_at - DataOstatniegoBadania value (default: now)
+    """
+    rows = printer_rows(devices)
+    if not rows:
+        return {'printers': 0, 'inserted': 0, 'updated': 0}
+    db = db or SqlcmdDatabase()
+    checked_at = (checked_at or datetime.now()).strftime('%Y-%m-%dT%H:%M:%S')
+    inserted, updated = db.upsert(build_printer_upsert(rows, checked_at, db.dialect))
+    return {'printers': len(rows), 'inserted': inserted, 'updated': updated}
+
+
+# =============================================================================
+# DAEMON - re-probes known endpoints and exports Prometheus metrics
+# =============================================================================
+
+DAEMON_INTERVAL = 30            # seconds between probes of one endpoint
+DAEMON_JITTER = 0.2             # +/- fraction of interval, spreads probes in time
+DAEMON_WORKERS = 4
+DAEMON_TIMEOUT = 2
+METRICS_PORT = 9105
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _env_port(config, key, default, log):
+    """Port from .env, None (logged) if the value is not one"""
+    value = config.get(key) or str(default)
+    if value.isdigit() and 1 <= int(value) <= 65535:
+        return int(value)
+    log(f"[!] {key}={value} is not a port - endpoint skipped")
+    return None
+
+
+def load_env_targets(path=ENV_FILE, log=print):
+    """Printers and MSSQL endpoint configured in .env (entries with a bad port are skipped)"""
+    config = read_env(path)
     
-    results['networks'] = list(networks)
+    targets = []
+    for key, host in config.items():
+        if key.startswith('ZEBRA_') and key.endswith('_HOST') and host:
+            prefix = key[:-len('HOST')]
+            if config.get(prefix + 'ENABLED', 'true').lower() == 'false':
+                continue
+            port = _env_port(config, prefix + 'SOCKET_PORT', 9100, log)
+            if port is None:
+                continue
+            targets.append({
+                'type': 'zebra',
+                'name': config.get(prefix + 'NAME') or host,
+                'host': host,
+                'port': port,
+            })
+    if config.get('MSSQL_HOST') and config.get('MSSQL_ENABLED', 'true').lower() != 'false':
+        port = _env_port(config, 'MSSQL_PORT', MSSQL_PORT, log)
+        if port is not None:
+            targets.append({
+                'type': 'mssql',
+                'name': config.get('MSSQL_DATABASE') or config['MSSQL_HOST'],
+                'host': config['MSSQL_HOST'],
+                'port': port,
+            })
+    return targets
+
+
+def load_discovered_targets(path=RESULTS_FILE):
+    """Printers and MSSQL servers from the last discovery results"""
+    try:
+        with open(path, 'r') as f:
+            devices = json.load(f).get('devices', {})
+    except (FileNotFoundError, ValueError):
+        return []
+    targets = []
+    for device in devices.get('zebra_printers', []) + devices.get('mssql_servers', []):
+        targets.append({
+            'type': device['type'],
+            'name': device.get('model') or device['host'],
+            'host': device['host'],
+            'port': device['port'],
+        })
+    return targets
+
+
+def label_value(value):
+    """Label value escaped for the Prometheus text format (backslash, quote, newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels_text(labels):
+    return ','.join(f'{key}="{label_value(value)}"' for key, value in labels)
+
+
+class Histogram:
+    """Prometheus histogram with cumulative buckets, per label set"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.series = {}            # labels tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, name):
+        lines = []
+        for labels, series in sorted(self.series.items()):
+            base = labels_text(labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {series[-2]}')
+            lines.append(f'{name}_count{{{base}}} {series[-2]}')
+            lines.append(f'{name}_sum{{{base}}} {series[-1]:.6f}')
+        return lines
+
+
+class DiscoveryDaemon:
+    """Re-probes known printers and MSSQL endpoints on a jittered schedule
     
-    # Scan each network
-    for network in networks:
-        print(f"[i] Scanning network: {network}.0/24")
-        print("")
+    State lives in memory; a single scheduler thread sleeps until the next
+    probe is due, probes run on a small pool and each opens one short-lived
+    socket, so the daemon stays cheap on a Raspberry Pi.
+    """
+
+    def __init__(self, interval=DAEMON_INTERVAL, jitter=DAEMON_JITTER, timeout=DAEMON_TIMEOUT,
+                 results_file=RESULTS_FILE, env_file=ENV_FILE, log=print):
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.results_file = results_file
+        self.env_file = env_file
+        self.log = log
+        self.targets = {}           # (type, host, port) -> target
+        self.state = {}             # (type, host, port) -> {'up', 'latency', 'checked_at'}
+        self.histogram = Histogram()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self._schedule = []         # heap of (due, key)
+        self._due = {}              # key -> due of its live heap entry, older entries are stale
+        self._sources_mtime = None
+
+    def _next_due(self, now):
+        spread = self.interval * self.jitter
+        return now + self.interval + random.uniform(-spread, spread)
+
+    def reload_targets(self):
+        """Reload targets when .env or the results file changed (one stat() each)"""
+        mtimes = []
+        for path in (self.env_file, self.results_file):
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        if mtimes == self._sources_mtime:
+            return
+        self._sources_mtime = mtimes
         
-        # Quick scan addresses - common device IPs
-        quick_addresses = list(range(1, 51)) + list(range(100, 151)) + list(range(200, 255))
+        targets = {}
+        for target in load_discovered_targets(self.results_file) + load_env_targets(self.env_file, self.log):
+            # .env entries come last - configured names win over discovered ones
+            targets[(target['type'], target['host'], target['port'])] = target
         
-        # Zebra printers
-        print("[i] Looking for Zebra printers (ports 9100, 6101)...")
-        if quick:
-            # Quick scan with threading
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-            def check_zebra(i):
-                host = f"{network}.{i}"
-                for port in ZEBRA_PORTS:
-                    if scan_port(host, port):
-                        return {'host': host, 'port': port, 'type': 'zebra'}
-                return None
-            
-            with ThreadPoolExecutor(max_workers=30) as executor:
-                futures = [executor.submit(check_zebra, i) for i in quick_addresses]
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result:
-                        results['devices']['zebra_printers'].append(result)
-                        print(f"  [+] Found Zebra: {result['host']}:{result['port']}")
-        else:
-            printers = scan_network(network, ZEBRA_PORTS, 'zebra')
-            results['devices']['zebra_printers'].extend(printers)
-        print("")
+        now = time.monotonic()
+        with self.lock:
+            for key in set(self.targets) - set(targets):
+                self.state.pop(key, None)
+            added = set(targets) - set(self.targets)
+            self.targets = targets
+        # New targets are probed soon, spread over the first interval
+        for key in added:
+            self._push(now + random.uniform(0, self.interval * self.jitter), key)
+        self.log(f"[i] Monitoring {len(targets)} endpoints")
+
+    def probe(self, key):
+        target = self.targets.get(key)
+        if not target:
+            return
+        started = time.monotonic()
+        try:
+            if target['type'] == 'mssql':
+                # TDS prelogin - the server must answer, an open port is not enough
+                up = 'version' in fingerprint_mssql(target['host'], target['port'], timeout=self.timeout)
+            else:
+                with socket.create_connection((target['host'], target['port']), timeout=self.timeout):
+                    up = True
+        except Exception:
+            up = False
+        latency = time.monotonic() - started
         
-        # MSSQL servers
-        print("[i] Looking for MSSQL servers (port 1433)...")
-        if quick:
-            def check_mssql(i):
-                host = f"{network}.{i}"
-                if scan_port(host, MSSQL_PORT):
-                    return {'host': host, 'port': MSSQL_PORT, 'type': 'mssql'}
-                return None
+        with self.lock:
+            previous = self.state.get(key, {}).get('up')
+            self.state[key] = {'up': up, 'latency': latency, 'checked_at': time.time()}
+            if up:
+                labels = (('type', target['type']), ('host', target['host']), ('port', target['port']))
+                self.histogram.observe(labels, latency)
+        if previous is not None and previous != up:
+            status = 'UP' if up else 'DOWN'
+            self.log(f"[{'+' if up else '!'}] {target['type']} {target['name']} "
+                     f"({target['host']}:{target['port']}) is {status}")
+
+    def render_metrics(self):
+        lines = [
+            '# HELP printer_available Printer reachable on its socket port (1) or not (0)',
+            '# TYPE printer_available gauge',
+        ]
+        with self.lock:
+            items = [(self.targets[k], s) for k, s in self.state.items() if k in self.targets]
+            for target, state in items:
+                if target['type'] == 'zebra':
+                    labels = labels_text([('printer_name', target['name']), ('host', target['host']),
+                                          ('port', target['port'])])
+                    lines.append(f'printer_available{{{labels}}} {int(state["up"])}')
+            lines += [
+                '# HELP database_connection_status MSSQL answers TDS prelogin (1) or not (0)',
+                '# TYPE database_connection_status gauge',
+            ]
+            for target, state in items:
+                if target['type'] == 'mssql':
+                    labels = labels_text([('database', target['name']), ('host', target['host']),
+                                          ('port', target['port'])])
+                    lines.append(f'database_connection_status{{{labels}}} {int(state["up"])}')
+            lines += [
+                '# HELP discovery_probe_latency_seconds Latency of successful probes',
+                '# TYPE discovery_probe_latency_seconds histogram',
+            ]
+            lines += self.histogram.render('discovery_probe_latency_seconds')
+        return '\n'.join(lines) + '\n'
+
+    def serve_metrics(self, port=METRICS_PORT):
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        daemon = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/metrics', '/'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = daemon.render_metrics().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
             
-            with ThreadPoolExecutor(max_workers=30) as executor:
-                futures = [executor.submit(check_mssql, i) for i in quick_addresses]
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result:
-                        results['devices']['mssql_servers'].append(result)
-                        print(f"  [+] Found MSSQL: {result['host']}:{result['port']}")
-        else:
-            servers = scan_network(network, [MSSQL_PORT], 'mssql')
-            results['devices']['mssql_servers'].extend(servers)
-        print("")
+            def log_message(self, format, *args):
+                pass
         
-        # HTTP services (only in full scan)
-        if not quick:
-            print("[i] Looking for HTTP services...")
-            services = scan_network(network, HTTP_PORTS, 'http')
-            results['devices']['http_services'].extend(services)
-            print("")
-    
-    # Save results
-    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
-    with open(RESULTS_FILE, 'w') as f:
-        json.dump(results, f, indent=2)
-    
-    print(f"[+] Results saved to: {RESULTS_FILE}")
-    print("")
-    
-    # Summary
-    print("=" * 60)
-    print("SUMMARY")
-    print("=" * 60)
-    print(f"  Zebra printers: {len(results['devices']['zebra_printers'])}")
-    print(f"  MSSQL servers:  {len(results['devices']['mssql_servers'])}")
-    print(f"  HTTP services:  {len(results['devices']['http_services'])}")
-    print("")
+        # Single-threaded server - Prometheus scrapes are small and sequential
+        server = HTTPServer(('0.0.0.0', port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.log(f"[i] Metrics: http://0.0.0.0:{port}/metrics")
+        return server
+
+    def _push(self, due, key):
+        self._due[key] = due
+        heapq.heappush(self._schedule, (due, key))
+
+    def due_keys(self, now):
+        """Keys due by now, each rescheduled once (stale heap entries are dropped)"""
+        keys = []
+        while self._schedule and self._schedule[0][0] <= now:
+            due, key = heapq.heappop(self._schedule)
+            if key not in self.targets:
+                self._due.pop(key, None)
+            elif self._due.get(key) == due:      # else: target was removed and re-added
+                keys.append(key)
+                self._push(self._next_due(now), key)
+        return keys
+
+    def run(self, workers=DAEMON_WORKERS):
+        """Probe loop - blocks until stop()"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while not self.stop_event.is_set():
+                try:
+                    self.reload_targets()
+                except Exception as e:
+                    # A bad edit of .env or the results file must not stop monitoring
+                    self.log(f"[!] Reloading targets failed, keeping the previous ones: {e}")
+                now = time.monotonic()
+                for key in self.due_keys(now):
+                    executor.submit(self.probe, key)
+                # Sleep until the next probe, but re-check sources at least every interval
+                delay = self._schedule[0][0] - now if self._schedule else self.interval
+                self.stop_event.wait(min(max(delay, 0.05), self.interval))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def run_daemon(args):
+    """Daemon mode: initial discovery if nothing is known yet, then monitoring"""
+    daemon = DiscoveryDaemon(interval=args.interval)
+    if not (load_discovered_targets() or load_env_targets()):
+        print("[i] No known endpoints - running initial quick discovery")
+        with Scanner(quick=True, networks=args.network, interfaces=args.interface,
+                     rate=args.rate, burst=args.burst, per_host=args.per_host) as scanner:
+            scanner.run()
     
-    return results
+    server = daemon.serve_metrics(args.metrics_port)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\n[i] Stopping daemon...")
+    finally:
+        daemon.stop()
+        server.shutdown()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='WAPRO Network Mock - Device Discovery')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='quick scan (common addresses, Zebra and MSSQL only)')
+    parser.add_argument('-n', '--network', action='append', default=[], metavar='CIDR',
+                        help='network to scan, e.g. 192.168.8.0/22 (repeatable, comma separated)')
+    parser.add_argument('-i', '--interface', action='append', default=[], metavar='IFACE',
+                        help='scan networks of this local interface (repeatable)')
+    parser.add_argument('--rate', type=float, default=MAX_RATE, metavar='N',
+                        help='global limit of probes per second (0 = unlimited)')
+    parser.add_argument('--burst', type=float, default=MAX_BURST, metavar='N',
+                        help='probes allowed in a burst above --rate (default: rate / 10)')
+    parser.add_argument('--per-host', type=int, default=MAX_PER_HOST, metavar='N',
+                        help=f'concurrent probes per host (default: {MAX_PER_HOST})')
+    parser.add_argument('--events', metavar='FILE',
+                        help='stream NDJSON events to FILE ("-" = stdout, text output goes to stderr)')
+    parser.add_argument('--no-fingerprint', dest='fingerprint', action='store_false',
+                        help='skip protocol fingerprinting of found endpoints')
+    parser.add_argument('--arp-only', action='store_true',
+                        help='probe only hosts from the neighbour table (printer OUIs first)')
+    parser.add_argument('--sync-db', nargs='?', const='mssql', metavar='SQLITE_FILE',
+                        help='upsert found printers into KonfiguracjaDrukarek (MSSQL container, '
+                             'or a SQLite stand-in file)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep re-probing known printers and MSSQL, export Prometheus metrics')
+    parser.add_argument('--interval', type=float, default=DAEMON_INTERVAL, metavar='SEC',
+                        help=f'daemon: seconds between probes of one endpoint (default: {DAEMON_INTERVAL})')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, metavar='PORT',
+                        help=f'daemon: metrics HTTP port (default: {METRICS_PORT})')
+    args = parser.parse_args(argv)
+    args.network = [n for spec in args.network for n in spec.split(',') if n.strip()]
+    return args
 
 
 def main():
-    quick = '-q' in sys.argv or '--quick' in sys.argv
-    discover_all(quick=quick)
+    args = parse_args()
+    if args.daemon:
+        run_daemon(args)
+        return
+    
+    events = EventStream(args.events) if args.events else None
+    
+    # Keep stdout pure NDJSON when streaming events there
+    if args.events == '-':
+        sys.stdout = sys.stderr
+    try:
+        results = discover_all(quick=args.quick, networks=args.network, interfaces=args.interface,
+                               rate=args.rate, fingerprint=args.fingerprint, events=events,
+                               burst=args.burst, per_host=args.per_host, arp_only=args.arp_only)
+    finally:
+        if events:
+            events.close()
+    
+    if args.sync_db and not results['cancelled']:
+        db = SqlcmdDatabase() if args.sync_db == 'mssql' else SqliteStandIn(args.sync_db)
+        try:
+            synced = sync_printers(results['devices']['zebra_printers'], db)
+            print(f"[i] {SYNC_TABLE}: {synced['printers']} printers "
+                  f"({synced['inserted']} new, {synced['updated']} updated)")
+        except (RuntimeError, OSError, subprocess.SubprocessError, sqlite3.Error) as e:
+            print(f"[!] {SYNC_TABLE} sync failed: {e}")
+        print("")
     
     print("Next steps:")
     print("  1. Run: make webenv")
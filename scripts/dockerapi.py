@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Minimal Docker Engine API client for WAPRO Network Mock (wapro-cli)
+Talks HTTP over the Docker Unix socket with one persistent connection instead
+of spawning docker-compose for every status/start/stop/logs call.
+
+Only containers already created by docker-compose are managed here - creating
+them (first `up`) still needs docker-compose.
+
+Usage:
+    from dockerapi import DockerClient
+    with DockerClient() as docker:
+        for c in docker.containers(project='prinet'):
+            print(c['service'], c['state'], c['health'])
+"""
+
+import os
+import json
+import socket
+import threading
+import http.client
+from urllib.parse import quote, urlencode
+
+DOCKER_SOCKET = '/var/run/docker.sock'
+DOCKER_API_VERSION = 'v1.41'        # Docker 20.10+, available on Raspberry Pi OS
+DOCKER_TIMEOUT = 30
+STOP_TIMEOUT = 10
+
+PROJECT_LABEL = 'com.docker.compose.project'
+SERVICE_LABEL = 'com.docker.compose.service'
+CONFIG_FILES_LABEL = 'com.docker.compose.project.config_files'
+
+
+class DockerError(Exception):
+    """Docker API error (status 0 = socket unreachable)"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}" if status else message)
+        self.status = status
+
+
+def default_socket():
+    """Socket path from DOCKER_HOST=unix://... or the standard location"""
+    host = os.environ.get('DOCKER_HOST', '')
+    if host.startswith('unix://'):
+        return host[len('unix://'):]
+    return DOCKER_SOCKET
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over an AF_UNIX socket"""
+
+    def __init__(self, path, timeout=DOCKER_TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def read_exact(response, size):
+    """size bytes, fewer only at end of stream - a read may return part of a frame"""
+    chunks = []
+    while size:
+        chunk = response.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def iter_log_frames(response, tty=False):
+    """(stream, bytes) chunks of a logs response - demultiplexes the 8-byte frame headers"""
+    if tty:
+        while True:
+            chunk = response.read1(65536) if hasattr(response, 'read1') else response.read(4096)
+            if not chunk:
+                return
+            yield 'stdout', chunk
+    streams = {0: 'stdin', 1: 'stdout', 2: 'stderr'}
+    while True:
+        header = read_exact(response, 8)
+        if len(header) < 8:
+            return
+        size = int.from_bytes(header[4:8], 'big')
+        payload = read_exact(response, size)
+        if payload:
+            yield streams.get(header[0], 'stdout'), payload
+        if len(payload) < size:
+            return                      # stream cut mid-frame
+
+
+def iter_log_lines(response, tty=False):
+    """(stream, line) of a logs response, lines split across frames are joined"""
+    pending = {}
+    for stream, chunk in iter_log_frames(response, tty):
+        data = pending.pop(stream, b'') + chunk
+        *lines, rest = data.split(b'\n')
+        if rest:
+            pending[stream] = rest
+        for line in lines:
+            yield stream, line.decode('utf-8', errors='replace').rstrip('\r')
+    for stream, rest in pending.items():
+        yield stream, rest.decode('utf-8', errors='replace')
+
+
+class DockerClient:
+    """Docker Engine API over the Unix socket, one kept-alive connection for requests"""
+
+    def __init__(self, socket_path=None, timeout=DOCKER_TIMEOUT):
+        self.socket_path = socket_path or default_socket()
+        self.timeout = timeout
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _url(self, path, params=None):
+        url = f"/{DOCKER_API_VERSION}{path}"
+        if params:
+            url += '?' + urlencode(params)
+        return url
+
+    def _request(self, method, path, params=None, body=None):
+        """Send request on the persistent connection -> (status, decoded JSON or text)"""
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        with self.lock:
+            for attempt in range(2):
+                reused = self.conn is not None
+                if self.conn is None:
+                    self.conn = UnixHTTPConnection(self.socket_path, self.timeout)
+                try:
+                    self.conn.request(method, self._url(path, params), body=payload, headers=headers)
+                    response = self.conn.getresponse()
+                    data = response.read()
+                    if response.will_close:
+                        self.close()
+                    break
+                except (http.client.HTTPException, OSError) as e:
+                    self.close()
+                    if not reused or attempt:
+                        raise DockerError(0, f"Docker socket {self.socket_path}: {e}") from e
+
+        if 'json' in (response.getheader('Content-Type') or '') and data:
+            data = json.loads(data)
+        else:
+            data = data.decode('utf-8', errors='replace')
+        if response.status >= 400:
+            message = data.get('message', data) if isinstance(data, dict) else data.strip()
+            raise DockerError(response.status, message)
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ping(self):
+        """True if the daemon answers on the socket"""
+        try:
+            return self._request('GET', '/_ping')[1] == 'OK'
+        except DockerError:
+            return False
+
+    def containers(self, project=None, all=True):
+        """Structured state of containers (of one compose project)"""
+        params = {'all': '1' if all else '0'}
+        if project:
+            params['filters'] = json.dumps({'label': [f'{PROJECT_LABEL}={project}']})
+        _, items = self._request('GET', '/containers/json', params)
+        result = []
+        for item in items:
+            labels = item.get('Labels') or {}
+            status = item.get('Status', '')
+            health = None
+            for value in ('healthy', 'unhealthy', 'starting'):
+                if f'({value})' in status or f'(health: {value})' in status:
+                    health = value
+                    break
+            result.append({
+                'id': item['Id'][:12],
+                'name': (item.get('Names') or ['/?'])[0].lstrip('/'),
+                'service': labels.get(SERVICE_LABEL),
+                'config_files': labels.get(CONFIG_FILES_LABEL, ''),
+                'image': item.get('Image'),
+                'state': item.get('State'),
+                'status': status,
+                'health': health,
+                'ports': sorted({f"{p['PublicPort']}->{p['PrivatePort']}/{p['Type']}"
+                                 for p in item.get('Ports', []) if p.get('PublicPort')}),
+            })
+        return sorted(result, key=lambda c: c['name'])
+
+    def inspect(self, name):
+        return self._request('GET', f'/containers/{quote(name)}/json')[1]
+
+    def start(self, name):
+        """Start container; False if it was already running"""
+        return self._request('POST', f'/containers/{quote(name)}/start')[0] != 304
+
+    def stop(self, name, timeout=STOP_TIMEOUT):
+        """Stop container; False if it was already stopped"""
+        return self._request('POST', f'/containers/{quote(name)}/stop', {'t': timeout})[0] != 304
+
+    def restart(self, name, timeout=STOP_TIMEOUT):
+        self._request('POST', f'/containers/{quote(name)}/restart', {'t': timeout})
+
+    def logs(self, name, follow=False, tail=100, timestamps=False):
+        """Generator of (stream, line) - uses its own connection, follow can block for hours"""
+        tty = bool(self.inspect(name).get('Config', {}).get('Tty'))
+        params = {'stdout': 1, 'stderr': 1, 'follow': int(follow), 'tail': tail,
+                  'timestamps': int(timestamps)}
+        conn = UnixHTTPConnection(self.socket_path, None if follow else self.timeout)
+        try:
+            conn.request('GET', self._url(f'/containers/{quote(name)}/logs', params))
+            response = conn.getresponse()
+        except OSError as e:
+            conn.close()
+            raise DockerError(0, f"Docker socket {self.socket_path}: {e}") from e
+        if response.status >= 400:
+            message = response.read().decode('utf-8', errors='replace')
+            conn.close()
+            raise DockerError(response.status, message.strip())
+        try:
+            yield from iter_log_lines(response, tty)
+        finally:
+            conn.close()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Revision history of .env for WAPRO Network Mock (webenv /save, wapro-cli config)
+
+A revision is the hash of the file content. The history is append-only
+JSON lines next to the file (.env.history) and stores only what each
+revision changed:
+
+    {"rev": "...", "parent": "...", "time": "...", "source": "webenv",
+     "changes": {"ZEBRA_1_HOST": ["192.168.1.10", "192.168.1.20"]}}
+
+[old, new] with null for an absent key. A full snapshot of the values is
+stored every SNAPSHOT_EVERY revisions and whenever the file was edited
+outside the store, so the values of any kept revision are rebuilt from the
+nearest snapshot. Only values are tracked - comments live in the file.
+
+Usage:
+    from envhistory import EnvHistory
+    history = EnvHistory('.env.history')
+    history.record(old_text, new_text, source='webenv')
+    history.config_at(rev)
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+from envstore import parse_env, revision
+
+HISTORY_MAX = 1000              # revisions kept; compacted down to HISTORY_KEEP past this
+HISTORY_KEEP = 500
+SNAPSHOT_EVERY = 50
+
+
+def diff_config(old, new):
+    """{KEY: [old, new]} of keys whose value differs (None = absent)"""
+    return {key: [old.get(key), new.get(key)]
+            for key in list(old) + [k for k in new if k not in old]
+            if old.get(key) != new.get(key)}
+
+
+def apply_changes(config, changes):
+    config = dict(config)
+    for key, (_, new) in changes.items():
+        if new is None:
+            config.pop(key, None)
+        else:
+            config[key] = new
+    return config
+
+
+class EnvHistory:
+    """Append-only revision log of one .env file (writers hold the store's file lock)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._stamp = None
+        self._entries = []
+
+    def _load(self):
+        # Other processes (wapro-cli) append too - re-read when the file changed
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp:
+            entries = []
+            if stamp is not None:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            continue
+            self._entries = entries
+            self._stamp = stamp
+        return self._entries
+
+    def record(self, old_text, new_text, source=''):
+        """Append the revision new_text replacing old_text"""
+        parent, rev = revision(old_text), revision(new_text)
+        if parent == rev:
+            return
+        now = datetime.now().isoformat(timespec='seconds')
+        old, new = parse_env(old_text), parse_env(new_text)
+        with self.lock:
+            entries = self._load()
+            lines = []
+            if not entries or entries[-1]['rev'] != parent:
+                # First revision, or the file was edited outside the store - anchor the chain
+                lines.append({'rev': parent, 'parent': entries[-1]['rev'] if entries else None,
+                              'time': now, 'source': 'external', 'snapshot': old})
+            entry = {'rev': rev, 'parent': parent, 'time': now, 'source': source,
+                     'changes': diff_config(old, new)}
+            if not lines and self._since_snapshot(entries) >= SNAPSHOT_EVERY:
+                entry['snapshot'] = new
+            lines.append(entry)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(line) + '\n' for line in lines)
+            entries = self._load()
+            if len(entries) > HISTORY_MAX:
+                self._compact(entries)
+
+    @staticmethod
+    def _since_snapshot(entries):
+        for count, entry in enumerate(reversed(entries)):
+            if 'snapshot' in entry:
+                return count
+        return len(entries)
+
+    def _rebuild(self, entries, index):
+        """Values at entries[index], None if no snapshot precedes it"""
+        start = index
+        while start >= 0 and 'snapshot' not in entries[start]:
+            start -= 1
+        if start < 0:
+            return None
+        config = dict(entries[start]['snapshot'])
+        for entry in entries[start + 1:index + 1]:
+            config = apply_changes(config, entry.get('changes', {}))
+        return config
+
+    def _compact(self, entries):
+        keep = [dict(entry) for entry in entries[-HISTORY_KEEP:]]
+        keep[0]['snapshot'] = self._rebuild(entries, len(entries) - HISTORY_KEEP) or {}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in keep)
+        os.replace(tmp, self.path)
+        self._stamp = None
+
+    def config_at(self, rev):
+        """Values of a recorded revision, None if it is not in the history"""
+        with self.lock:
+            entries = self._load()
+            for index in range(len(entries) - 1, -1, -1):
+                if entries[index]['rev'] == rev:
+                    return self._rebuild(entries, index)
+        return None
+
+    def log(self, limit=50):
+        """Newest revisions first: rev, parent, time, source, changed keys"""
+        with self.lock:
+            entries = self._load()[-limit:] if limit else self._load()
+            return [{'rev': e['rev'], 'parent': e['parent'], 'time': e['time'], 'source': e['source'],
+                     'changes': e.get('changes', {})} for e in reversed(entries)]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+.env schema for WAPRO Network Mock (wapro-cli config, webenv /save)
+The schema is derived from .env.example: every key gets a type from its
+name and example value (port, bool, host, cidr, enum, ...), and numbered
+groups (ZEBRA_1_*, ZEBRA_2_*, ...) become one pattern, so ZEBRA_7_HOST is
+checked like ZEBRA_1_HOST.
+
+Validators are compiled once per .env.example version - validating a whole
+file is a dict lookup and one precompiled check per key.
+
+Usage:
+    from envschema import get_schema
+    for issue in get_schema().validate(config):
+        print(issue)
+"""
+
+import os
+import re
+from dataclasses import dataclass
+
+from envstore import parse_env
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+ENV_EXAMPLE = os.path.join(PROJECT_DIR, '.env.example')
+
+# Used by docker-compose.yml without a default
+REQUIRED_KEYS = ('MSSQL_HOST', 'MSSQL_PASSWORD', 'ZEBRA_1_HOST', 'ZEBRA_2_HOST')
+ENUMS = {
+    'DOCKER_BACKEND': ('compose', 'api'),
+    'NODE_ENV': ('development', 'production', 'test'),
+}
+GROUP_RE = re.compile(r'^([A-Z]+)_(\d+)_([A-Z0-9_]+)$')
+
+_BOOL_VALUES = ('true', 'false')
+_IPV4_RE = re.compile(r'^(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}$')
+_HOSTNAME_RE = re.compile(r'^(?=.{1,253}$)[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?'
+                          r'(\.[A-Za-z0-9]([A-Za-z0-9-]{0,61}[A-Za-z0-9])?)*$')
+_PROJECT_RE = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+_CONTAINER_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+@dataclass
+class Issue:
+    key: str
+    message: str
+    level: str = 'error'        # error blocks the save, warning does not
+
+    def __str__(self):
+        return f"{self.key}: {self.message}"
+
+
+# Validators: value -> None if valid, else a message
+
+def _port(value):
+    if not value.isdigit() or not 1 <= int(value) <= 65535:
+        return f"'{value}' is not a port (1-65535)"
+
+
+def _bool(value):
+    if value.lower() not in _BOOL_VALUES:
+        return f"'{value}' is not true/false"
+
+
+def _host(value):
+    if _IPV4_RE.match(value):
+        return None
+    if value.replace('.', '').isdigit():
+        return f"'{value}' is not a valid IPv4 address"
+    if not _HOSTNAME_RE.match(value):
+        return f"'{value}' is not an IPv4 address or host name"
+
+
+def _cidr(value):
+    address, sep, prefix = value.partition('/')
+    if not sep or not _IPV4_RE.match(address) or not prefix.isdigit() or int(prefix) > 32:
+        return f"'{value}' is not a network (e.g. 192.168.9.0/24)"
+
+
+def _secret(value):
+    if not value:
+        return "must not be empty"
+
+
+def _project(value):
+    if not _PROJECT_RE.match(value):
+        return f"'{value}' - lowercase letters, digits, '-' and '_' only"
+
+
+def _container(value):
+    if not _CONTAINER_RE.match(value):
+        return f"'{value}' is not a valid container name"
+
+
+def _enum(choices):
+    def check(value):
+        if value not in choices:
+            return f"'{value}' is not one of: {', '.join(choices)}"
+    return check
+
+
+def _any(value):
+    return None
+
+
+def infer_validator(key, example):
+    """Validator for a key, from its name first and its example value second"""
+    name = GROUP_RE.sub(r'\3', key)
+    if key in ENUMS:
+        return _enum(ENUMS[key])
+    if key == 'COMPOSE_PROJECT_NAME':
+        return _project
+    if name.endswith('_PORT') or name == 'PORT':
+        return _port
+    if name.endswith('ENABLED') or example.lower() in _BOOL_VALUES:
+        return _bool
+    if name.endswith('_HOST') or name == 'HOST':
+        return _host
+    if name.endswith('SUBNET') or ('/' in example and _cidr(example) is None):
+        return _cidr
+    if 'PASSWORD' in name or 'SECRET' in name:
+        return _secret
+    if name.endswith('CONTAINER_NAME'):
+        return _container
+    return _any
+
+
+class Schema:
+    """Compiled validators of all keys known from .env.example"""
+
+    def __init__(self, example):
+        self.keys = {}          # KEY -> validator
+        self.groups = {}        # (PREFIX, SUFFIX) -> validator, e.g. ('ZEBRA', 'HOST')
+        for key, value in example.items():
+            validator = infer_validator(key, value)
+            match = GROUP_RE.match(key)
+            if match:
+                self.groups.setdefault((match.group(1), match.group(3)), validator)
+            else:
+                self.keys[key] = validator
+        self.known = set(example)
+
+    def validator(self, key):
+        """Validator for a key, None if the key is unknown"""
+        validator = self.keys.get(key)
+        if validator is None:
+            match = GROUP_RE.match(key)
+            if match:
+                validator = self.groups.get((match.group(1), match.group(3)))
+        return validator
+
+    def validate(self, config, keys=None):
+        """Issues of config; keys limits the check to those keys (no required-key check)"""
+        issues = []
+        for key in (config if keys is None else keys):
+            value = config.get(key, '')
+            validator = self.validator(key)
+            if validator is None:
+                issues.append(Issue(key, self._unknown(key), 'warning'))
+                continue
+            message = validator(value)
+            if message:
+                issues.append(Issue(key, message))
+        if keys is None:
+            for key in REQUIRED_KEYS:
+                if key not in config:
+                    issues.append(Issue(key, "required key is missing"))
+        return issues
+
+    def _unknown(self, key):
+        import difflib
+        close = difflib.get_close_matches(key, self.known, n=1, cutoff=0.8)
+        return f"unknown key (did you mean {close[0]}?)" if close else "unknown key"
+
+
+def errors(issues):
+    return [issue for issue in issues if issue.level == 'error']
+
+
+_schema = None
+_schema_stamp = None
+
+
+def get_schema(path=ENV_EXAMPLE):
+    """Schema of .env.example, recompiled only when the file changes"""
+    global _schema, _schema_stamp
+    try:
+        st = os.stat(path)
+        stamp = (path, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        stamp = (path, None, None)
+    if _schema is None or stamp != _schema_stamp:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                example = parse_env(f.read())
+        except FileNotFoundError:
+            example = {}
+        _schema = Schema(example)
+        _schema_stamp = stamp
+    return _schema
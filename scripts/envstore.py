@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Shared .env store for WAPRO Network Mock (wapro-cli, webenv, discover)
+
+- parsed mapping is cached until the file's mtime/size/inode changes
+- updates keep comments, blank lines and key order
+- writes go to a temp file renamed over .env (no torn files)
+- writers take an exclusive lock on .env.lock (concurrent editors)
+- every write is recorded in .env.history (envhistory); patch() applies
+  key-level changes made against a base revision, EnvConflict if the same
+  keys changed on disk since
+
+Usage:
+    from envstore import get_store
+    env = get_store()
+    env.get('MSSQL_HOST')
+    env.update({'ZEBRA_1_HOST': '192.168.9.165'})
+    env.patch(env.revision(), {'ZEBRA_1_HOST': ['192.168.9.165', '192.168.9.166']})
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:             # no flock (Windows) - only in-process locking
+    fcntl = None
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+ENV_FILE = os.path.join(PROJECT_DIR, '.env')
+KEY_PATTERN = r'^[A-Za-z_][A-Za-z0-9_]*$'
+
+# re, hashlib and the history are only needed to write or to compare revisions -
+# reading a key (wapro-cli config get) does not load them
+
+
+def revision(text):
+    """Short content hash identifying a version of the file"""
+    import hashlib
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def parse_env(text):
+    """KEY=VALUE pairs of .env content, in file order"""
+    config = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and '=' in line:
+            key, value = line.split('=', 1)
+            config[key.strip()] = value.strip()
+    return config
+
+
+def check_values(values):
+    """ValueError unless every key is a plain .env key and no value spans lines"""
+    import re
+    for key, value in values.items():
+        if not isinstance(key, str) or not re.match(KEY_PATTERN, key):
+            raise ValueError(f"invalid key: {key!r}")
+        if value is not None and ('\n' in str(value) or '\r' in str(value)):
+            raise ValueError(f"{key}: value must not contain line breaks")
+
+
+class EnvConflict(Exception):
+    """Keys of an edit changed on disk since its base revision"""
+
+    def __init__(self, revision, conflicts):
+        super().__init__(f"changed since base revision: {', '.join(c['key'] for c in conflicts) or '-'}")
+        self.revision = revision        # current revision of the file
+        self.conflicts = conflicts      # [{'key', 'base', 'theirs', 'mine'}]
+
+
+def merge_env(text, values):
+    """Content with values applied - changed lines replaced in place, new keys appended, None removes"""
+    pending = dict(values)
+    lines = []
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and '=' in stripped:
+            key, value = stripped.split('=', 1)
+            key = key.strip()
+            if key in pending:
+                new = pending.pop(key)
+                if new is None:
+                    continue
+                if str(new) != value.strip():
+                    line = f"{key}={new}\n"
+        lines.append(line)
+    pending = {key: value for key, value in pending.items() if value is not None}
+    if pending and lines and not lines[-1].endswith('\n'):
+        lines[-1] += '\n'
+    lines.extend(f"{key}={value}\n" for key, value in pending.items())
+    return ''.join(lines)
+
+
+class EnvStore:
+    """Cached reader and atomic, locked writer of one .env file"""
+
+    def __init__(self, path=ENV_FILE):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._history = None
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._text = ''
+        self._config = {}
+        self._revision = None           # hash of _text, computed when first asked for
+
+    @property
+    def history(self):
+        """EnvHistory of the file, created on first use (writes, /history)"""
+        if self._history is None:
+            from envhistory import EnvHistory
+            self._history = EnvHistory(self.path + '.history')
+        return self._history
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ''
+        self._stamp = stamp
+        self._text = text
+        self._config = parse_env(text)
+        self._revision = None
+
+    def _current_revision(self):
+        if self._revision is None:
+            self._revision = revision(self._text)
+        return self._revision
+
+    def text(self):
+        """Raw file content ('' if missing)"""
+        with self._lock:
+            self._refresh()
+            return self._text
+
+    def load(self):
+        """Parsed mapping (a copy - safe to modify)"""
+        with self._lock:
+            self._refresh()
+            return dict(self._config)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._config.get(key, default)
+
+    def revision(self):
+        """Hash of the current content - the base for patch()"""
+        with self._lock:
+            self._refresh()
+            return self._current_revision()
+
+    def snapshot(self):
+        """(text, revision) read together"""
+        with self._lock:
+            self._refresh()
+            return self._text, self._current_revision()
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock shared with other processes editing the same file"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, text, source=''):
+        """Write via temp file + rename, keeping the file mode (caller holds the lock, refreshed)"""
+        import tempfile
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.env.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.chmod(tmp, os.stat(self.path).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(tmp, 0o644)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        self.history.record(self._text, text, source)
+        self._stamp = None
+
+    def write_text(self, text, base=None, source=''):
+        """Replace the whole file; with base, only if nothing changed since (else EnvConflict)"""
+        with self.locked():
+            self._stamp = None
+            self._refresh()
+            if base is not None and base != self._current_revision():
+                raise EnvConflict(self._revision, self._conflicts(base, parse_env(text)))
+            if text != self._text:
+                self._write(text, source)
+            return revision(text)
+
+    def _conflicts(self, base, mine):
+        """Keys changed on both sides since base, to different values (all differing keys if base is unknown)"""
+        base_config = self.history.config_at(base)
+        theirs = self._config
+        conflicts = []
+        for key in list(theirs) + [k for k in mine if k not in theirs]:
+            if mine.get(key) == theirs.get(key):
+                continue
+            if base_config is not None and base_config.get(key) in (theirs.get(key), mine.get(key)):
+                continue                # changed on one side only
+            conflicts.append({'key': key, 'base': base_config.get(key) if base_config else None,
+                              'theirs': theirs.get(key), 'mine': mine.get(key)})
+        return conflicts
+
+    def patch(self, base, changes, source=''):
+        """Apply {KEY: [old, new]} (None = absent) made against revision base; returns the new revision
+
+        Keys changed on disk since base are a conflict unless they already
+        hold the new value; any conflict rejects the whole patch (EnvConflict).
+        """
+        check_values({key: new for key, (old, new) in changes.items()})
+        with self.locked():
+            self._stamp = None
+            self._refresh()
+            if base != self._current_revision():
+                conflicts = [{'key': key, 'base': old, 'theirs': self._config.get(key), 'mine': new}
+                             for key, (old, new) in changes.items()
+                             if self._config.get(key) not in (old, new)]
+                if conflicts:
+                    raise EnvConflict(self._revision, conflicts)
+            text = merge_env(self._text, {key: new for key, (old, new) in changes.items()})
+            if text == self._text:
+                return self._current_revision()
+            self._write(text, source)
+            return revision(text)
+
+    def update(self, values, source=''):
+        """Set keys, preserving comments and order; returns True if the file changed"""
+        check_values(values)
+        with self.locked():
+            self._stamp = None
+            self._refresh()
+            text = merge_env(self._text, values)
+            if text == self._text:
+                return False
+            self._write(text, source)
+            return True
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=ENV_FILE):
+    """Process-wide store of a .env file - one cache per path"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EnvStore(path)
+        return _stores[path]
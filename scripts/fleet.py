@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Fleet mode for WAPRO Network Mock (wapro-cli fleet)
+Runs health / status / config / discover on many Raspberry Pi sites at once
+through the webenv admin API of each site.
+
+All sites are driven from one asyncio loop: per-site keep-alive connection
+pools, a per-site timeout (a dead site never stalls the others) and a cap on
+requests in flight. Results come back as one row per site.
+
+Inventory (fleet.conf, one site per line, # comments):
+    # name        url                         [token]
+    sklep-1       http://192.168.1.50:8888    s3cret
+    sklep-2       http://10.8.0.12:8888
+    sklep-3       https://vpn.example.pl/sklep-3/     # webenv behind a proxy path
+
+Usage:
+    from fleet import load_inventory, run_fleet
+    for r in run_fleet(load_inventory(), 'health'):
+        print(r.site.name, r.ok, r.elapsed_ms)
+"""
+
+import os
+import ssl
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+INVENTORY_FILE = os.path.join(PROJECT_DIR, 'fleet.conf')
+
+FLEET_TIMEOUT = 10
+DISCOVER_TIMEOUT = 120          # a quick scan takes tens of seconds on a Pi
+DISCOVER_POLL = 1.0             # seconds between checks of a running discovery task
+FLEET_CONCURRENCY = 32          # requests in flight over the whole fleet
+POOL_SIZE = 2                   # idle keep-alive connections kept per site
+
+ACTIONS = ('health', 'status', 'config', 'discover')
+
+
+class FleetError(Exception):
+    """Site answered, but not with a usable result"""
+
+
+@dataclass
+class Site:
+    name: str
+    url: str
+    token: str = ''
+
+    @property
+    def address(self):
+        parts = urlsplit(self.url if '://' in self.url else f'http://{self.url}')
+        tls = parts.scheme == 'https'
+        return parts.hostname or 'localhost', parts.port or (443 if tls else 80), tls
+
+    @property
+    def prefix(self):
+        """Path of the webenv behind a reverse proxy ('/sklep-3'), '' at the root"""
+        return urlsplit(self.url if '://' in self.url else f'http://{self.url}').path.rstrip('/')
+
+
+@dataclass
+class SiteResult:
+    site: Site
+    ok: bool
+    elapsed: float
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round(self.elapsed * 1000, 1)
+
+
+def load_inventory(path=None):
+    """Sites of an inventory file; token defaults to WEBENV_ADMIN_TOKEN"""
+    path = path or os.environ.get('WAPRO_FLEET', INVENTORY_FILE)
+    default_token = os.environ.get('WEBENV_ADMIN_TOKEN', '')
+    sites = []
+    names = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) < 2 or len(fields) > 3:
+                raise ValueError(f"{path}:{number}: expected 'name url [token]'")
+            name, url = fields[:2]
+            if name in names:
+                raise ValueError(f"{path}:{number}: duplicate site '{name}'")
+            names.add(name)
+            sites.append(Site(name, url.rstrip('/'), fields[2] if len(fields) == 3 else default_token))
+    return sites
+
+
+class SitePool:
+    """Idle keep-alive connections to one site"""
+
+    def __init__(self, site, size=POOL_SIZE):
+        self.host, self.port, self.tls = site.address
+        self.size = size
+        self.idle = []
+
+    async def acquire(self):
+        """(reader, writer, reused)"""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        context = ssl.create_default_context() if self.tls else None
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+        return reader, writer, False
+
+    def release(self, reader, writer, keep):
+        if keep and len(self.idle) < self.size and not writer.is_closing():
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+async def _read_response(reader):
+    """(status, headers, body, keep_alive) of one HTTP/1.x response"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed by site')
+    version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+
+    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return int(status), headers, body, keep_alive
+
+
+class FleetClient:
+    """Async HTTP/1.1 client for the webenv admin API of many sites"""
+
+    def __init__(self, timeout=FLEET_TIMEOUT, concurrency=FLEET_CONCURRENCY):
+        self.timeout = timeout
+        self.pools = {}
+        self.limit = asyncio.Semaphore(concurrency)
+
+    def _pool(self, site):
+        if site.name not in self.pools:
+            self.pools[site.name] = SitePool(site)
+        return self.pools[site.name]
+
+    async def _exchange(self, site, method, path, params):
+        pool = self._pool(site)
+        query = urlencode(params or {}, doseq=True)
+        path = site.prefix + path
+        body = b''
+        if method == 'GET' and query:
+            path += '?' + query
+        elif query:
+            body = query.encode()
+        head = [f"{method} {path} HTTP/1.1", f"Host: {pool.host}:{pool.port}",
+                "Connection: keep-alive", "Accept: application/json"]
+        if site.token:
+            head.append(f"X-Admin-Token: {site.token}")
+        if method != 'GET':
+            head += ["Content-Type: application/x-www-form-urlencoded", f"Content-Length: {len(body)}"]
+        request = ('\r\n'.join(head) + '\r\n\r\n').encode() + body
+
+        for attempt in range(2):
+            reader, writer, reused = await pool.acquire()
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, _, data, keep_alive = await _read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                writer.close()
+                # A kept-alive connection the site already dropped - retry once on a fresh one
+                if not reused or attempt:
+                    raise
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            pool.release(reader, writer, keep_alive)
+            return status, data
+
+    async def request(self, site, method, path, params=None, timeout=None):
+        """JSON body of a webenv response; FleetError unless it reports success"""
+        async with self.limit:
+            status, data = await asyncio.wait_for(self._exchange(site, method, path, params),
+                                                  timeout or self.timeout)
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            raise FleetError(f"HTTP {status}: not a JSON response")
+        if status >= 400 or not payload.get('success', False):
+            raise FleetError(payload.get('error') or f"HTTP {status}")
+        return payload
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+        self.pools.clear()
+
+
+# =============================================================================
+# ACTIONS
+# =============================================================================
+
+async def _health(client, site, args):
+    checks = (await client.request(site, 'GET', '/admin/health'))['checks']
+    failed = [c['name'] for c in checks if not c['ok']]
+    latencies = [c['latency_ms'] for c in checks if c['latency_ms'] is not None]
+    return {'checks': checks, 'passed': len(checks) - len(failed), 'total': len(checks),
+            'failed': failed, 'max_latency_ms': max(latencies) if latencies else None}
+
+
+async def _status(client, site, args):
+    return (await client.request(site, 'GET', '/admin/status'))['state']
+
+
+def check_args(action, args):
+    """ValueError before any site is contacted - a typo must not run on the whole fleet"""
+    if action != 'config' or not args:
+        return
+    if args[0] not in ('get', 'set'):
+        raise ValueError(f"Unknown fleet config command: {args[0]} (usage: config [get KEY...|set KEY=VALUE...])")
+    if args[0] == 'set' and (len(args) < 2 or any('=' not in pair for pair in args[1:])):
+        raise ValueError('usage: config set KEY=VALUE [...]')
+
+
+async def _config(client, site, args):
+    if args and args[0] == 'set':
+        pairs = args[1:]
+        payload = await client.request(site, 'POST', '/admin/config', {'set': pairs})
+        return {'changed': payload['changed'], 'keys': payload['keys']}
+    keys = args[1:]
+    payload = await client.request(site, 'GET', '/admin/config', {'key': keys} if keys else None)
+    return {'config': payload['config'], 'keys': keys}
+
+
+async def _wait_discovery(client, site):
+    # webenv scans in the background - start (or join) the scan, then poll its task
+    payload = await client.request(site, 'GET', '/discover')
+    while payload['task']['state'] == 'running':
+        await asyncio.sleep(DISCOVER_POLL)
+        payload = await client.request(site, 'GET', '/discover', {'task': payload['task']['id']})
+    if payload['task']['state'] != 'done':
+        raise FleetError(payload['task'].get('error') or 'discovery failed')
+    return payload['devices']
+
+
+async def _discover(client, site, args):
+    devices = await asyncio.wait_for(_wait_discovery(client, site), max(client.timeout, DISCOVER_TIMEOUT))
+    groups = devices.get('devices', {})
+    return {'devices': groups, 'counts': {group: len(items) for group, items in groups.items()}}
+
+
+ACTION_HANDLERS = {
+    'health': _health,
+    'status': _status,
+    'config': _config,
+    'discover': _discover,
+}
+
+
+async def _run_site(client, site, handler, args):
+    started = time.monotonic()
+    try:
+        data = await handler(client, site, args)
+        # Reachable, but with failing health checks, is still a failing site
+        return SiteResult(site, not data.get('failed'), time.monotonic() - started, data)
+    except asyncio.TimeoutError:
+        error = 'timeout'
+    except (OSError, asyncio.IncompleteReadError) as e:
+        error = f"offline ({e.strerror or e})" if isinstance(e, OSError) else 'connection closed'
+    except (FleetError, ValueError, KeyError) as e:
+        error = str(e)
+    return SiteResult(site, False, time.monotonic() - started, error=error)
+
+
+async def run_fleet_async(sites, action, args=(), timeout=FLEET_TIMEOUT, concurrency=FLEET_CONCURRENCY):
+    handler = ACTION_HANDLERS[action]
+    client = FleetClient(timeout, concurrency)
+    try:
+        return list(await asyncio.gather(*(_run_site(client, site, handler, list(args)) for site in sites)))
+    finally:
+        client.close()
+
+
+def run_fleet(sites, action, args=(), timeout=FLEET_TIMEOUT, concurrency=FLEET_CONCURRENCY) -> List[SiteResult]:
+    """Results in inventory order - total time is the slowest site, not the sum"""
+    if action not in ACTION_HANDLERS:
+        raise ValueError(f"Unknown fleet action: {action} (one of: {', '.join(ACTIONS)})")
+    check_args(action, list(args))
+    return asyncio.run(run_fleet_async(sites, action, args, timeout, concurrency))
+
+
+# =============================================================================
+# OUTPUT
+# =============================================================================
+
+def summary(result, action):
+    """One-line description of a site result for the fleet table"""
+    if result.data is None:
+        return result.error
+    data = result.data
+    if action == 'health':
+        text = f"{data['passed']}/{data['total']} OK"
+        if data['max_latency_ms'] is not None:
+            text += f", max {data['max_latency_ms']:.1f} ms"
+        if data['failed']:
+            text += f" - FAIL: {', '.join(data['failed'])}"
+        return text
+    if action == 'status':
+        if not data.get('target'):
+            return 'idle'
+        state = 'running' if data.get('running') else f"exit {data.get('exit_code')}"
+        text = f"make {data['target']} ({state}, started {data.get('started_at') or '-'})"
+        if data.get('queued'):
+            text += f", {data['queued']} queued"
+        return text
+    if action == 'config':
+        if 'changed' in data:
+            return f"{'changed' if data['changed'] else 'unchanged'}: {', '.join(data['keys'])}"
+        config = data['config']
+        if not data['keys']:
+            return f"{len(config)} keys"
+        return '  '.join(f"{key}={config.get(key, '(unset)')}" for key in data['keys'])
+    if action == 'discover':
+        return ', '.join(f"{group}: {count}" for group, count in data['counts'].items() if count) \
+            or 'no devices'
+    return json.dumps(data)
+
+
+def format_table(results, action):
+    """Aligned rows: site, result, time, details"""
+    width = max([len(r.site.name) for r in results] + [4])
+    lines = [f"{'SITE':<{width}}  {'RESULT':<6}  {'TIME':>9}  DETAILS"]
+    for r in results:
+        lines.append(f"{r.site.name:<{width}}  {'OK' if r.ok else 'FAIL':<6}  "
+                     f"{r.elapsed_ms:>6.1f} ms  {summary(r, action)}")
+    return lines
+
+
+def to_json(results):
+    return [{'site': r.site.name, 'url': r.site.url, 'ok': r.ok, 'elapsed_ms': r.elapsed_ms,
+             'data': r.data, 'error': r.error} for r in results]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Health checks for WAPRO Network Mock (wapro-cli health / health --watch)
+All endpoints are checked concurrently, each result carries its latency.
+
+Checks:
+    http - GET on RPI /health and Zebra mock /api/status (keep-alive session)
+    tcp  - MSSQL port reachability (connect time)
+    zpl  - Zebra socket port, ~HS host status query over a kept-open socket
+
+Usage:
+    from health import HealthChecker, checks_from_env
+    with HealthChecker(checks_from_env(config)) as checker:
+        for result in checker.run():
+            print(result.name, result.status, result.latency_ms)
+"""
+
+import json
+import time
+import socket
+import threading
+import http.client
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+HEALTH_TIMEOUT = 3
+HEALTH_WORKERS = 8
+WATCH_INTERVAL = 5
+HS_FRAMES = 3                   # a Zebra answers ~HS with three STX...ETX strings
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one check"""
+    name: str
+    kind: str
+    target: str
+    ok: bool
+    status: str                         # OK, HTTP 503, OFFLINE, TIMEOUT
+    latency: Optional[float] = None     # seconds, None when unreachable
+    error: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None   # JSON body / parsed ~HS reply
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        return None if self.latency is None else round(self.latency * 1000, 1)
+
+
+def _failure(error):
+    return 'TIMEOUT' if isinstance(error, socket.timeout) else 'OFFLINE'
+
+
+class HttpSession:
+    """Keep-alive HTTP/1.1 connections, one per host:port, shared by all checks"""
+
+    def __init__(self, timeout=HEALTH_TIMEOUT):
+        self.timeout = timeout
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def _connection(self, host, port):
+        with self._lock:
+            key = (host, port)
+            if key not in self._conns:
+                self._conns[key] = (http.client.HTTPConnection(host, port, timeout=self.timeout),
+                                    threading.Lock())
+            return self._conns[key]
+
+    def get(self, host, port, path):
+        """GET path -> (status, body bytes, seconds); reconnects once if the kept connection died"""
+        conn, lock = self._connection(host, port)
+        with lock:
+            for attempt in range(2):
+                reused = conn.sock is not None
+                started = time.monotonic()
+                try:
+                    conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                    response = conn.getresponse()
+                    body = response.read()
+                    elapsed = time.monotonic() - started
+                    if response.will_close:
+                        conn.close()
+                    return response.status, body, elapsed
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    if not reused or attempt:
+                        raise
+
+    def close(self):
+        with self._lock:
+            for conn, _ in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+
+class HttpCheck:
+    kind = 'http'
+
+    def __init__(self, name, host, port, path, session):
+        self.name = name
+        self.host = host
+        self.port = int(port)
+        self.path = path
+        self.session = session
+        self.target = f"http://{host}:{port}{path}"
+
+    def run(self):
+        try:
+            status, body, elapsed = self.session.get(self.host, self.port, self.path)
+        except (http.client.HTTPException, OSError) as e:
+            return CheckResult(self.name, self.kind, self.target, False, _failure(e), error=str(e))
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        ok = status == 200
+        return CheckResult(self.name, self.kind, self.target, ok, 'OK' if ok else f"HTTP {status}",
+                           elapsed, data=data if isinstance(data, dict) else None)
+
+    def close(self):
+        pass
+
+
+class TcpCheck:
+    """Port reachability - a fresh connect each time (idle sockets prove nothing)"""
+    kind = 'tcp'
+
+    def __init__(self, name, host, port, timeout=HEALTH_TIMEOUT):
+        self.name = name
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.target = f"{host}:{port}"
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                elapsed = time.monotonic() - started
+        except OSError as e:
+            return CheckResult(self.name, self.kind, self.target, False, _failure(e), error=str(e))
+        return CheckResult(self.name, self.kind, self.target, True, 'OK', elapsed)
+
+    def close(self):
+        pass
+
+
+def _hs_complete(reply):
+    """~HS reply fully read: three STX...ETX frames (Zebra) or one line (mock)"""
+    if reply.lstrip().startswith(b'\x02'):
+        return reply.count(b'\x03') >= HS_FRAMES
+    return b'\n' in reply
+
+
+class ZplCheck:
+    """Zebra socket - ~HS round trip on a socket kept open between runs"""
+    kind = 'zpl'
+
+    def __init__(self, name, host, port, timeout=HEALTH_TIMEOUT):
+        self.name = name
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.target = f"{host}:{port}"
+        self.sock = None
+
+    def _drain(self):
+        # Bytes left over from an earlier reply would be read as this one
+        self.sock.setblocking(False)
+        try:
+            while self.sock.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        finally:
+            self.sock.settimeout(self.timeout)
+
+    def _query(self):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        else:
+            self._drain()
+        self.sock.sendall(b'~HS\r\n')
+        # The frames may arrive in several segments - read until all are in or time runs out
+        deadline = time.monotonic() + self.timeout
+        reply = b''
+        while not _hs_complete(reply):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout('incomplete ~HS reply')
+            self.sock.settimeout(remaining)
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                raise ConnectionResetError('connection closed by printer')
+            reply += chunk
+        self.sock.settimeout(self.timeout)
+        return reply.replace(b'\x02', b'').replace(b'\x03', b'').decode('utf-8', errors='ignore').strip()
+
+    def run(self):
+        for attempt in range(2):
+            reused = self.sock is not None
+            started = time.monotonic()
+            try:
+                reply = self._query()
+                elapsed = time.monotonic() - started
+                break
+            except OSError as e:
+                self.close()
+                if not reused or attempt:
+                    return CheckResult(self.name, self.kind, self.target, False, _failure(e), error=str(e))
+
+        # Mock: "STATUS:READY,JOBS:3"
+        data = dict(part.split(':', 1) for part in reply.split(',') if ':' in part)
+        return CheckResult(self.name, self.kind, self.target, True, 'OK', elapsed, data=data or None)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+def checks_from_env(config, session=None, host='localhost'):
+    """Checks of all services exposed on this host, ports taken from .env"""
+    session = session or HttpSession()
+    checks = [
+        HttpCheck('RPI GUI', host, config.get('RPI_GUI_EXTERNAL_PORT', '8082'), '/health', session),
+        HttpCheck('RPI API', host, config.get('RPI_API_EXTERNAL_PORT', '8081'), '/health', session),
+    ]
+    for i, default_web in ((1, '8091'), (2, '8092')):
+        prefix = f'ZEBRA_{i}_'
+        if config.get(prefix + 'ENABLED', 'true').lower() == 'false':
+            continue
+        checks.append(HttpCheck(f'Zebra {i}', host, config.get(prefix + 'EXTERNAL_WEB_PORT', default_web),
+                                '/api/status', session))
+        checks.append(ZplCheck(f'Zebra {i} ZPL', host,
+                               config.get(prefix + 'EXTERNAL_SOCKET_PORT', str(9099 + i))))
+    if config.get('MSSQL_ENABLED', 'true').lower() != 'false':
+        checks.append(TcpCheck('MSSQL', host, config.get('MSSQL_EXTERNAL_PORT', '1433')))
+    return checks
+
+
+class HealthChecker:
+    """Runs all checks concurrently; keep it open in watch mode to reuse connections"""
+
+    def __init__(self, checks, workers=HEALTH_WORKERS, close_sessions=True):
+        self.checks = checks
+        self.close_sessions = close_sessions
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(checks))))
+
+    def run(self) -> List[CheckResult]:
+        """Results in check order - total time is the slowest check, not the sum"""
+        return list(self.executor.map(lambda check: check.run(), self.checks))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        sessions = set()
+        for check in self.checks:
+            check.close()
+            if isinstance(check, HttpCheck):
+                sessions.add(check.session)
+        if self.close_sessions:
+            for session in sessions:
+                session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
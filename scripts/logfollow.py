@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Streaming log follower for WAPRO Network Mock (wapro-cli logs)
+Multiplexes several services, filters lines incrementally (regex, minimum
+level) and keeps per-service lines/sec and error rates on the fly.
+
+Memory is bounded no matter how long it follows: producers block on a
+fixed-size queue and rate stats live in a fixed window of 1 s buckets.
+
+Sources:
+    compose_source()  - one `docker-compose logs -f` process, "service | line"
+    docker_source()   - one Docker API stream per container (dockerapi)
+"""
+
+import re
+import time
+import queue
+import threading
+import subprocess
+from collections import deque
+
+MAX_QUEUE = 1000                # lines waiting for the printer
+STATS_WINDOW = 60               # seconds of per-second buckets kept per service
+RATE_WINDOW = 10                # seconds averaged for lines/sec
+
+LEVELS = {'debug': 10, 'info': 20, 'warn': 30, 'error': 40, 'fatal': 50}
+LEVEL_NAMES = {
+    'DEBUG': 'debug', 'TRACE': 'debug',
+    'INFO': 'info', 'NOTICE': 'info',
+    'WARN': 'warn', 'WARNING': 'warn',
+    'ERR': 'error', 'ERROR': 'error',
+    'CRITICAL': 'fatal', 'FATAL': 'fatal', 'PANIC': 'fatal',
+}
+LEVEL_RE = re.compile(r'\b(' + '|'.join(LEVEL_NAMES) + r')\b', re.IGNORECASE)
+COMPOSE_LINE_RE = re.compile(r'^(\S+)\s+\| ?(.*)$')
+
+_EOF = object()
+
+
+def line_level(line):
+    """Numeric level of the first level word in a line, None if there is none"""
+    match = LEVEL_RE.search(line)
+    if not match:
+        return None
+    return LEVELS[LEVEL_NAMES[match.group(1).upper()]]
+
+
+class ServiceStats:
+    """Counters and a sliding window of per-second buckets for one service"""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.lines = 0
+        self.errors = 0
+        self.shown = 0
+        self.buckets = deque(maxlen=window)     # [second, lines, errors]
+
+    def add(self, level, now):
+        second = int(now)
+        is_error = level is not None and level >= LEVELS['error']
+        self.lines += 1
+        self.errors += is_error
+        if self.buckets and self.buckets[-1][0] == second:
+            bucket = self.buckets[-1]
+        else:
+            bucket = [second, 0, 0]
+            self.buckets.append(bucket)
+        bucket[1] += 1
+        bucket[2] += is_error
+
+    def rates(self, now, window=RATE_WINDOW):
+        """(lines/sec, errors/sec) over the last `window` seconds"""
+        since = int(now) - window
+        lines = sum(b[1] for b in self.buckets if b[0] > since)
+        errors = sum(b[2] for b in self.buckets if b[0] > since)
+        return lines / window, errors / window
+
+    @property
+    def error_ratio(self):
+        return self.errors / self.lines if self.lines else 0.0
+
+
+class LogFollower:
+    """Reads (service, line) from sources in threads, filters and counts in the caller's thread"""
+
+    def __init__(self, pattern=None, level=None, max_queue=MAX_QUEUE):
+        self.pattern = re.compile(pattern) if pattern else None
+        self.min_level = LEVELS[level] if level else None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {}
+        self.sources = 0
+        self.stopped = threading.Event()
+        self.processes = []
+
+    def _put(self, item):
+        # Blocks while the consumer is behind (bounded memory), wakes up to notice stop()
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def add_source(self, lines):
+        """Follow an iterator of (service, line) in a background thread"""
+        def pump():
+            try:
+                for service, line in lines:
+                    if not self._put((service, line)):
+                        return
+            except Exception as e:
+                self._put(('follower', f"ERROR source failed: {e}"))
+            finally:
+                self._put(_EOF)
+        self.sources += 1
+        threading.Thread(target=pump, daemon=True).start()
+
+    def matches(self, line, level):
+        if self.min_level is not None and (level is None or level < self.min_level):
+            return False
+        if self.pattern is not None and not self.pattern.search(line):
+            return False
+        return True
+
+    def run(self, on_line, on_stats=None, stats_interval=None):
+        """Consume until all sources end or stop(); on_line(service, line, level) for matching lines"""
+        open_sources = self.sources
+        next_stats = time.monotonic() + stats_interval if stats_interval else None
+        while open_sources and not self.stopped.is_set():
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            now = time.time()
+            if item is _EOF:
+                open_sources -= 1
+            elif item is not None:
+                service, line = item
+                level = line_level(line)
+                stats = self.stats.get(service)
+                if stats is None:
+                    stats = self.stats[service] = ServiceStats()
+                stats.add(level, now)
+                if self.matches(line, level):
+                    stats.shown += 1
+                    on_line(service, line, level)
+            if next_stats is not None and time.monotonic() >= next_stats:
+                on_stats(self.snapshot(now))
+                next_stats = time.monotonic() + stats_interval
+
+    def snapshot(self, now=None):
+        """{service: {'lines', 'errors', 'shown', 'lines_per_sec', 'errors_per_sec', 'error_ratio'}}"""
+        now = now or time.time()
+        result = {}
+        for service, stats in sorted(self.stats.items()):
+            lines_per_sec, errors_per_sec = stats.rates(now)
+            result[service] = {
+                'lines': stats.lines,
+                'errors': stats.errors,
+                'shown': stats.shown,
+                'lines_per_sec': round(lines_per_sec, 2),
+                'errors_per_sec': round(errors_per_sec, 2),
+                'error_ratio': round(stats.error_ratio, 4),
+            }
+        return result
+
+    def stop(self):
+        self.stopped.set()
+        for proc in self.processes:
+            if proc.poll() is None:
+                proc.terminate()
+
+
+def compose_source(follower, cmd, cwd=None):
+    """Lines of `docker-compose logs -f --no-color` split into (service, line)"""
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1, errors='replace')
+    follower.processes.append(proc)
+
+    def lines():
+        try:
+            for raw in proc.stdout:
+                raw = raw.rstrip('\n')
+                match = COMPOSE_LINE_RE.match(raw)
+                if match:
+                    yield match.group(1), match.group(2)
+                elif raw:
+                    yield 'docker-compose', raw
+        finally:
+            proc.stdout.close()
+            proc.wait()
+    return lines()
+
+
+def docker_source(docker, container, name=None, tail=100):
+    """Lines of one container over the Docker Engine API"""
+    name = name or container
+    for _, line in docker.logs(container, follow=True, tail=tail):
+        yield name, line
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+make job queue for WAPRO Network Mock (webenv /admin/run, /admin/jobs)
+
+- every request becomes a job with an id: queued -> running -> done
+- exclusive targets (start, stop, prod...) run one at a time, in order;
+  independent read-only targets (status, health) run next to them, up to
+  WEBENV_MAKE_PARALLEL at once
+- each job writes its own log file, capped by size with rotation
+- finished jobs are kept in a bounded history (logs/webenv_jobs.jsonl)
+- all output also goes to one combined log (MakeLog): buffered writes on a
+  single handle, size-rotated segments and an index of run headers
+
+Usage:
+    from makejobs import JobQueue
+    jobs = JobQueue(['status', 'start'], on_output=print)
+    job = jobs.submit('status')
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+
+# Configuration
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+JOB_LOG_DIR = os.path.join(PROJECT_DIR, 'logs', 'make-jobs')
+HISTORY_FILE = os.path.join(PROJECT_DIR, 'logs', 'webenv_jobs.jsonl')
+MAKE_LOG_FILE = os.path.join(PROJECT_DIR, 'logs', 'webenv_make.log')
+
+MAKE_PARALLEL = int(os.getenv('WEBENV_MAKE_PARALLEL', '2'))
+INDEPENDENT_TARGETS = {'status', 'health', 'prod-status'}
+MAX_QUEUED = 20
+MAKE_HISTORY = 100
+JOB_LOG_MAX_BYTES = 512 * 1024
+JOB_LOG_BACKUPS = 1
+MAKE_LOG_MAX_BYTES = 1024 * 1024    # per segment of the combined log
+MAKE_LOG_SEGMENTS = 5               # rotated segments kept besides the current one
+MAKE_LOG_FLUSH = 1.0                # seconds output may sit in the write buffer
+
+# "===== 2024-05-01T10:00:00 | make status | job 12 =====" (job is absent in old logs)
+RUN_HEADER_RE = re.compile(rb'^===== (\S+) \| make (\S+)(?: \| job (\d+))? =====$', re.MULTILINE)
+
+
+class QueueFull(Exception):
+    """Too many jobs waiting"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class RotatingLog:
+    """Append-only file on one open handle, rolled over to path.1.. past max_bytes"""
+
+    def __init__(self, path, max_bytes=JOB_LOG_MAX_BYTES, backups=JOB_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+
+    def write(self, data):
+        if self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        self.file.write(data)
+        self.size += len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self.file = open(self.path, 'ab')
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+def read_tail(path, max_bytes):
+    """Last max_bytes of a file ('' if missing) - one seek, one read"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_bytes))
+            return f.read().decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        return ''
+
+
+class MakeLog:
+    """Combined make log: buffered single-handle writer, rotated segments, run index
+
+    Offsets are logical and keep growing across rotations - a rotated segment
+    is named after the offset of its first byte (webenv_make.log.<offset>), so
+    an offset stays valid for as long as its segment is kept. Run headers are
+    indexed in <log>.idx, so reading any past run is one seek.
+    """
+
+    def __init__(self, path=MAKE_LOG_FILE, max_bytes=MAKE_LOG_MAX_BYTES,
+                 segments=MAKE_LOG_SEGMENTS, flush_interval=MAKE_LOG_FLUSH, job_log_dir=JOB_LOG_DIR):
+        self.path = path
+        self.job_log_dir = job_log_dir
+        self.index_path = path + '.idx'
+        self.max_bytes = max_bytes
+        self.segments = segments
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.dirty = threading.Event()          # unflushed output - wakes the flusher thread
+        self.flusher = None
+        self.closed = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.rotated = self._find_rotated()         # [(start offset, path)], oldest first
+        self.base = 0
+        if self.rotated:
+            start, rotated_path = self.rotated[-1]
+            self.base = start + os.path.getsize(rotated_path)
+        self.file = open(path, 'ab', buffering=64 * 1024)
+        self.end = self.base + self.file.tell()
+        self.runs = self._load_index()
+
+    @property
+    def start(self):
+        """Oldest offset still on disk"""
+        return self.rotated[0][0] if self.rotated else self.base
+
+    def _find_rotated(self):
+        directory, name = os.path.split(self.path)
+        rotated = []
+        for entry in os.listdir(directory):
+            suffix = entry[len(name) + 1:]
+            if entry.startswith(name + '.') and suffix.isdigit():
+                rotated.append((int(suffix), os.path.join(directory, entry)))
+        return sorted(rotated)
+
+    def _segments(self):
+        return self.rotated + [(self.base, self.path)]
+
+    def _load_index(self):
+        runs = []
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        runs.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        if not runs and self.end > self.start or runs and runs[-1]['offset'] >= self.end:
+            runs = self._scan_headers()         # index missing or out of step with the log
+            self._write_index(runs)
+        return [run for run in runs if run['offset'] >= self.start]
+
+    def _scan_headers(self):
+        runs = []
+        for start, path in self._segments():
+            with open(path, 'rb') as f:
+                for match in RUN_HEADER_RE.finditer(f.read()):
+                    runs.append(self._run_entry(start + match.start(), match))
+        return runs
+
+    @staticmethod
+    def _run_entry(offset, match):
+        job = match.group(3)
+        return {'offset': offset, 'time': match.group(1).decode(), 'target': match.group(2).decode(),
+                'job': int(job) if job else None}
+
+    def _write_index(self, runs):
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(run) + '\n' for run in runs)
+        os.replace(tmp, self.index_path)
+
+    def write(self, data):
+        """Append bytes; returns the end offset"""
+        with self.lock:
+            size = self.end - self.base
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            boundary = data.startswith((b'\n=====', b'====='))
+            if boundary:
+                match = RUN_HEADER_RE.search(data)
+                if match:
+                    run = self._run_entry(self.end + match.start(), match)
+                    self.runs.append(run)
+                    with open(self.index_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(run) + '\n')
+            self.file.write(data)
+            self.end += len(data)
+            if boundary:
+                self.flush()            # run start/end - readers of the file see it now
+            elif not self.dirty.is_set():
+                self.dirty.set()
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self._flush_loop, name='make-log-flush', daemon=True)
+                    self.flusher.start()
+            return self.end
+
+    def _flush_loop(self):
+        # One thread for the log's lifetime: flush_interval after output first sits in the buffer
+        while True:
+            self.dirty.wait()
+            if self.closed:
+                return
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.dirty.clear()
+            if not self.file.closed:
+                self.file.flush()
+
+    def _rotate(self):
+        self.flush()
+        self.file.close()
+        rotated_path = f"{self.path}.{self.base}"
+        os.replace(self.path, rotated_path)
+        self.rotated.append((self.base, rotated_path))
+        self.base = self.end
+        self.file = open(self.path, 'ab', buffering=64 * 1024)
+        while len(self.rotated) > self.segments:
+            _, oldest = self.rotated.pop(0)
+            os.unlink(oldest)
+        if self.runs and self.runs[0]['offset'] < self.start:
+            self.runs = [run for run in self.runs if run['offset'] >= self.start]
+            self._write_index(self.runs)
+
+    def read(self, start, end):
+        """Bytes between two offsets - one seek per segment touched"""
+        with self.lock:
+            self.flush()
+            start = max(start, self.start)
+            end = min(end, self.end)
+            segments = self._segments()
+            bounds = [s for s, _ in segments[1:]] + [self.end]
+            chunks = []
+            for (seg_start, path), seg_end in zip(segments, bounds):
+                if seg_end <= start or seg_start >= end:
+                    continue
+                with open(path, 'rb') as f:
+                    f.seek(max(start, seg_start) - seg_start)
+                    chunks.append(f.read(min(end, seg_end) - max(start, seg_start)))
+            return b''.join(chunks)
+
+    def tail(self, max_bytes=20000):
+        return self.read(self.end - max_bytes, self.end).decode('utf-8', errors='replace')
+
+    def run_list(self, limit=50):
+        """Indexed runs, newest first, with their length up to the next header"""
+        with self.lock:
+            runs = []
+            for i, run in enumerate(self.runs):
+                following = self.runs[i + 1]['offset'] if i + 1 < len(self.runs) else self.end
+                runs.append(dict(run, length=following - run['offset']))
+            return runs[::-1][:limit]
+
+    def run_log(self, offset, max_bytes=200000):
+        """Output of the run whose header starts at offset, None if it is not indexed
+
+        Parallel jobs interleave in this log, so a run of a job is served from
+        the job's own log while it is kept. Once it is pruned, the run is cut
+        from its header to the job's end line (other jobs' output may be mixed
+        in); runs without a job id (older logs) end at the next header.
+        """
+        with self.lock:
+            for i, run in enumerate(self.runs):
+                if run['offset'] != offset:
+                    continue
+                job = run.get('job')
+                if job is not None:
+                    path = os.path.join(self.job_log_dir, f"{job}-{run['target']}.log")
+                    if os.path.exists(path):
+                        return read_tail(path, max_bytes)
+                    data = self.read(offset, offset + max_bytes)
+                    # The header line ends with the same marker - the next one closes the run
+                    marker = f" | job {job} =====\n".encode()
+                    first = data.find(b'\n') + 1
+                    end = data.find(marker, first)
+                    if end >= 0:
+                        data = data[:end + len(marker)]
+                else:
+                    following = self.runs[i + 1]['offset'] if i + 1 < len(self.runs) else self.end
+                    data = self.read(offset, min(following, offset + max_bytes))
+                return data.decode('utf-8', errors='replace')
+        return None
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.file.close()
+            self.closed = True
+            self.dirty.set()            # let the flusher thread exit
+
+
+@dataclass
+class MakeJob:
+    id: int
+    target: str
+    state: str = 'queued'               # queued, running, done
+    queued_at: Optional[str] = None
+    started_at: Optional[str] = None
+    ended_at: Optional[str] = None
+    pid: Optional[int] = None
+    exit_code: Optional[int] = None
+    log_file: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class JobQueue:
+    """Runs make targets from a FIFO queue; on_output gets all output, on_change every state change"""
+
+    def __init__(self, targets, parallel=MAKE_PARALLEL, log_dir=JOB_LOG_DIR,
+                 history_file=HISTORY_FILE, on_output=None, on_change=None, cwd=PROJECT_DIR):
+        self.targets = set(targets)
+        self.parallel = max(1, parallel)
+        self.log_dir = log_dir
+        self.history_file = history_file
+        self.on_output = on_output
+        self.on_change = on_change
+        self.cwd = cwd
+        self.lock = threading.Lock()
+        self.active = []                # queued and running, in submit order
+        self.history = deque(maxlen=MAKE_HISTORY)
+        self.next_id = 1
+        self._load_history()
+
+    def _load_history(self):
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines[-MAKE_HISTORY:]:
+            try:
+                self.history.append(MakeJob(**json.loads(line)))
+            except (ValueError, TypeError):
+                continue
+        if self.history:
+            self.next_id = max(job.id for job in self.history) + 1
+        if len(lines) > 2 * MAKE_HISTORY:
+            # Compact - keep the file about as long as the history it feeds
+            tmp = self.history_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(job.to_dict()) + '\n' for job in self.history)
+            os.replace(tmp, self.history_file)
+
+    def submit(self, target):
+        """Queue a target; starts at once if nothing it depends on is running"""
+        if target not in self.targets:
+            raise ValueError(f"Target not allowed: {target}")
+        with self.lock:
+            if sum(job.state == 'queued' for job in self.active) >= MAX_QUEUED:
+                raise QueueFull(f"{MAX_QUEUED} jobs already queued")
+            job = MakeJob(self.next_id, target, queued_at=_now())
+            job.log_file = os.path.join(self.log_dir, f"{job.id}-{target}.log")
+            self.next_id += 1
+            self.active.append(job)
+            self._schedule()
+        self._changed()
+        return job
+
+    def _schedule(self):
+        """Start every queued job allowed to run now (caller holds the lock)"""
+        running = [job for job in self.active if job.state == 'running']
+        exclusive_busy = any(job.target not in INDEPENDENT_TARGETS for job in running)
+        independent = sum(job.target in INDEPENDENT_TARGETS for job in running)
+        for job in self.active:
+            if job.state != 'queued':
+                continue
+            if job.target in INDEPENDENT_TARGETS:
+                if independent >= self.parallel:
+                    continue
+                independent += 1
+            elif exclusive_busy:
+                continue                # later exclusive jobs keep waiting behind this one
+            else:
+                exclusive_busy = True
+            job.state = 'running'
+            job.started_at = _now()
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        log = RotatingLog(job.log_file)
+
+        def output(text):
+            data = text.encode('utf-8', errors='replace')
+            log.write(data)
+            if self.on_output:
+                self.on_output(text)
+
+        output(f"\n===== {job.started_at} | make {job.target} | job {job.id} =====\n")
+        try:
+            proc = subprocess.Popen(['make', job.target], cwd=self.cwd, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True, bufsize=1, errors='replace')
+            with self.lock:
+                job.pid = proc.pid
+            self._changed()
+            for line in proc.stdout:
+                output(line)
+            exit_code = proc.wait()
+            output(f"\n===== {_now()} | exit={exit_code} | job {job.id} =====\n")
+        except Exception as e:
+            exit_code = 1
+            output(f"\n===== {_now()} | ERROR: {e} | job {job.id} =====\n")
+        finally:
+            log.close()
+
+        with self.lock:
+            job.state = 'done'
+            job.exit_code = exit_code
+            job.ended_at = _now()
+            job.pid = None
+            self.active.remove(job)
+            if len(self.history) == self.history.maxlen:
+                self._remove_logs(self.history[0])
+            self.history.append(job)
+            self._append_history(job)
+            self._schedule()
+        self._changed()
+
+    def _append_history(self, job):
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(job.to_dict()) + '\n')
+        except OSError:
+            pass
+
+    def _remove_logs(self, job):
+        for i in range(JOB_LOG_BACKUPS + 1):
+            path = job.log_file + (f".{i}" if i else '')
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def get(self, job_id):
+        with self.lock:
+            for job in list(self.active) + list(self.history):
+                if job.id == job_id:
+                    return job
+        return None
+
+    def jobs(self, limit=MAKE_HISTORY):
+        """Active jobs, then history - newest first"""
+        with self.lock:
+            jobs = list(reversed(self.active)) + list(reversed(self.history))
+            return [job.to_dict() for job in jobs[:limit]]
+
+    def state(self):
+        """Summary in the old single-job MAKE_STATE shape, plus the queue"""
+        with self.lock:
+            running = [job for job in self.active if job.state == 'running']
+            queued = [job for job in self.active if job.state == 'queued']
+            last = running[-1] if running else (self.history[-1] if self.history else None)
+            state = {
+                'running': bool(running),
+                'target': last.target if last else None,
+                'job': last.id if last else None,
+                'pid': last.pid if last else None,
+                'exit_code': last.exit_code if last else None,
+                'started_at': last.started_at if last else None,
+                'ended_at': last.ended_at if last else None,
+                'queued': len(queued),
+                'active': [job.to_dict() for job in self.active],
+            }
+        return state
+
+    def read_log(self, job_id, max_bytes=20000):
+        """Tail of a job's log (current segment only), None for an unknown job"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return read_tail(job.log_file, max_bytes)
@@ -39,6 +39,13 @@ restore_env() {
     fi
 }
 
+# Zapis całego pliku przez /save - z rewizją z /load jako base
+save_content() {
+    local base
+    base=$(curl -s --max-time 5 "$WEBENV_URL/load" 2>/dev/null | jq -r '.revision' 2>/dev/null)
+    curl -s --max-time 5 -X POST -d "base=${base}&content=$(echo "$1" | jq -sRr @uri)" "$WEBENV_URL/save" 2>/dev/null
+}
+
 # Cleanup przy wyjściu
 cleanup() {
     restore_env
@@ -192,7 +199,7 @@ ${test_line}"
     
     # Zapisz zmodyfikowany
     local save_result
-    save_result=$(curl -s --max-time 5 -X POST -d "content=$(echo "$modified" | jq -sRr @uri)" "$WEBENV_URL/save" 2>/dev/null)
+    save_result=$(save_content "$modified")
     
     local save_success
     save_success=$(echo "$save_result" | jq -r '.success' 2>/dev/null)
@@ -209,7 +216,7 @@ ${test_line}"
     # Sprawdź czy marker jest obecny
     if echo "$reloaded" | grep -q "$test_value"; then
         # Przywróć oryginał
-        curl -s --max-time 5 -X POST -d "content=$(echo "$original" | jq -sRr @uri)" "$WEBENV_URL/save" >/dev/null 2>&1
+        save_content "$original" >/dev/null
         echoc "${GREEN}✓${NC}"
         return 0
     else
@@ -235,7 +242,7 @@ test_reset() {
     
     if [ "$reset_success" = "true" ]; then
         # Przywróć poprzednią wartość
-        curl -s --max-time 5 -X POST -d "content=$(echo "$before" | jq -sRr @uri)" "$WEBENV_URL/save" >/dev/null 2>&1
+        save_content "$before" >/dev/null
         echoc "${GREEN}✓${NC}"
         return 0
     else
@@ -0,0 +1,58 @@
+# scripts/tests/conftest.py
+import os
+import sys
+import glob
+import shutil
+import asyncio
+import tempfile
+import threading
+
+import pytest
+
+# Scripts keep their files next to the project (logs/, .env) and create them on
+# import - tests import a copy living in a scratch project directory instead
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_COPY = tempfile.mkdtemp(prefix='wapro-tests-')
+for name in glob.glob(os.path.join(SCRIPTS_DIR, '*.py')) + glob.glob(os.path.join(SCRIPTS_DIR, '*.txt')):
+    os.makedirs(os.path.join(PROJECT_COPY, 'scripts'), exist_ok=True)
+    shutil.copy(name, os.path.join(PROJECT_COPY, 'scripts'))
+shutil.copy(os.path.join(os.path.dirname(SCRIPTS_DIR), '.env.example'), PROJECT_COPY)
+shutil.copy(os.path.join(PROJECT_COPY, '.env.example'), os.path.join(PROJECT_COPY, '.env'))
+sys.path.insert(0, os.path.join(PROJECT_COPY, 'scripts'))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(PROJECT_COPY, ignore_errors=True)
+
+
+@pytest.fixture
+def start_webenv():
+    """Factory: webenv AsyncEnvServer on an ephemeral port (background loop) -> port"""
+    import webenv
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    async def start():
+        app = webenv.AsyncEnvServer('127.0.0.1', 0)
+        server = await asyncio.start_server(app.handle_connection, '127.0.0.1', 0)
+        app.server_port = server.sockets[0].getsockname()[1]
+        servers.append((app, server))
+        return app.server_port
+
+    yield lambda: asyncio.run_coroutine_threadsafe(start(), loop).result(5)
+
+    async def stop():
+        for app, server in servers:
+            server.close()
+            app.executor.shutdown(wait=False)
+        # Open connections (SSE streams wait for events) end with the loop
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
@@ -0,0 +1,79 @@
+# scripts/tests/test_dashboard.py
+import io
+import subprocess
+
+import pytest
+
+from dashboard import ContainerState, LogTail, Screen
+from dockerapi import DockerError
+
+
+class TestLogTail:
+    def test_first_read_of_big_log_skips_cut_line(self, tmp_path):
+        """Pierwszy odczyt dużego logu nie zaczyna się od połowy linii"""
+        path = tmp_path / 'make.log'
+        lines = [f'line {i:06d} ' + 'x' * 50 for i in range(5000)]
+        path.write_text('\n'.join(lines) + '\n')
+        tail = LogTail(str(path), lines=10000)
+        read = tail.poll()
+        assert read[-1] == lines[-1]
+        assert read[0] in lines
+        assert read == lines[-len(read):]
+
+    def test_seek_on_line_start_keeps_that_line(self, tmp_path):
+        """Odczyt trafiający dokładnie w początek linii zachowuje ją, w środek - pomija"""
+        path = tmp_path / 'make.log'
+        whole = 'a' * (64 * 1024 - len('\nkept\n'))
+        path.write_text('b' * 10 + '\n' + whole + '\nkept\n')
+        assert LogTail(str(path)).poll() == [whole, 'kept']
+        path.write_text('b' * 10 + '\n' + whole + 'a' + '\nkept\n')
+        assert LogTail(str(path)).poll() == ['kept']
+
+    def test_appended_lines_and_partial_line(self, tmp_path):
+        path = tmp_path / 'make.log'
+        path.write_text('one\ntw')
+        tail = LogTail(str(path))
+        assert tail.poll() == ['one']
+        with open(path, 'a') as f:
+            f.write('o\nthree\n')
+        assert tail.poll() == ['one', 'two', 'three']
+
+
+class FakeDocker:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def containers(self, project=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return [{'name': 'wapromag-mssql', 'state': 'running', 'status': 'Up 5 minutes (healthy)'}]
+
+
+class TestContainerState:
+    def test_docker_api_instead_of_docker_ps(self, monkeypatch):
+        """DOCKER_BACKEND=api - stan kontenerów z API, bez uruchamiania docker ps"""
+        monkeypatch.setattr(subprocess, 'run', lambda *a, **k: pytest.fail('docker ps ran'))
+        docker = FakeDocker()
+        state = ContainerState('prinet', interval=60, docker=docker)
+        assert state.poll() == [['wapromag-mssql', 'running', 'Up 5 minutes (healthy)']]
+        state.poll()
+        assert docker.calls == 1                # refreshed at most every interval
+
+    def test_docker_api_error_shown(self):
+        state = ContainerState('prinet', docker=FakeDocker(DockerError(0, 'socket unreachable')))
+        assert state.poll() == []
+        assert state.error == 'socket unreachable'
+
+
+class TestScreen:
+    def test_only_changed_lines_rewritten(self):
+        """Różnica na poziomie linii - zmieniona linia jest pisana w całości"""
+        out = io.StringIO()
+        screen = Screen(out)
+        screen.draw(['a', 'b', 'c'])
+        out.truncate(0), out.seek(0)
+        assert screen.draw(['a', 'B', 'c']) == 1
+        assert out.getvalue() == '\033[2;1HB\033[K'
+        assert screen.draw(['a']) == 2
@@ -0,0 +1,350 @@
+# scripts/tests/test_discover.py
+import io
+import json
+import time
+import socket
+import itertools
+import ipaddress
+import threading
+from datetime import datetime
+
+import pytest
+
+import discover
+from discover import (DiscoveryDaemon, EventStream, Progress, Scanner, SqliteStandIn, TokenBucket,
+                      classify_neighbours, count_hosts, discover_all, fingerprint_mssql, fingerprint_zebra,
+                      in_sweep, iter_hosts, load_env_targets, load_oui_table, lookup_oui, parse_networks,
+                      sync_printers)
+
+
+@pytest.fixture
+def tcp_server():
+    """Factory: handler(conn) served on an ephemeral loopback port -> port"""
+    servers = []
+
+    def start(handler):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        servers.append(server)
+
+        def serve():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                with conn:
+                    handler(conn)
+
+        threading.Thread(target=serve, daemon=True).start()
+        return server.getsockname()[1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def zebra_mock(conn):
+    """ZPL mock printer - ~HI and SGD getvar replies"""
+    replies = {'~HI': '\x02ZT230-200dpi,V72.20.01Z,8,8192KB\x03',
+               '! U1 getvar "device.product_name"': '"ZT230"',
+               '! U1 getvar "appl.name"': '"V72.20.01Z"',
+               '! U1 getvar "device.unique_id"': '"?"'}
+    with conn.makefile('rb') as f:
+        for line in f:
+            conn.sendall(replies.get(line.decode().strip(), '""').encode())
+
+
+def tds_mock(conn):
+    """SQL Server 2019 PRELOGIN reply: VERSION 15.0.2000, ENCRYPTION not supported"""
+    conn.recv(1024)
+    payload = bytes([0x00, 0, 11, 0, 6, 0x01, 0, 17, 0, 1, 0xFF]) + bytes([15, 0, 0x07, 0xD0, 0, 0]) + b'\x02'
+    conn.sendall(bytes([0x04, 0x01]) + (len(payload) + 8).to_bytes(2, 'big') + b'\x00\x00\x01\x00' + payload)
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def zebra(host, port=9100, model=None):
+    return {'type': 'zebra', 'host': host, 'port': port, 'model': model}
+
+
+class TestNetworks:
+    """Sieci CIDR - scalanie zakresów i leniwe generowanie hostów"""
+
+    def test_overlapping_ranges_collapsed(self):
+        networks = parse_networks(['192.168.8.0/23', '192.168.9.0/24', '192.168.10.0/23',
+                                   '10.0.5.7', 'nie-siec', 'fe80::/64'])
+        assert [str(n) for n in networks] == ['10.0.5.7/32', '192.168.8.0/22']
+
+    def test_hosts_generated_lazily(self):
+        """/8 to 16 mln adresów - pierwsze hosty bez budowania listy"""
+        hosts = iter_hosts([ipaddress.ip_network('10.0.0.0/8')])
+        assert list(itertools.islice(hosts, 3)) == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+    def test_count_and_membership_match_the_sweep(self):
+        for spec in ('192.168.8.0/22', '10.1.2.0/28', '10.1.2.4/31', '10.1.2.9/32'):
+            network = ipaddress.ip_network(spec)
+            for quick in (False, True):
+                hosts = list(iter_hosts([network], quick=quick))
+                assert len(hosts) == count_hosts(network, quick), (spec, quick)
+                swept = set(hosts)
+                assert all(in_sweep(str(ip), [network], quick) == (str(ip) in swept)
+                           for ip in network), (spec, quick)
+
+
+class TestFingerprint:
+    """Identyfikacja znalezionych usług - ZPL ~HI/SGD i TDS PRELOGIN"""
+
+    def test_zebra_model_and_firmware(self, tcp_server):
+        info = fingerprint_zebra('127.0.0.1', tcp_server(zebra_mock), timeout=2)
+        assert info == {'protocol': 'zpl', 'hi': 'ZT230-200dpi,V72.20.01Z,8,8192KB',
+                        'model': 'ZT230', 'firmware': 'V72.20.01Z', 'product_name': 'ZT230'}
+
+    def test_mssql_version_from_prelogin(self, tcp_server):
+        info = fingerprint_mssql('127.0.0.1', tcp_server(tds_mock), timeout=2)
+        assert info == {'protocol': 'tds', 'version': '15.0.2000', 'product': 'SQL Server 2019',
+                        'encryption': 'not_supported'}
+
+    def test_not_tds_answer(self, tcp_server):
+        port = tcp_server(lambda conn: (conn.recv(1024), conn.sendall(b'HTTP/1.1 400 Bad Request\r\n\r\n')))
+        assert fingerprint_mssql('127.0.0.1', port, timeout=2) == {'protocol': 'tds'}
+
+
+class TestEvents:
+    """Strumień NDJSON - jedna linia JSON na zdarzenie, w kolejności skanowania"""
+
+    def test_one_json_object_per_line(self):
+        out = io.StringIO()
+        stream = EventStream(out)
+        stream.emit('scan_started', quick=True, hosts=2)
+        stream.emit('done', summary={'zebra_printers': 1})
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [e['event'] for e in events] == ['scan_started', 'done']
+        assert events[0]['hosts'] == 2 and isinstance(events[0]['ts'], float)
+
+    def test_progress_on_whole_percents(self):
+        events = []
+        progress = Progress(lambda event, **fields: events.append(fields['percent']), 'zebra', 3)
+        for _ in range(3):
+            progress.step()
+        assert events == [33, 66, 100]
+
+    def test_scan_event_order(self, tcp_server, monkeypatch):
+        monkeypatch.setattr(discover, 'ZEBRA_PORTS', [tcp_server(zebra_mock)])
+        monkeypatch.setattr(discover, 'MSSQL_PORT', closed_port())
+        out = io.StringIO()
+        discover_all(quick=True, networks=['127.0.0.1/32'], events=EventStream(out))
+        events = [json.loads(line) for line in out.getvalue().splitlines()]
+        names = [e['event'] for e in events if e['event'] in ('scan_started', 'device', 'progress',
+                                                             'fingerprint', 'done')]
+        assert names == ['scan_started', 'device', 'progress', 'progress', 'fingerprint', 'done']
+        assert [e['stage'] for e in events if e['event'] == 'progress'] == ['zebra', 'mssql']
+        assert events[-1]['summary']['zebra_printers'] == 1
+
+
+class TestTokenBucket:
+    """Limit sond - kubełek tokenów globalnie i limit równoległych sond na host"""
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=5)
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        assert time.monotonic() - started < 0.05         # the burst is free
+        for _ in range(10):
+            bucket.acquire()
+        elapsed = time.monotonic() - started
+        assert 0.18 <= elapsed < 0.4                       # 10 more tokens at 50/s
+        assert bucket.stats()['probes'] == 15
+
+    def test_unlimited(self):
+        bucket = TokenBucket()
+        started = time.monotonic()
+        for _ in range(1000):
+            bucket.acquire()
+        assert time.monotonic() - started < 0.1
+
+    def test_per_host_concurrency(self):
+        bucket = TokenBucket(per_host=2)
+        lock = threading.Lock()
+        running = {'a': 0, 'b': 0}
+        peak = {'a': 0, 'b': 0}
+
+        def probe(host):
+            with bucket.slot(host):
+                with lock:
+                    running[host] += 1
+                    peak[host] = max(peak[host], running[host])
+                time.sleep(0.02)
+                with lock:
+                    running[host] -= 1
+
+        threads = [threading.Thread(target=probe, args=(host,)) for host in 'aaaaaabb']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak == {'a': 2, 'b': 2}
+        assert bucket.hosts == {}                          # idle hosts are dropped
+
+
+class TestScanner:
+    """Scanner jako biblioteka - pula wątków i sieci zachowane między przebiegami"""
+
+    def test_reused_between_runs(self, tcp_server, monkeypatch, tmp_path):
+        monkeypatch.setattr(discover, 'ZEBRA_PORTS', [tcp_server(zebra_mock)])
+        monkeypatch.setattr(discover, 'MSSQL_PORT', closed_port())
+        found = []
+        results_file = tmp_path / 'devices.json'
+        with Scanner(quick=True, networks=['127.0.0.1'], fingerprint=False,
+                     results_file=str(results_file), on_device=found.append) as scanner:
+            first = scanner.run()
+            executor, networks = scanner._executor, scanner.resolve_networks()
+            second = scanner.run()
+            assert scanner._executor is executor and scanner.resolve_networks() is networks
+        assert scanner._executor is None
+        assert scanner.last_result is second and not second.cancelled
+        assert [d.host for d in found] == ['127.0.0.1', '127.0.0.1']
+        assert json.loads(results_file.read_text())['devices']['zebra_printers'][0]['port'] == first.all_devices[0].port
+
+    def test_one_run_at_a_time_and_cancel(self, monkeypatch, tmp_path):
+        """Drugi run() w trakcie skanowania - RuntimeError; anulowany skan nie nadpisuje wyników"""
+        monkeypatch.setattr(discover, 'ZEBRA_PORTS', [closed_port()])
+        started = threading.Event()
+        release = threading.Event()
+
+        def on_event(event, **fields):
+            if event == 'scan_started':
+                started.set()
+                release.wait(5)
+
+        results_file = tmp_path / 'devices.json'
+        scanner = Scanner(quick=True, networks=['127.0.0.1'], results_file=str(results_file),
+                          on_event=on_event)
+        runs = []
+        thread = threading.Thread(target=lambda: runs.append(scanner.run()))
+        thread.start()
+        assert started.wait(5)
+        assert scanner.running
+        with pytest.raises(RuntimeError):
+            scanner.run()
+        scanner.cancel()
+        release.set()
+        thread.join(5)
+        scanner.close()
+        assert runs[0].cancelled and runs[0].all_devices == []
+        assert not results_file.exists()
+
+
+class TestSyncPrinters:
+    def test_second_sync_updates_instead_of_inserting(self):
+        """Dwie synchronizacje - jeden wiersz na (AdresIP, Port), odświeżona data badania"""
+        db = SqliteStandIn()
+        devices = [zebra('192.168.1.10', model='ZT230'), zebra('192.168.1.11'),
+                   zebra('192.168.1.10', model=None)]
+
+        first = sync_printers(devices, db, checked_at=datetime(2024, 5, 1, 10, 0))
+        assert first == {'printers': 2, 'inserted': 2, 'updated': 0}
+
+        devices.append(zebra('192.168.1.12', port=9101))
+        second = sync_printers(devices, db, checked_at=datetime(2024, 5, 1, 11, 0))
+        assert second == {'printers': 3, 'inserted': 1, 'updated': 2}
+
+        printers = db.printers()
+        db.close()
+        assert sorted((p['AdresIP'], p['Port']) for p in printers) == [
+            ('192.168.1.10', 9100), ('192.168.1.11', 9100), ('192.168.1.12', 9101)]
+        assert {p['DataOstatniegoBadania'] for p in printers} == {'2024-05-01T11:00:00'}
+        assert printers[0]['ModelDrukarki'] == 'ZT230'
+
+    def test_nothing_to_sync(self):
+        """Brak drukarek - bez zapytania do bazy"""
+        assert sync_printers([{'type': 'mssql', 'host': '10.0.0.1', 'port': 1433}], db=object()) == {
+            'printers': 0, 'inserted': 0, 'updated': 0}
+
+
+class TestMetrics:
+    def test_label_values_escaped(self):
+        """Nazwa z .env z cudzysłowem, ukośnikiem i nową linią nie psuje formatu Prometheus"""
+        daemon = DiscoveryDaemon(log=lambda message: None)
+        key = ('zebra', '10.0.0.5', 9100)
+        daemon.targets = {key: {'type': 'zebra', 'name': 'Sektor "A"\\1\nB', 'host': '10.0.0.5', 'port': 9100}}
+        daemon.state = {key: {'up': True, 'latency': 0.01, 'checked_at': 0}}
+        daemon.histogram.observe((('type', 'zebra'), ('host', 'a"b'), ('port', 9100)), 0.01)
+        text = daemon.render_metrics()
+        assert 'printer_available{printer_name="Sektor \\"A\\"\\\\1\\nB",host="10.0.0.5",port="9100"} 1' in text
+        assert 'discovery_probe_latency_seconds_count{type="zebra",host="a\\"b",port="9100"} 1' in text
+        assert all(line.startswith(('#', 'printer_', 'database_', 'discovery_')) for line in text.splitlines())
+
+
+class TestDaemon:
+    def test_bad_port_skips_only_that_endpoint(self, tmp_path):
+        """Błędny port w .env pomija jeden punkt końcowy zamiast zatrzymać demona"""
+        env = tmp_path / '.env'
+        env.write_text('ZEBRA_1_HOST=10.0.0.1\nZEBRA_1_SOCKET_PORT=abc\n'
+                       'ZEBRA_2_HOST=10.0.0.2\nMSSQL_HOST=10.0.0.3\nMSSQL_PORT=1433\n')
+        messages = []
+        targets = load_env_targets(str(env), messages.append)
+        assert [(t['host'], t['port']) for t in targets] == [('10.0.0.2', 9100), ('10.0.0.3', 1433)]
+        assert any('ZEBRA_1_SOCKET_PORT=abc' in m for m in messages)
+
+    def test_failed_reload_keeps_targets(self, tmp_path, monkeypatch):
+        daemon = DiscoveryDaemon(results_file=str(tmp_path / 'none.json'), log=lambda message: None)
+        key = ('zebra', '10.0.0.1', 9100)
+        daemon.targets = {key: {'type': 'zebra', 'name': 'z', 'host': '10.0.0.1', 'port': 9100}}
+
+        def broken(*args):
+            daemon.stop()
+            raise ValueError('broken .env')
+
+        monkeypatch.setattr(discover, 'load_env_targets', broken)
+        daemon.run(workers=1)
+        assert list(daemon.targets) == [key]
+
+    def test_readded_target_probed_once(self):
+        """Usunięty i ponownie dodany cel ma jeden wpis w harmonogramie"""
+        daemon = DiscoveryDaemon(interval=10, log=lambda message: None)
+        key = ('zebra', '10.0.0.1', 9100)
+        daemon.targets = {key: {}}
+        daemon._push(1.0, key)
+        daemon.targets = {}                 # removed...
+        daemon.targets = {key: {}}          # ...and added again before the old entry was due
+        daemon._push(2.0, key)
+        assert daemon.due_keys(3.0) == [key]
+        assert len(daemon._schedule) == 1
+
+
+class TestOui:
+    """Klasyfikacja sąsiadów po prefiksie MAC, bez sondowania"""
+
+    def test_lookup(self):
+        assert lookup_oui('00:07:4d:12:34:56') == ('printer', 'Zebra Technologies Corp.')
+        assert lookup_oui('B8-27-EB-00-00-01')[0] == 'rpi'
+        assert lookup_oui('02:00:00:00:00:01') is None
+        assert lookup_oui('zz:zz') is None
+
+    def test_unsorted_file_still_found(self, tmp_path):
+        """Linia dopisana poza kolejnością nie psuje wyszukiwania binarnego"""
+        path = tmp_path / 'oui.txt'
+        path.write_text('# test\nDCA632\trpi\tRaspberry Pi\n00074D\tprinter\tZebra\nB827EB\trpi\tRaspberry Pi\n')
+        table = load_oui_table(str(path))
+        assert table[0] == sorted(table[0])
+        assert lookup_oui('00:07:4d:00:00:01', table) == ('printer', 'Zebra')
+        assert lookup_oui('dc:a6:32:00:00:01', table) == ('rpi', 'Raspberry Pi')
+
+    def test_classify_arp_table(self, tmp_path):
+        arp = tmp_path / 'arp'
+        arp.write_text('IP address       HW type     Flags       HW address            Mask     Device\n'
+                       '192.168.1.10     0x1         0x2         00:07:4d:aa:bb:cc     *        eth0\n'
+                       '192.168.1.11     0x1         0x0         00:00:00:00:00:00     *        eth0\n'
+                       '10.0.0.5         0x1         0x2         b8:27:eb:00:00:01     *        eth1\n')
+        neighbours = classify_neighbours([ipaddress.ip_network('192.168.1.0/24')], str(arp))
+        assert list(neighbours) == ['192.168.1.10']
+        assert neighbours['192.168.1.10']['category'] == 'printer'
@@ -0,0 +1,114 @@
+# scripts/tests/test_dockerapi.py
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from dockerapi import DockerClient, iter_log_frames
+
+
+def frame(stream, payload):
+    return bytes([stream, 0, 0, 0]) + len(payload).to_bytes(4, 'big') + payload
+
+
+# One multiplexed logs stream, cut so that a frame header and a payload span chunks
+LOG_STREAM = frame(1, b'line one\nline ') + frame(2, b'boom\n') + frame(1, b'two\n')
+LOG_CHUNKS = [LOG_STREAM[:5], LOG_STREAM[5:20], LOG_STREAM[20:]]
+
+CONTAINERS = [{
+    'Id': 'abcdef0123456789', 'Names': ['/wapromag-mssql'], 'Image': 'mssql', 'State': 'running',
+    'Status': 'Up 5 minutes (healthy)',
+    'Labels': {'com.docker.compose.project': 'prinet', 'com.docker.compose.service': 'mssql'},
+    'Ports': [{'PrivatePort': 1433, 'PublicPort': 1433, 'Type': 'tcp'}],
+}]
+
+
+class FakeDocker(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/v1.41/containers/json':
+            self.server.requests.append(self.path)
+            self.send_json(CONTAINERS)
+        elif path == '/v1.41/containers/wapromag-mssql/json':
+            self.send_json({'Config': {'Tty': False}})
+        elif path == '/v1.41/containers/wapromag-mssql/logs':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.docker.raw-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in LOG_CHUNKS:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.flush()
+                time.sleep(0.01)
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_json({'message': 'not found'})
+
+
+@pytest.fixture
+def docker():
+    directory = tempfile.mkdtemp(prefix='docker-')        # AF_UNIX paths are short
+    server = socketserver.ThreadingUnixStreamServer(os.path.join(directory, 'docker.sock'), FakeDocker)
+    server.daemon_threads = True
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = DockerClient(socket_path=server.server_address, timeout=5)
+    yield client, server
+    client.close()
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class SplitReader:
+    """Response stand-in returning at most `step` bytes per read, like a slow socket"""
+
+    def __init__(self, data, step):
+        self.data, self.step = data, step
+
+    def read(self, size):
+        out, self.data = self.data[:min(size, self.step)], self.data[min(size, self.step):]
+        return out
+
+
+class TestDockerClient:
+    def test_containers_over_unix_socket(self, docker):
+        """Stan kontenerów z /containers/json, filtr projektu w zapytaniu"""
+        client, server = docker
+        containers = client.containers(project='prinet')
+        assert [(c['name'], c['service'], c['state'], c['health']) for c in containers] == [
+            ('wapromag-mssql', 'mssql', 'running', 'healthy')]
+        assert containers[0]['ports'] == ['1433->1433/tcp']
+        assert 'prinet' in server.requests[0]
+
+    def test_logs_demultiplexed(self, docker):
+        """stdout i stderr rozdzielone, linia z dwóch ramek sklejona"""
+        client, _ = docker
+        assert list(client.logs('wapromag-mssql')) == [
+            ('stdout', 'line one'), ('stderr', 'boom'), ('stdout', 'line two')]
+
+
+class TestLogFrames:
+    def test_frame_split_across_reads(self):
+        """Nagłówek i treść ramki przychodzące w kawałkach"""
+        frames = list(iter_log_frames(SplitReader(LOG_STREAM, 3)))
+        assert frames == [('stdout', b'line one\nline '), ('stderr', b'boom\n'), ('stdout', b'two\n')]
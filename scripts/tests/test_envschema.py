@@ -0,0 +1,88 @@
+# scripts/tests/test_envschema.py
+import os
+
+import pytest
+
+from envschema import Schema, errors, get_schema, infer_validator
+
+EXAMPLE = {
+    'COMPOSE_PROJECT_NAME': 'prinet',
+    'DOCKER_BACKEND': 'compose',
+    'NETWORK_SUBNET': '192.168.9.0/24',
+    'MSSQL_HOST': 'mssql',
+    'MSSQL_PORT': '1433',
+    'MSSQL_PASSWORD': 'WapromagPass123!',
+    'RPI_ENABLED': 'true',
+    'ZEBRA_1_HOST': '192.168.9.165',
+    'ZEBRA_1_SOCKET_PORT': '9100',
+    'ZEBRA_1_NAME': 'ZEBRA-1',
+    'ZEBRA_2_HOST': '192.168.8.166',
+}
+
+
+@pytest.fixture
+def schema():
+    return Schema(EXAMPLE)
+
+
+def messages(schema, config, keys=None):
+    return {issue.key: (issue.level, issue.message) for issue in schema.validate(config, keys)}
+
+
+class TestValidators:
+    """Typ klucza z nazwy i wartości przykładowej"""
+
+    @pytest.mark.parametrize('key, example, good, bad', [
+        ('MSSQL_PORT', '1433', ['1', '65535'], ['0', '65536', 'abc', '', '-1']),
+        ('ZEBRA_1_HOST', '192.168.9.165', ['10.0.0.1', 'zebra-printer-1', 'db.local'],
+         ['256.1.1.1', '10.0.0', 'bad host', '-x']),
+        ('NETWORK_SUBNET', '192.168.9.0/24', ['10.0.0.0/8', '192.168.9.0/32'],
+         ['192.168.9.0', '192.168.9.0/33', 'net/24']),
+        ('RPI_ENABLED', 'true', ['true', 'FALSE'], ['yes', '1']),
+        ('DOCKER_BACKEND', 'compose', ['compose', 'api'], ['podman', 'API']),
+        ('COMPOSE_PROJECT_NAME', 'prinet', ['prinet', 'sklep_1-a'], ['Prinet', '-x', '']),
+        ('MSSQL_PASSWORD', 'x', ['s3cret!'], ['']),
+        ('LOG_FORMAT', 'json', ['anything', ''], []),
+    ])
+    def test_values(self, key, example, good, bad):
+        check = infer_validator(key, example)
+        assert [value for value in good if check(value)] == []
+        assert [value for value in bad if not check(value)] == []
+
+
+class TestSchema:
+    def test_numbered_groups_folded(self, schema):
+        """ZEBRA_7_HOST sprawdzany jak ZEBRA_1_HOST - jeden walidator na grupę"""
+        assert ('ZEBRA', 'HOST') in schema.groups
+        assert not any(key.startswith('ZEBRA_') for key in schema.keys)
+        config = dict(EXAMPLE, ZEBRA_7_HOST='10.0.0.7', ZEBRA_7_SOCKET_PORT='abc')
+        assert messages(schema, config) == {
+            'ZEBRA_7_SOCKET_PORT': ('error', "'abc' is not a port (1-65535)")}
+
+    def test_unknown_key_is_a_warning(self, schema):
+        issues = schema.validate(dict(EXAMPLE, MSSQL_HOTS='x', ZEBRA_1_COLOUR='red'))
+        assert errors(issues) == []
+        assert messages(schema, dict(EXAMPLE, MSSQL_HOTS='x')) == {
+            'MSSQL_HOTS': ('warning', 'unknown key (did you mean MSSQL_HOST?)')}
+
+    def test_required_keys(self, schema):
+        config = {key: value for key, value in EXAMPLE.items() if key != 'ZEBRA_2_HOST'}
+        assert messages(schema, config) == {'ZEBRA_2_HOST': ('error', 'required key is missing')}
+
+    def test_only_given_keys(self, schema):
+        """keys= - tylko te klucze, bez sprawdzania wymaganych (łatka webenv)"""
+        config = {'MSSQL_PORT': '1434', 'ZEBRA_1_HOST': 'bad host'}
+        assert messages(schema, config, keys=['MSSQL_PORT']) == {}
+
+
+class TestGetSchema:
+    def test_compiled_once_per_file_version(self, tmp_path):
+        path = tmp_path / '.env.example'
+        path.write_text('MSSQL_HOST=mssql\nMSSQL_PORT=1433\n')
+        schema = get_schema(str(path))
+        assert get_schema(str(path)) is schema
+        path.write_text('MSSQL_HOST=mssql\nMSSQL_PORT=1433\nRPI_ENABLED=true\n')
+        os.utime(path, ns=(0, 0))
+        changed = get_schema(str(path))
+        assert changed is not schema
+        assert changed.validator('RPI_ENABLED')('maybe')
@@ -0,0 +1,119 @@
+# scripts/tests/test_envstore.py
+import os
+import threading
+
+import pytest
+
+import envstore
+from envstore import EnvStore, get_store, merge_env, parse_env
+
+ENV = "# MSSQL\nMSSQL_HOST=mssql\nMSSQL_PORT=1433\nZEBRA_1_NAME=zebra-1\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / '.env'
+    path.write_text(ENV)
+    return EnvStore(str(path))
+
+
+class TestCache:
+    """Wspólny magazyn .env - parsowanie tylko po zmianie pliku"""
+
+    def test_parsed_once_until_file_changes(self, store, monkeypatch):
+        parsed = []
+        monkeypatch.setattr(envstore, 'parse_env', lambda text: parsed.append(text) or parse_env(text))
+        assert store.get('MSSQL_PORT') == '1433'
+        assert store.load()['MSSQL_HOST'] == 'mssql'
+        assert len(parsed) == 1
+        with open(store.path, 'w') as f:
+            f.write(ENV.replace('1433', '14330'))              # edited outside the store
+        assert store.get('MSSQL_PORT') == '14330'
+        assert len(parsed) == 2
+
+    def test_one_store_per_path(self, tmp_path):
+        path = tmp_path / '.env'
+        assert get_store(str(path)) is get_store(str(tmp_path / '.' / '.env'))
+        assert get_store(str(path)) is not get_store(str(tmp_path / 'other.env'))
+
+    def test_update_keeps_comments_and_mode(self, store):
+        os.chmod(store.path, 0o600)
+        store.update({'MSSQL_PORT': '1434'})
+        assert store.text() == ENV.replace('1433', '1434')
+        assert os.stat(store.path).st_mode & 0o777 == 0o600
+        assert [name for name in os.listdir(os.path.dirname(store.path)) if name.endswith('.tmp')] == []
+
+    def test_concurrent_updates_all_kept(self, store):
+        """Równoległe zapisy (CLI i edytor www) - żaden klucz nie ginie"""
+        threads = [threading.Thread(target=store.update, args=({f'ZEBRA_{n}_HOST': f'10.0.0.{n}'},))
+                   for n in range(2, 10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        config = EnvStore(store.path).load()
+        assert all(config[f'ZEBRA_{n}_HOST'] == f'10.0.0.{n}' for n in range(2, 10))
+
+
+class TestPatch:
+    """Zmiany kluczy z rewizja bazowa (webenv /save)"""
+
+    def test_value_with_newline_is_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.patch(store.revision(), {'ZEBRA_1_NAME': ['zebra-1', 'x\nMSSQL_HOST=not a host!!']})
+        assert store.text() == ENV
+
+    def test_key_with_newline_is_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.patch(store.revision(), {'BAD KEY\nMSSQL_PORT': [None, '1']})
+        assert store.text() == ENV
+
+    def test_patch_changes_only_its_keys(self, store):
+        base = store.revision()
+        store.patch(base, {'MSSQL_PORT': ['1433', '1434']})
+        store.patch(base, {'ZEBRA_1_NAME': ['zebra-1', 'zebra-a']})      # other key - merged
+        assert parse_env(store.text()) == {'MSSQL_HOST': 'mssql', 'MSSQL_PORT': '1434',
+                                           'ZEBRA_1_NAME': 'zebra-a'}
+        assert store.text().startswith('# MSSQL\n')
+
+
+class TestMergeEnv:
+    def test_none_removes_key(self):
+        assert merge_env(ENV, {'MSSQL_PORT': None}) == "# MSSQL\nMSSQL_HOST=mssql\nZEBRA_1_NAME=zebra-1\n"
+
+
+class TestUpdate:
+    """Ustawianie kluczy (wapro-cli config set, webenv /admin/config)"""
+
+    def test_value_with_newline_is_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.update({'ZEBRA_1_NAME': 'a\nMSSQL_HOST=x'})
+        with pytest.raises(ValueError):
+            store.update({'ZEBRA_1_NAME': 'a\rMSSQL_HOST=x'})
+        assert store.text() == ENV
+
+    def test_invalid_key_is_rejected(self, store):
+        for key in ('BAD KEY', 'X\nMSSQL_PORT', '1ZEBRA', ''):
+            with pytest.raises(ValueError):
+                store.update({key: '1'})
+        assert store.text() == ENV
+
+    def test_update_appends_new_key(self, store):
+        assert store.update({'ZEBRA_3_HOST': '10.0.0.3'}) is True
+        assert store.text() == ENV + "ZEBRA_3_HOST=10.0.0.3\n"
+
+
+class TestLazyRead:
+    """Odczyt klucza nie liczy rewizji i nie otwiera historii (szybki start wapro-cli)"""
+
+    def test_load_skips_revision_and_history(self, store):
+        assert store.get('MSSQL_HOST') == 'mssql'
+        assert store._revision is None
+        assert store._history is None
+
+    def test_revision_computed_on_demand(self, store):
+        store.load()
+        rev = store.revision()
+        store.update({'MSSQL_PORT': '1434'})
+        assert store.revision() != rev
+        assert store.history.log()[0]['changes'] == {'MSSQL_PORT': ['1433', '1434']}
@@ -0,0 +1,103 @@
+# scripts/tests/test_fleet.py
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from fleet import Site, format_table, run_fleet, to_json
+
+
+@pytest.fixture
+def silent_port():
+    """Port that accepts connections and never answers - a hung site"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+    yield server.getsockname()[1]
+    for conn, _ in accepted:
+        conn.close()
+    server.close()
+
+
+@pytest.fixture
+def proxy_port():
+    """Site answering every request with a JSON status - records the request lines"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    lines = []
+
+    def serve():
+        conn, _ = server.accept()
+        with conn, conn.makefile('rb') as f:
+            lines.append(f.readline().decode().strip())
+            while f.readline() not in (b'\r\n', b''):
+                pass
+            body = json.dumps({'success': True, 'state': {'target': None}}).encode()
+            conn.sendall(b'HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield server.getsockname()[1], lines
+    server.close()
+
+
+@pytest.fixture
+def closed_port():
+    """Port with nothing listening - an offline site"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestFleet:
+    def test_config_across_sites(self, start_webenv, silent_port, closed_port):
+        """Dwie działające lokalizacje, jedna zawieszona, jedna wyłączona - wiersz na każdą"""
+        sites = [Site('sklep-1', f'http://127.0.0.1:{start_webenv()}'),
+                 Site('sklep-2', f'127.0.0.1:{start_webenv()}'),
+                 Site('wolny', f'http://127.0.0.1:{silent_port}'),
+                 Site('offline', f'http://127.0.0.1:{closed_port}')]
+
+        started = time.monotonic()
+        results = run_fleet(sites, 'config', ['get', 'MSSQL_HOST', 'BRAK'], timeout=0.5)
+        assert time.monotonic() - started < 2          # the hung site costs one timeout, not a sum
+
+        rows = {row['site']: row for row in to_json(results)}
+        assert [row['site'] for row in to_json(results)] == ['sklep-1', 'sklep-2', 'wolny', 'offline']
+        for name in ('sklep-1', 'sklep-2'):
+            assert rows[name]['ok']
+            assert rows[name]['data']['config'] == {'MSSQL_HOST': '192.168.9.20'}
+        assert rows['wolny'] == dict(rows['wolny'], ok=False, data=None, error='timeout')
+        assert not rows['offline']['ok']
+        assert rows['offline']['error'].startswith('offline')
+
+        table = format_table(results, 'config')
+        assert table[0].split() == ['SITE', 'RESULT', 'TIME', 'DETAILS']
+        assert table[1].split()[:2] == ['sklep-1', 'OK']
+        assert table[1].endswith('MSSQL_HOST=192.168.9.20  BRAK=(unset)')
+        assert table[3].split()[:2] == ['wolny', 'FAIL'] and table[3].endswith('timeout')
+        assert table[4].split()[:2] == ['offline', 'FAIL']
+
+    def test_url_path_prefix_kept(self, proxy_port):
+        """webenv za reverse proxy - ścieżka z inwentarza poprzedza /admin/..."""
+        port, lines = proxy_port
+        assert Site('sklep-3', 'https://vpn.example.pl/sklep-3/').prefix == '/sklep-3'
+        assert Site('sklep-1', '192.168.1.50:8888').prefix == ''
+        [result] = run_fleet([Site('sklep-3', f'http://127.0.0.1:{port}/sklep-3')], 'status', timeout=2)
+        assert result.ok, result.error
+        assert lines == ['GET /sklep-3/admin/status HTTP/1.1']
+
+    def test_unknown_config_command_rejected(self, closed_port):
+        """Literówka w podkomendzie nie jest listą kluczy i nie trafia do żadnej lokalizacji"""
+        sites = [Site('offline', f'http://127.0.0.1:{closed_port}')]
+        with pytest.raises(ValueError, match='gte'):
+            run_fleet(sites, 'config', ['gte', 'MSSQL_HOST'])
+        with pytest.raises(ValueError, match='KEY=VALUE'):
+            run_fleet(sites, 'config', ['set', 'MSSQL_HOST'])
+        [result] = run_fleet(sites, 'config', [], timeout=0.5)
+        assert result.error.startswith('offline')
@@ -0,0 +1,73 @@
+# scripts/tests/test_health.py
+import time
+import socket
+import threading
+
+import pytest
+
+from health import ZplCheck
+
+
+@pytest.fixture
+def printer():
+    """Factory: fake printer socket answering each ~HS with the next list of (delay, bytes) sends"""
+    servers = []
+
+    def start(replies):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        servers.append(server)
+
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                for sends in replies:
+                    if not conn.recv(1024):
+                        return
+                    for delay, data in sends:
+                        time.sleep(delay)
+                        conn.sendall(data)
+                conn.recv(1024)
+
+        threading.Thread(target=serve, daemon=True).start()
+        return server.getsockname()[1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+FRAMES = [b'\x02030,0,0,1245,000,0,0,0,000,0,0,0\x03\r\n',
+          b'\x02000,0,0,0,0,2,4,0,00000000,1,000\x03\r\n',
+          b'\x021234,0\x03\r\n']
+
+
+class TestZplCheck:
+    def test_frames_split_across_segments(self, printer):
+        """Trzy ramki ~HS w kilku kawałkach - czekamy na wszystkie"""
+        data = b''.join(FRAMES)
+        port = printer([[(0, data[:10]), (0.05, data[10:50]), (0.05, data[50:])]])
+        check = ZplCheck('Zebra', '127.0.0.1', port, timeout=2)
+        result = check.run()
+        check.close()
+        assert result.status == 'OK'
+        assert result.latency >= 0.1
+
+    def test_incomplete_reply_times_out(self, printer):
+        port = printer([[(0, FRAMES[0])]])
+        check = ZplCheck('Zebra', '127.0.0.1', port, timeout=0.3)
+        result = check.run()
+        check.close()
+        assert not result.ok
+        assert result.status == 'TIMEOUT'
+
+    def test_late_bytes_drained_before_next_query(self, printer):
+        """Spóźnione bajty poprzedniej odpowiedzi nie są brane za nową"""
+        port = printer([[(0, b'STATUS:READY,JOBS:1\n'), (0.05, b'STATUS:STALE,JOBS:0\n')],
+                        [(0.05, b'STATUS:READY,JOBS:2\n')]])
+        check = ZplCheck('Zebra', '127.0.0.1', port, timeout=2)
+        assert check.run().data == {'STATUS': 'READY', 'JOBS': '1'}
+        time.sleep(0.2)
+        assert check.run().data == {'STATUS': 'READY', 'JOBS': '2'}
+        check.close()
@@ -0,0 +1,67 @@
+# scripts/tests/test_logfollow.py
+import sys
+
+from logfollow import LEVELS, LogFollower, ServiceStats, compose_source, line_level
+
+
+def follow(follower, *sources):
+    for lines in sources:
+        follower.add_source(iter(lines))
+    shown = []
+    follower.run(lambda service, line, level: shown.append((service, line)))
+    return shown
+
+
+class TestLineLevel:
+    def test_first_level_word(self):
+        assert line_level('2024-05-01 ERROR printer offline') == LEVELS['error']
+        assert line_level('[Warning] slow query, INFO follows') == LEVELS['warn']
+        assert line_level('Information only') is None      # whole words only
+        assert line_level('no level here') is None
+
+
+class TestLogFollower:
+    """Filtrowanie strumieniowe i statystyki per usługa"""
+
+    def test_pattern_and_level_filter(self):
+        follower = LogFollower(pattern=r'zebra', level='warn')
+        shown = follow(follower,
+                       [('zebra-1', 'INFO zebra ready'), ('zebra-1', 'ERROR zebra jam')],
+                       [('mssql', 'ERROR login failed'), ('mssql', 'WARN zebra table missing')])
+        assert sorted(shown) == [('mssql', 'WARN zebra table missing'), ('zebra-1', 'ERROR zebra jam')]
+        stats = follower.snapshot()
+        assert stats['zebra-1']['lines'] == 2 and stats['zebra-1']['shown'] == 1
+        assert stats['mssql']['errors'] == 1 and stats['mssql']['error_ratio'] == 0.5
+
+    def test_bounded_queue_loses_nothing(self):
+        """Kolejka na 2 linie, 500 linii - producent czeka, konsument dostaje wszystko"""
+        follower = LogFollower(max_queue=2)
+        shown = follow(follower, [('app', f'line {n}') for n in range(500)])
+        assert shown == [('app', f'line {n}') for n in range(500)]
+
+    def test_failed_source_reported(self):
+        def broken():
+            yield 'app', 'first'
+            raise OSError('stream closed')
+
+        shown = follow(LogFollower(), broken())
+        assert shown == [('app', 'first'), ('follower', 'ERROR source failed: stream closed')]
+
+
+class TestServiceStats:
+    def test_rates_over_window(self):
+        stats = ServiceStats(window=60)
+        for second in range(100, 120):
+            stats.add(LEVELS['info'], second + 0.5)
+            stats.add(LEVELS['error'] if second % 2 else None, second + 0.7)
+        assert stats.rates(119.9, window=10) == (2.0, 0.5)
+        assert stats.lines == 40 and stats.errors == 10
+        assert len(stats.buckets) == 20
+
+
+class TestComposeSource:
+    def test_lines_split_by_service(self):
+        follower = LogFollower()
+        script = "print('zebra-1  | INFO ready'); print('mssql | '); print('Attaching to zebra-1')"
+        lines = compose_source(follower, [sys.executable, '-c', script])
+        assert list(lines) == [('zebra-1', 'INFO ready'), ('mssql', ''), ('docker-compose', 'Attaching to zebra-1')]
@@ -0,0 +1,137 @@
+# scripts/tests/test_makejobs.py
+import os
+import time
+import threading
+
+import pytest
+
+import makejobs
+from makejobs import JobQueue, MakeLog, QueueFull
+
+MAKEFILE = """\
+start:
+\t@echo begin start; sleep 0.3; echo end start
+stop:
+\t@echo begin stop; echo end stop
+status:
+\t@echo mssql up
+broken:
+\t@exit 3
+"""
+
+
+def header(target, job):
+    return f"\n===== 2024-05-01T10:00:00 | make {target} | job {job} =====\n".encode()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """Factory: JobQueue running targets of a scratch Makefile"""
+    (tmp_path / 'Makefile').write_text(MAKEFILE)
+    output = []
+
+    def make(**kwargs):
+        jobs = JobQueue(['start', 'stop', 'status', 'broken'], log_dir=str(tmp_path / 'jobs'),
+                        history_file=str(tmp_path / 'jobs.jsonl'), cwd=str(tmp_path),
+                        on_output=output.append, **kwargs)
+        jobs.output = output
+        return jobs
+    return make
+
+
+def wait_idle(jobs):
+    deadline = time.monotonic() + 10
+    while jobs.state()['active'] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not jobs.state()['active']
+
+
+class TestJobQueue:
+    """Kolejka celów make - wyłączne po kolei, tylko do odczytu równolegle"""
+
+    def test_exclusive_in_order_read_only_alongside(self, queue):
+        jobs = queue()
+        start, stop, status = jobs.submit('start'), jobs.submit('stop'), jobs.submit('status')
+        assert [(job['target'], job['state']) for job in jobs.state()['active']] == [
+            ('start', 'running'), ('stop', 'queued'), ('status', 'running')]
+        wait_idle(jobs)
+        output = ''.join(jobs.output)
+        assert output.index('end start') < output.index('begin stop')
+        assert [job['target'] for job in jobs.jobs()] == ['stop', 'start', 'status']   # newest first
+        assert jobs.read_log(status.id).count('mssql up') == 1
+
+    def test_exit_code_and_history_reloaded(self, queue):
+        jobs = queue()
+        broken = jobs.submit('broken')
+        wait_idle(jobs)
+        assert jobs.get(broken.id).exit_code == 2          # make: *** Error 3
+        again = queue()
+        assert again.jobs()[0] == dict(jobs.jobs()[0])
+        assert again.submit('status').id == broken.id + 1
+        wait_idle(again)
+
+    def test_rejected_targets(self, queue, monkeypatch):
+        jobs = queue(parallel=1)
+        with pytest.raises(ValueError):
+            jobs.submit('clean')
+        monkeypatch.setattr(makejobs, 'MAX_QUEUED', 1)
+        jobs.submit('start')
+        jobs.submit('stop')                                 # waits behind start
+        with pytest.raises(QueueFull):
+            jobs.submit('stop')
+        wait_idle(jobs)
+
+
+class TestRunLog:
+    def make_log(self, tmp_path):
+        return MakeLog(str(tmp_path / 'make.log'), job_log_dir=str(tmp_path))
+
+    def test_job_run_served_from_its_own_log(self, tmp_path):
+        """Równoległe zadania przeplatają się w logu zbiorczym - widok przebiegu ich nie miesza"""
+        log = self.make_log(tmp_path)
+        log.write(header('status', 1))
+        log.write(header('logs', 2))
+        log.write(b'status line\n')
+        log.write(b'logs line\n')
+        (tmp_path / '1-status.log').write_bytes(header('status', 1) + b'status line\n')
+        text = log.run_log(log.run_list()[-1]['offset'])
+        log.close()
+        assert 'status line' in text
+        assert 'logs line' not in text
+
+    def test_pruned_job_log_falls_back_to_index(self, tmp_path):
+        """Log zadania usunięty z historii - przebieg z logu zbiorczego, do linii końcowej zadania"""
+        log = self.make_log(tmp_path)
+        log.write(header('status', 1))
+        log.write(b'status line\n')
+        log.write(b'\n===== 2024-05-01T10:00:05 | exit=0 | job 1 =====\n')
+        log.write(b'after the run\n')
+        assert not os.path.exists(tmp_path / '1-status.log')
+        text = log.run_log(log.run_list()[0]['offset'])
+        log.close()
+        assert 'status line' in text
+        assert text.endswith('exit=0 | job 1 =====\n')
+
+    def test_one_flusher_thread_for_many_bursts(self, tmp_path):
+        """Opóźniony zapis bufora - jeden wątek na cały log, nie jeden na porcję wyjścia"""
+        log = MakeLog(str(tmp_path / 'make.log'), flush_interval=0.01, job_log_dir=str(tmp_path))
+        before = threading.active_count()
+        for i in range(20):
+            log.write(b'output %d\n' % i)
+            time.sleep(0.02)
+        assert threading.active_count() - before <= 1
+        assert (tmp_path / 'make.log').read_bytes().endswith(b'output 19\n')
+        log.close()
+        log.flusher.join(1)
+        assert not log.flusher.is_alive()
+
+    def test_legacy_run_sliced_between_headers(self, tmp_path):
+        """Stare przebiegi bez numeru zadania - wycinek od nagłówka do nagłówka"""
+        log = self.make_log(tmp_path)
+        log.write(b'\n===== 2024-05-01T10:00:00 | make status =====\nold output\n')
+        log.write(b'\n===== 2024-05-01T10:01:00 | make logs =====\nnext output\n')
+        offset = log.run_list()[-1]['offset']
+        text = log.run_log(offset)
+        log.close()
+        assert 'old output' in text
+        assert 'next output' not in text
@@ -0,0 +1,90 @@
+# scripts/tests/test_wapro_cli.py
+import os
+import json
+import shutil
+import importlib.util
+
+import pytest
+
+import envstore
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """wapro-cli.py as a module, working on a copy of .env.example in tmp_path"""
+    path = os.path.join(os.path.dirname(envstore.__file__), 'wapro-cli.py')
+    spec = importlib.util.spec_from_file_location('wapro_cli', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    env = tmp_path / '.env'
+    shutil.copy(module.ENV_EXAMPLE, env)
+    monkeypatch.setattr(module, 'ENV_FILE', str(env))
+    monkeypatch.setattr(module, 'DEVICES_FILE', str(tmp_path / 'discovered_devices.json'))
+    return module
+
+
+class TestConfig:
+    def test_suggest_rejected_by_schema_is_not_reported_as_applied(self, cli, tmp_path, capsys):
+        """Propozycja odrzucona przez schemat - kod błędu, plik bez zmian"""
+        (tmp_path / 'discovered_devices.json').write_text(json.dumps(
+            {'devices': {'mssql_servers': [{'host': '10.0.0.9', 'port': 'abc'}]}}))
+        before = (tmp_path / '.env').read_text()
+        assert cli.cmd_config(['suggest']) == 1
+        assert 'Applied' not in capsys.readouterr().out
+        assert (tmp_path / '.env').read_text() == before
+
+    def test_suggest_applied(self, cli, tmp_path, capsys):
+        (tmp_path / 'discovered_devices.json').write_text(json.dumps(
+            {'devices': {'mssql_servers': [{'host': '10.0.0.9', 'port': 1433}]}}))
+        assert not cli.cmd_config(['suggest'])
+        assert 'Applied 1 suggestions' in capsys.readouterr().out
+        assert 'MSSQL_HOST=10.0.0.9' in (tmp_path / '.env').read_text()
+
+
+class TestBatch:
+    """wapro-cli batch - jedna transakcja konfiguracji na cały plik poleceń"""
+
+    def run(self, cli, tmp_path, lines, *flags):
+        batch = tmp_path / 'batch.txt'
+        batch.write_text('\n'.join(lines) + '\n')
+        try:
+            return cli.cmd_batch([str(batch), *flags])
+        except SystemExit as e:
+            return e.code
+
+    def test_changes_written_once(self, cli, tmp_path, capsys):
+        code = self.run(cli, tmp_path, ['config set MSSQL_HOST 10.0.0.1', '# komentarz',
+                                        'config set ZEBRA_1_HOST 10.0.0.2'])
+        assert not code
+        text = (tmp_path / '.env').read_text()
+        assert 'MSSQL_HOST=10.0.0.1' in text and 'ZEBRA_1_HOST=10.0.0.2' in text
+        out = capsys.readouterr().out
+        assert 'ms, 1 .env write' in out and '.env writes' not in out
+
+    def test_failed_line_rolls_back(self, cli, tmp_path):
+        """Błąd w środku wsadu - wcześniejsze zmiany nie trafiają do .env"""
+        before = (tmp_path / '.env').read_text()
+        code = self.run(cli, tmp_path, ['config set MSSQL_HOST 10.0.0.1', 'konfig set MSSQL_PORT 1434',
+                                        'config set ZEBRA_1_HOST 10.0.0.2'])
+        assert code == 1
+        assert (tmp_path / '.env').read_text() == before
+
+    def test_failed_write_reported_with_timings(self, cli, tmp_path, monkeypatch, capsys):
+        """Nieudany zapis .env - komunikat i tabela czasów zamiast tracebacku"""
+        def full_disk(self, values, source=''):
+            raise OSError(28, 'No space left on device')
+
+        monkeypatch.setattr(envstore.EnvStore, 'update', full_disk)
+        code = self.run(cli, tmp_path, ['config set MSSQL_HOST 10.0.0.1'])
+        out = capsys.readouterr().out
+        assert code == 1
+        assert 'failed to save config' in out and '0 .env writes' in out
+        assert 'config set MSSQL_HOST 10.0.0.1' in out
+
+    def test_failed_flush_stops_before_next_command(self, cli, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(envstore.EnvStore, 'update', lambda *args, **kwargs: 1 / 0)
+        monkeypatch.setattr(cli, 'execute', lambda argv, execute=cli.execute:
+                            pytest.fail('status ran') if argv[0] == 'status' else execute(argv))
+        code = self.run(cli, tmp_path, ['config set MSSQL_HOST 10.0.0.1', 'status'])
+        assert code == 1
+        assert 'line 2: failed to save config' in capsys.readouterr().out
@@ -0,0 +1,256 @@
+# scripts/tests/test_webenv.py
+import json
+import time
+import shutil
+import socket
+import threading
+import http.client
+from urllib.parse import urlencode
+
+import webenv
+
+
+def request(port, method, path, params=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    if params is None:
+        conn.request(method, path)
+    else:
+        conn.request(method, path, urlencode(params), {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    return response, response.read()
+
+
+class TestAsyncServer:
+    """Serwer asyncio webenv"""
+
+    def test_head_does_not_start_discovery(self, start_webenv):
+        port = start_webenv()
+        tasks = dict(webenv.DISCOVERY.tasks)
+        response, _ = request(port, 'HEAD', '/discover')
+        assert response.status == 405
+        assert response.getheader('Allow') == 'GET'
+        assert webenv.DISCOVERY.tasks == tasks
+
+    def test_head_of_read_only_route(self, start_webenv):
+        port = start_webenv()
+        response, body = request(port, 'HEAD', '/load')
+        assert response.status == 200
+        assert body == b''
+
+    def test_route_exception_answers_500(self, start_webenv, monkeypatch):
+        port = start_webenv()
+
+        def broken_store(path):
+            raise RuntimeError('store unavailable')
+
+        monkeypatch.setattr(webenv, 'get_store', broken_store)
+        response, body = request(port, 'GET', '/load')
+        assert response.status == 500
+        assert response.getheader('Connection') == 'close'
+        assert body == b'Internal Server Error'
+
+
+class TestPage:
+    """Strona edytora - szablon skompilowany raz, treść plików wstawiana jako bajty"""
+
+    def test_template_slots(self):
+        template = webenv.PageTemplate('<p>{{port}}</p><pre>{{text}}</pre>{{port}}')
+        bound = template.bind(port='8888 <b>')
+        assert bound.segments == [b'<p>8888 &lt;b&gt;</p><pre>', 'text', b'</pre>8888 &lt;b&gt;']
+        assert bound.render({'text': b'x'}) == b'<p>8888 &lt;b&gt;</p><pre>x</pre>8888 &lt;b&gt;'
+
+    def test_env_cannot_close_the_textarea(self, tmp_path, monkeypatch):
+        """</textarea> w wartości .env zostaje tekstem edytora, nie kończy pola"""
+        path = tmp_path / '.env'
+        path.write_text('ZEBRA_1_NAME=</textarea><script>alert(1)</script>\n')
+        monkeypatch.setitem(webenv.PAGE_FILES, 'env_content', webenv.CachedFile(str(path)))
+        page = webenv.render_page(8888).decode()
+        assert '&lt;/textarea&gt;&lt;script&gt;alert(1)&lt;/script&gt;' in page
+        assert page.count('</textarea>') == webenv.HTML_TEMPLATE.count('</textarea>')
+
+    def test_file_reread_only_when_changed(self, tmp_path):
+        path = tmp_path / '.env'
+        path.write_text('A=1\n')
+        cached = webenv.CachedFile(str(path))
+        first = cached.bytes()
+        assert cached.bytes() is first
+        path.write_text('A=22\n')
+        assert cached.bytes() == b'A=22\n'
+
+
+def sse_events(port, last_id=None):
+    """Events of /admin/stream up to the first state event: [(name, id, data)]"""
+    head = 'GET /admin/stream HTTP/1.1\r\nHost: localhost\r\n'
+    if last_id is not None:
+        head += f'Last-Event-ID: {last_id}\r\n'
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        sock.sendall((head + '\r\n').encode())
+        data = b''
+        while b'event: state\n' not in data or not data.endswith(b'\n\n'):
+            chunk = sock.recv(65536)
+            assert chunk, data
+            data += chunk
+    events = []
+    for block in data.split(b'\r\n\r\n', 1)[1].decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+class TestMakeStream:
+    """/admin/stream - ponowne połączenie z Last-Event-ID dostaje tylko brakującą część"""
+
+    def test_resume_from_last_event_id(self, start_webenv):
+        port = start_webenv()
+        webenv._append_make_log('make start\n')
+        first = sse_events(port)
+        assert [name for name, _, _ in first] == ['reset', 'log', 'state']
+        last_id = first[1][1]
+        assert first[1][2].endswith('make start\n')
+
+        webenv._append_make_log('Creating mssql ... done\n')
+        webenv._append_make_log('Creating zebra-1 ... done\n')
+        resumed = sse_events(port, last_id)
+        assert [name for name, _, _ in resumed] == ['log', 'state']
+        assert resumed[0][2] == 'Creating mssql ... done\nCreating zebra-1 ... done\n'
+        assert int(resumed[0][1]) == int(last_id) + len(resumed[0][2])
+
+        assert sse_events(port, resumed[0][1])[0][0] == 'state'     # nothing missed
+
+    def test_id_past_the_end_resets(self, start_webenv):
+        """Log obcięty od ostatniego połączenia - klient dostaje reset i ogon logu"""
+        port = start_webenv()
+        webenv._append_make_log('line\n')
+        events = sse_events(port, 10 ** 12)
+        assert [name for name, _, _ in events] == ['reset', 'log', 'state']
+
+
+class FakeScanner:
+    def __init__(self):
+        self.log = print
+        self.on_event = None
+        self.release = threading.Event()
+
+    def run(self, quick=None):
+        self.log('[i] scanning')
+        self.on_event('progress', done=1, total=1)
+        self.on_event('host_probed', host='10.0.0.1')
+        self.release.wait(5)
+        return self
+
+    def to_dict(self):
+        return {'zebra_printers': []}
+
+
+class TestDiscovery:
+    """Wykrywanie w tle - jedno zadanie naraz, wyniki i zdarzenia per zadanie"""
+
+    def wait(self, task):
+        deadline = time.monotonic() + 5
+        while task.state == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert task.state == 'done', task.error
+
+    def test_requests_during_scan_join_it(self, tmp_path, monkeypatch):
+        scanner = FakeScanner()
+        monkeypatch.setattr(webenv, 'DISCOVERY_SCANNER', scanner)
+        service = webenv.DiscoveryService(str(tmp_path / 'devices.json'))
+        task, joined = service.start()
+        assert not joined
+        assert service.start() == (task, True)
+        scanner.release.set()
+        self.wait(task)
+        assert [name for name, _, _ in task.events] == ['progress', 'done']
+        assert task.events[-1][2]['output'] == '[i] scanning'
+        again, joined = service.start()
+        assert again is not task and not joined
+        self.wait(again)
+
+    def test_scanner_callbacks_restored(self, tmp_path, monkeypatch):
+        """Współdzielony skaner nie pisze do zakończonego zadania"""
+        scanner = FakeScanner()
+        scanner.release.set()
+        monkeypatch.setattr(webenv, 'DISCOVERY_SCANNER', scanner)
+        task, _ = webenv.DiscoveryService(str(tmp_path / 'devices.json')).start()
+        self.wait(task)
+        assert scanner.log is print
+        assert scanner.on_event is None
+        assert task.output == ['[i] scanning']
+
+    def test_cached_results(self, tmp_path):
+        """Ostatnie zapisane wyniki z wiekiem - plik czytany ponownie tylko po zmianie"""
+        path = tmp_path / 'devices.json'
+        service = webenv.DiscoveryService(str(path))
+        assert service.cached() is None
+        path.write_text(json.dumps({'devices': {'zebra_printers': []}}))
+        cached = service.cached()
+        assert cached['devices'] == {'devices': {'zebra_printers': []}} and cached['age'] <= 1
+        assert service.cached()['devices'] is cached['devices']
+        path.write_text('{broken')
+        assert service.cached() is None
+
+
+class TestSave:
+    """POST /save - łatka kluczy albo cały plik, zawsze względem rewizji bazowej"""
+
+    def env_file(self, tmp_path, monkeypatch, extra=''):
+        path = tmp_path / '.env'
+        shutil.copy(webenv.ENV_EXAMPLE, path)
+        with open(path, 'a') as f:
+            f.write(extra)
+        monkeypatch.setattr(webenv, 'ENV_FILE', str(path))
+        return path
+
+    def load(self, port):
+        return json.loads(request(port, 'GET', '/load')[1])
+
+    def test_content_needs_base(self, start_webenv, tmp_path, monkeypatch):
+        path = self.env_file(tmp_path, monkeypatch)
+        port = start_webenv()
+        before = path.read_text()
+        response, _ = request(port, 'POST', '/save', {'content': 'MSSQL_HOST=x\n'})
+        assert response.status == 400
+        assert path.read_text() == before
+
+    def test_content_with_base(self, start_webenv, tmp_path, monkeypatch):
+        path = self.env_file(tmp_path, monkeypatch)
+        port = start_webenv()
+        content = self.load(port)['content'] + '\n# test\n'
+        response, body = request(port, 'POST', '/save', {'base': self.load(port)['revision'], 'content': content})
+        assert response.status == 200, body
+        assert path.read_text() == content
+
+    def test_patch_checks_only_patched_keys(self, start_webenv, tmp_path, monkeypatch):
+        """Istniejący błąd w innym kluczu nie blokuje łatki - wraca jako ostrzeżenie"""
+        path = self.env_file(tmp_path, monkeypatch, '\nMSSQL_PORT=abc\n')
+        port = start_webenv()
+        loaded = self.load(port)
+        old = webenv.parse_env(loaded['content'])['ZEBRA_1_HOST']
+        patch = json.dumps({'ZEBRA_1_HOST': [old, '192.168.1.77']})
+        response, body = request(port, 'POST', '/save', {'base': loaded['revision'], 'patch': patch})
+        result = json.loads(body)
+        assert response.status == 200, body
+        assert any(w.startswith('MSSQL_PORT') for w in result['warnings'])
+        assert 'ZEBRA_1_HOST=192.168.1.77' in path.read_text()
+
+    def test_patch_rejects_invalid_patched_key(self, start_webenv, tmp_path, monkeypatch):
+        self.env_file(tmp_path, monkeypatch)
+        port = start_webenv()
+        loaded = self.load(port)
+        old = webenv.parse_env(loaded['content']).get('MSSQL_PORT')
+        patch = json.dumps({'MSSQL_PORT': [old, 'abc']})
+        response, body = request(port, 'POST', '/save', {'base': loaded['revision'], 'patch': patch})
+        assert response.status == 400
+        assert 'MSSQL_PORT' in json.loads(body)['error']
+
+    def test_patch_values_must_be_strings(self, start_webenv, tmp_path, monkeypatch):
+        """Liczby, listy i obiekty JSON w łatce - 400, plik bez zmian"""
+        path = self.env_file(tmp_path, monkeypatch)
+        port = start_webenv()
+        loaded = self.load(port)
+        for change in ([None, 1433], [None, ['a']], [{'a': 1}, 'x'], ['a', 'b', 'c'], 'x'):
+            patch = json.dumps({'MSSQL_PORT': change})
+            response, _ = request(port, 'POST', '/save', {'base': loaded['revision'], 'patch': patch})
+            assert response.status == 400, change
+        assert path.read_text() == loaded['content']
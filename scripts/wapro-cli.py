@@ -9,27 +9,32 @@ Usage:
     
 Commands:
     discover [--full]       Scan network for devices
+    sync [sqlite-file]      Upsert discovered printers into KonfiguracjaDrukarek
     config list             List current configuration
     config get <key>        Get config value
-    config set <key> <val>  Set config value
+    config set <key> <val>  Set config value (validated)
+    config check            Validate .env against .env.example schema
     config edit             Open interactive config editor
     start [--prod]          Start services
     stop [--prod]           Stop services
     restart [--prod]        Restart services
     status [--prod]         Show service status
-    logs [service]          Show logs
-    health                  Check health of all services
+    logs [service...]       Follow logs (--grep RE, --level L, --stats [N])
+    health [--watch [N]]    Check health of all services (refresh every N s)
+    watch [N]               Live dashboard (printers, services, containers)
+    fleet <action> [args]   health/status/config/discover on all fleet.conf sites
+    serve                   Resident command server (warm state for single commands)
+    batch [FILE|-]          Run commands from FILE or stdin, one .env write
     help                    Show this help
     exit                    Exit interactive mode
 """
 
 import os
 import sys
-import json
-import subprocess
-import readline
-import shlex
-from datetime import datetime
+import time
+
+# Heavier modules (json, subprocess, readline, re...) are imported where they
+# are used - single commands called from shell loops start in a few ms
 
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -78,61 +83,80 @@ def print_warn(msg):
 # CONFIG MANAGEMENT
 # =============================================================================
 
+# Batch mode transaction: {'config': {...}, 'changes': {...}} - saves stay in memory
+_config_txn = None
+
+
 def load_env():
-    """Load .env file as dictionary"""
-    config = {}
-    try:
-        with open(ENV_FILE, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
-    except FileNotFoundError:
-        pass
-    return config
+    """Parsed .env as dictionary (cached until the file changes)"""
+    if _config_txn is not None:
+        return dict(_config_txn['config'])
+    from envstore import get_store
+    return get_store(ENV_FILE).load()
+
+def check_config(config, keys):
+    """Validate changed keys against the .env.example schema; False on errors"""
+    from envschema import get_schema
+    ok = True
+    for issue in get_schema().validate(config, keys):
+        if issue.level == 'error':
+            print_error(f"Invalid {issue}")
+            ok = False
+        else:
+            print_warn(str(issue))
+    return ok
+
 
 def save_env(config):
-    """Save dictionary to .env file, preserving comments"""
+    """Save dictionary to .env file, preserving comments (atomic, locked)"""
+    from envstore import check_values
     try:
-        # Read original file to preserve comments
-        lines = []
-        try:
-            with open(ENV_FILE, 'r') as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            pass
-        
-        # Update values
-        updated_keys = set()
-        new_lines = []
-        for line in lines:
-            stripped = line.strip()
-            if stripped and not stripped.startswith('#') and '=' in stripped:
-                key = stripped.split('=', 1)[0].strip()
-                if key in config:
-                    new_lines.append(f"{key}={config[key]}\n")
-                    updated_keys.add(key)
-                else:
-                    new_lines.append(line)
-            else:
-                new_lines.append(line)
-        
-        # Add new keys
+        check_values(config)
+    except ValueError as e:
+        print_error(f"Config not saved: {e}")
+        return False
+    current = load_env()
+    if not check_config(config, [key for key, value in config.items() if current.get(key) != value]):
+        print_error("Config not saved")
+        return False
+    if _config_txn is not None:
         for key, value in config.items():
-            if key not in updated_keys:
-                new_lines.append(f"{key}={value}\n")
-        
-        with open(ENV_FILE, 'w') as f:
-            f.writelines(new_lines)
-        
+            if _config_txn['config'].get(key) != value:
+                _config_txn['changes'][key] = value
+        _config_txn['config'].update(config)
+        return True
+    try:
+        from envstore import get_store
+        get_store(ENV_FILE).update(config, source='wapro-cli')
         return True
     except Exception as e:
         print_error(f"Failed to save config: {e}")
         return False
 
 
+def begin_config():
+    """Start in-memory config transaction (one parse of .env)"""
+    global _config_txn
+    _config_txn = {'config': load_env(), 'changes': {}}
+
+
+def rollback_config():
+    """Drop pending changes"""
+    global _config_txn
+    _config_txn = None
+
+
+def commit_config():
+    """Write pending changes with one atomic update; returns number of keys written"""
+    global _config_txn
+    txn, _config_txn = _config_txn, None
+    if not txn or not txn['changes']:
+        return 0
+    from envstore import get_store
+    get_store(ENV_FILE).update(txn['changes'], source='wapro-cli')
+    return len(txn['changes'])
+
+
 def cmd_config(args):
     """Config management commands"""
     if not args:
@@ -190,6 +214,20 @@ def cmd_config(args):
                 print_success(f"Updated {key}: {old_value} -> {value}")
             else:
                 print_success(f"Set {key} = {value}")
+        else:
+            return 1
+    
+    elif subcmd == 'check':
+        from envschema import get_schema
+        issues = get_schema().validate(load_env())
+        for issue in issues:
+            if issue.level == 'error':
+                print_error(str(issue))
+            else:
+                print_warn(str(issue))
+        if any(issue.level == 'error' for issue in issues):
+            return 1
+        print_success("Configuration is valid")
     
     elif subcmd == 'edit':
         # Interactive config editor
@@ -214,6 +252,7 @@ def cmd_config(args):
         print("")
         
         # Load suggestions from discovered devices
+        import json
         suggestions = {}
         try:
             with open(DEVICES_FILE, 'r') as f:
@@ -257,13 +296,15 @@ def cmd_config(args):
                 return
         
         if changed:
-            if save_env(config):
-                print_success("Configuration saved!")
+            if not save_env(config):
+                return 1
+            print_success("Configuration saved!")
         else:
             print_info("No changes made")
     
     elif subcmd == 'suggest':
         # Apply all suggestions from discovered devices
+        import json
         try:
             with open(DEVICES_FILE, 'r') as f:
                 devices = json.load(f)
@@ -289,7 +330,8 @@ def cmd_config(args):
                 applied += 1
         
         if applied > 0:
-            save_env(config)
+            if not save_env(config):
+                return 1
             print_success(f"Applied {applied} suggestions")
         else:
             print_warn("No suggestions to apply")
@@ -303,62 +345,100 @@ def cmd_config(args):
 # DISCOVERY
 # =============================================================================
 
+_scanner = None
+
+
+def get_scanner():
+    """Discovery scanner, kept between commands in interactive mode"""
+    global _scanner
+    if _scanner is None:
+        from discover import Scanner
+        _scanner = Scanner(results_file=DEVICES_FILE)
+    return _scanner
+
+
 def cmd_discover(args):
     """Discover network devices"""
     full = '--full' in args or '-f' in args
     
     print_info("Scanning network for devices...")
     
-    script = os.path.join(SCRIPT_DIR, 'discover.py')
-    cmd = ['python3', script]
-    if not full:
-        cmd.append('-q')
+    def on_progress(stage, done, total, percent):
+        sys.stdout.write(f"\r\033[K  {stage}: {percent}% ({done}/{total})")
+        sys.stdout.flush()
+    
+    def on_device(device):
+        sys.stdout.write('\r\033[K')
+        print_success(f"Found {device.type}: {device.host}:{device.port}")
+    
+    scanner = get_scanner()
+    scanner.on_progress = on_progress
+    scanner.on_device = on_device
     
     try:
-        result = subprocess.run(cmd, cwd=PROJECT_DIR)
+        print_info(f"Networks: {', '.join(str(n) for n in scanner.resolve_networks())}")
+        try:
+            result = scanner.run(quick=not full)
+        except KeyboardInterrupt:
+            sys.stdout.write('\r\033[K')
+            print_warn("Discovery cancelled")
+            return
+        sys.stdout.write('\r\033[K')
         
         # Show summary
-        try:
-            with open(DEVICES_FILE, 'r') as f:
-                devices = json.load(f)
-            
+        print("")
+        print_info("Discovered devices:")
+        
+        printers = result.devices['zebra_printers']
+        mssql = result.devices['mssql_servers']
+        
+        for p in printers:
+            model = f" ({p.model})" if p.model else ''
+            print(f"  Zebra: {color(p.host + ':' + str(p.port), Colors.GREEN)}{model}")
+        
+        for m in mssql:
+            version = f" ({m.version})" if m.version else ''
+            print(f"  MSSQL: {color(m.host + ':' + str(m.port), Colors.BLUE)}{version}")
+        
+        if not printers and not mssql:
+            print_warn("  No devices found")
+        else:
             print("")
-            print_info("Discovered devices:")
-            
-            printers = devices.get('devices', {}).get('zebra_printers', [])
-            mssql = devices.get('devices', {}).get('mssql_servers', [])
-            
-            if printers:
-                for p in printers:
-                    print(f"  Zebra: {color(p['host'] + ':' + str(p['port']), Colors.GREEN)}")
-            
-            if mssql:
-                for m in mssql:
-                    print(f"  MSSQL: {color(m['host'] + ':' + str(m['port']), Colors.BLUE)}")
-            
-            if not printers and not mssql:
-                print_warn("  No devices found")
-            else:
-                print("")
-                print_info("Run 'config suggest' to apply discovered values")
-        except:
-            pass
+            print_info("Run 'config suggest' to apply discovered values")
+            print_info("Run 'sync' to store all printers in KonfiguracjaDrukarek")
     except Exception as e:
         print_error(f"Discovery failed: {e}")
 
 
+def cmd_sync(args):
+    """Upsert discovered printers into KonfiguracjaDrukarek"""
+    import json
+    try:
+        with open(DEVICES_FILE, 'r') as f:
+            printers = json.load(f).get('devices', {}).get('zebra_printers', [])
+    except FileNotFoundError:
+        print_warn("No discovered devices. Run 'discover' first.")
+        return
+    
+    from discover import SYNC_TABLE, SqlcmdDatabase, SqliteStandIn, sync_printers
+    db = SqliteStandIn(args[0]) if args else SqlcmdDatabase(ENV_FILE)
+    print_info(f"Syncing {len(printers)} printers to {SYNC_TABLE}" + (f" (stand-in: {args[0]})" if args else ''))
+    try:
+        synced = sync_printers(printers, db)
+    except Exception as e:
+        print_error(f"Sync failed: {e}")
+        return
+    print_success(f"{synced['printers']} printers: {synced['inserted']} new, {synced['updated']} updated")
+
+
 # =============================================================================
 # SERVICE MANAGEMENT
 # =============================================================================
 
 def run_docker_compose(args, prod=False):
     """Run docker-compose command"""
-    cmd = ['docker-compose']
-    if prod:
-        cmd.extend(['-f', 'docker-compose.prod.yml'])
-    else:
-        cmd.extend(['--profile', 'full'])
-    cmd.extend(args)
+    import subprocess
+    cmd = compose_command(args, prod=prod)
     
     # Try without sudo first
     try:
@@ -381,6 +461,32 @@ def run_docker_compose(args, prod=False):
         return False
 
 
+_docker = None
+
+
+def get_docker():
+    """Docker Engine API client if DOCKER_BACKEND=api and the socket answers, else None"""
+    global _docker
+    backend = os.environ.get('DOCKER_BACKEND') or load_env().get('DOCKER_BACKEND', 'compose')
+    if backend != 'api':
+        return None
+    if _docker is None:
+        from dockerapi import DockerClient
+        client = DockerClient()
+        if not client.ping():
+            print_warn(f"Docker API not reachable at {client.socket_path}, using docker-compose")
+            return None
+        _docker = client
+    return _docker
+
+
+def project_containers(docker, prod=False):
+    """Containers of this compose project (prod = created from docker-compose.prod.yml)"""
+    project = load_env().get('COMPOSE_PROJECT_NAME', 'prinet')
+    return [c for c in docker.containers(project=project)
+            if ('docker-compose.prod.yml' in c['config_files']) == prod]
+
+
 def cmd_start(args):
     """Start services"""
     prod = '--prod' in args or '-p' in args
@@ -390,7 +496,22 @@ def cmd_start(args):
     else:
         print_info("Starting DEVELOPMENT mode (all services)...")
     
-    if run_docker_compose(['up', '-d'], prod=prod):
+    docker = get_docker()
+    containers = project_containers(docker, prod) if docker else []
+    if containers:
+        # Containers exist - start them over the API, no docker-compose spawn
+        from dockerapi import DockerError
+        try:
+            for c in containers:
+                if c['state'] != 'running':
+                    docker.start(c['name'])
+                    print_success(f"Started {c['name']}")
+        except DockerError as e:
+            print_error(f"Failed to start services: {e}")
+            return
+        print_success("Services started")
+        cmd_status(args)
+    elif run_docker_compose(['up', '-d'], prod=prod):
         print_success("Services started")
         cmd_status(args)
     else:
@@ -406,7 +527,20 @@ def cmd_stop(args):
     else:
         print_info("Stopping all services...")
     
-    if run_docker_compose(['down'], prod=prod):
+    docker = get_docker()
+    if docker:
+        # API backend stops containers (kept for a fast start), docker-compose down removes them
+        from dockerapi import DockerError
+        try:
+            for c in project_containers(docker, prod):
+                if c['state'] == 'running':
+                    docker.stop(c['name'])
+                    print_success(f"Stopped {c['name']}")
+        except DockerError as e:
+            print_error(f"Failed to stop services: {e}")
+            return
+        print_success("Services stopped")
+    elif run_docker_compose(['down'], prod=prod):
         print_success("Services stopped")
     else:
         print_error("Failed to stop services")
@@ -418,13 +552,28 @@ def cmd_restart(args):
     cmd_start(args)
 
 
+def print_containers(containers):
+    """Container table from the Docker API"""
+    if not containers:
+        print_warn("  No containers - run 'start' first")
+        return
+    for c in containers:
+        state = color(f"{c['state']:<10}", Colors.GREEN if c['state'] == 'running' else Colors.RED)
+        ports = ', '.join(c['ports'])
+        print(f"  {c['name']:<22} {c['service'] or '-':<18} {state} {c['status']:<28} {ports}")
+
+
 def cmd_status(args):
     """Show service status"""
     prod = '--prod' in args or '-p' in args
     
     print_info("Service status:")
     print("")
-    run_docker_compose(['ps'], prod=prod)
+    docker = get_docker()
+    if docker:
+        print_containers(project_containers(docker, prod))
+    else:
+        run_docker_compose(['ps'], prod=prod)
     
     # Show endpoints
     config = load_env()
@@ -439,48 +588,231 @@ def cmd_status(args):
         print(f"  MSSQL:     {color('localhost:' + config.get('MSSQL_EXTERNAL_PORT', '1433'), Colors.BLUE)}")
 
 
+def compose_command(args, prod=False):
+    """docker-compose command line for the dev or prod stack"""
+    cmd = ['docker-compose']
+    if prod:
+        cmd.extend(['-f', 'docker-compose.prod.yml'])
+    else:
+        cmd.extend(['--profile', 'full'])
+    return cmd + list(args)
+
+
+def parse_logs_args(args):
+    """logs [service...] [--grep RE] [--level LEVEL] [--tail N] [--stats [N]] [--prod]"""
+    opts = {'services': [], 'grep': None, 'level': None, 'tail': 100, 'stats': None, 'prod': False}
+    args = list(args)
+    while args:
+        a = args.pop(0)
+        if a in ('--prod', '-p'):
+            opts['prod'] = True
+        elif a in ('--grep', '-g') and args:
+            opts['grep'] = args.pop(0)
+        elif a == '--level' and args:
+            opts['level'] = args.pop(0).lower()
+        elif a == '--tail' and args:
+            opts['tail'] = int(args.pop(0))
+        elif a == '--stats':
+            opts['stats'] = float(args.pop(0)) if args and args[0].replace('.', '', 1).isdigit() else 5.0
+        elif not a.startswith('-'):
+            opts['services'].append(a)
+        else:
+            raise ValueError(f"Unknown option: {a}")
+    return opts
+
+
+def print_log_stats(snapshot):
+    for service, s in snapshot.items():
+        errors = color(f"{s['errors_per_sec']:.2f} err/s", Colors.RED if s['errors_per_sec'] else Colors.GREEN)
+        print(color(f"  [stats] {service:<20} {s['lines_per_sec']:>7.2f} lines/s  ", Colors.MAGENTA)
+              + errors + color(f"  total {s['lines']} ({s['errors']} errors, {s['shown']} shown)", Colors.MAGENTA))
+
+
 def cmd_logs(args):
-    """Show logs"""
-    prod = '--prod' in args or '-p' in args
-    service = None
-    for a in args:
-        if not a.startswith('-'):
-            service = a
-            break
+    """Follow logs of services, with optional regex/level filters and rate stats"""
+    import re
+    from logfollow import LEVELS, LogFollower, compose_source, docker_source
+    
+    try:
+        opts = parse_logs_args(args)
+        if opts['level'] and opts['level'] not in LEVELS:
+            raise ValueError(f"Unknown level: {opts['level']} (use: {', '.join(LEVELS)})")
+        follower = LogFollower(pattern=opts['grep'], level=opts['level'])
+    except (ValueError, re.error) as e:
+        print_error(str(e))
+        return
+    
+    services = opts['services']
+    docker = get_docker()
+    if docker:
+        containers = [c for c in project_containers(docker, opts['prod'])
+                      if not services or c['service'] in services or c['name'] in services]
+        if not containers:
+            print_warn("No matching containers")
+            return
+        for c in containers:
+            follower.add_source(docker_source(docker, c['name'], c['service'], tail=opts['tail']))
+    else:
+        cmd = compose_command(['logs', '-f', '--no-color', f"--tail={opts['tail']}"] + services,
+                              prod=opts['prod'])
+        try:
+            follower.add_source(compose_source(follower, cmd, cwd=PROJECT_DIR))
+        except OSError as e:
+            print_error(f"Command failed: {e}")
+            return
+    
+    print_info(f"Following logs{' for ' + ', '.join(services) if services else ''}... (Ctrl+C to stop)")
+    width = max([len(name) for name in services] + [14])
+    level_colors = {LEVELS['warn']: Colors.YELLOW, LEVELS['error']: Colors.RED, LEVELS['fatal']: Colors.RED}
     
-    cmd = ['logs', '-f', '--tail=100']
-    if service:
-        cmd.append(service)
+    def on_line(service, line, level):
+        if level in level_colors:
+            line = color(line, level_colors[level])
+        print(f"{color(service.ljust(width), Colors.CYAN)} | {line}", flush=True)
     
-    print_info(f"Showing logs{' for ' + service if service else ''}... (Ctrl+C to stop)")
-    run_docker_compose(cmd, prod=prod)
+    try:
+        follower.run(on_line, on_stats=print_log_stats, stats_interval=opts['stats'])
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        follower.stop()
+    if opts['stats']:
+        print_info("Log stats:")
+        print_log_stats(follower.snapshot())
+
+
+def print_health(results):
+    """Health table: status, latency and target of every check"""
+    for r in results:
+        if r.ok:
+            status = color(f"{r.status:<8}", Colors.GREEN)
+        elif r.status.startswith('HTTP'):
+            status = color(f"{r.status:<8}", Colors.YELLOW)
+        else:
+            status = color(f"{r.status:<8}", Colors.RED)
+        latency = f"{r.latency_ms:>7.1f} ms" if r.latency is not None else f"{'-':>10}"
+        print(f"  {r.name:<12} {status} {latency}  {r.target}")
+
+
+_http_session = None
 
 
 def cmd_health(args):
-    """Check health of services"""
-    import urllib.request
+    """Check health of services (concurrently, with latency)"""
+    from datetime import datetime
+    from health import HealthChecker, HttpSession, checks_from_env, WATCH_INTERVAL
+    global _http_session
     
-    config = load_env()
+    watch = any(a in WATCH_FLAGS for a in args)
+    interval = WATCH_INTERVAL
+    numbers = [a for a in args if a.replace('.', '', 1).isdigit()]
+    if numbers:
+        interval = max(1.0, float(numbers[0]))
     
-    endpoints = [
-        ('RPI GUI', f"http://localhost:{config.get('RPI_GUI_EXTERNAL_PORT', '8082')}/health"),
-        ('RPI API', f"http://localhost:{config.get('RPI_API_EXTERNAL_PORT', '8081')}/health"),
-        ('Zebra 1', f"http://localhost:{config.get('ZEBRA_1_EXTERNAL_WEB_PORT', '8091')}/api/status"),
-        ('Zebra 2', f"http://localhost:{config.get('ZEBRA_2_EXTERNAL_WEB_PORT', '8092')}/api/status"),
-    ]
+    # Session outlives the command - keep-alive connections stay warm in serve mode
+    if _http_session is None:
+        _http_session = HttpSession()
+    checks = checks_from_env(load_env(), session=_http_session)
+    with HealthChecker(checks, close_sessions=False) as checker:
+        if not watch:
+            print_info("Health check:")
+            print("")
+            started = time.monotonic()
+            print_health(checker.run())
+            print("")
+            print_info(f"Checked in {time.monotonic() - started:.2f}s")
+            return
+        
+        try:
+            while True:
+                started = time.monotonic()
+                results = checker.run()
+                sys.stdout.write('\033[H\033[J')
+                print_info(f"Health check - {datetime.now().strftime('%H:%M:%S')} "
+                           f"(every {interval:g}s, Ctrl+C to stop)")
+                print("")
+                print_health(results)
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("")
+
+
+def cmd_watch(args):
+    """Live dashboard: printers, services, containers, make log"""
+    from dashboard import Dashboard, WATCH_INTERVAL
     
-    print_info("Health check:")
-    print("")
+    interval = WATCH_INTERVAL
+    numbers = [a for a in args if a.replace('.', '', 1).isdigit()]
+    if numbers:
+        interval = max(0.5, float(numbers[0]))
+    Dashboard(load_env(), interval=interval, docker=get_docker()).run()
+
+
+def cmd_fleet(args):
+    """Run health/status/config/discover on all sites of the fleet inventory"""
+    import json
+    from fleet import ACTIONS, FLEET_TIMEOUT, load_inventory, run_fleet, format_table, to_json
     
-    for name, url in endpoints:
-        try:
-            req = urllib.request.urlopen(url, timeout=3)
-            if req.status == 200:
-                print(f"  {name}: {color('OK', Colors.GREEN)}")
-            else:
-                print(f"  {name}: {color(f'HTTP {req.status}', Colors.YELLOW)}")
-        except Exception as e:
-            print(f"  {name}: {color('OFFLINE', Colors.RED)}")
+    inventory = None
+    timeout = FLEET_TIMEOUT
+    as_json = False
+    rest = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--inventory', '-i') and i + 1 < len(args):
+            inventory = os.path.join(START_DIR, args[i + 1])
+            i += 1
+        elif arg in ('--timeout', '-t') and i + 1 < len(args):
+            timeout = float(args[i + 1])
+            i += 1
+        elif arg == '--json':
+            as_json = True
+        else:
+            rest.append(arg)
+        i += 1
+    
+    if not rest or rest[0] not in ACTIONS:
+        print_error(f"Usage: fleet <{'|'.join(ACTIONS)}> [args] [--inventory FILE] [--timeout S] [--json]")
+        return
+    action, action_args = rest[0], rest[1:]
+    # Same syntax as the local command: config set KEY VALUE
+    if action == 'config' and len(action_args) == 3 and action_args[0] == 'set' and '=' not in action_args[1]:
+        action_args = ['set', f"{action_args[1]}={action_args[2]}"]
+    
+    try:
+        sites = load_inventory(inventory)
+    except (OSError, ValueError) as e:
+        print_error(f"Fleet inventory: {e}")
+        return
+    if not sites:
+        print_warn("Fleet inventory is empty")
+        return
+    
+    started = time.monotonic()
+    try:
+        results = run_fleet(sites, action, action_args, timeout=timeout)
+    except ValueError as e:
+        print_error(str(e))
+        return
+    elapsed = time.monotonic() - started
+    if as_json:
+        print(json.dumps(to_json(results), indent=2))
+        return
+    
+    print_info(f"fleet {' '.join(rest)} - {len(sites)} sites:")
+    print("")
+    header, *rows = format_table(results, action)
+    print(color(f"  {header}", Colors.CYAN))
+    for line, r in zip(rows, results):
+        print(color(f"  {line}", Colors.GREEN if r.ok else Colors.RED))
+    print("")
+    failed = sum(not r.ok for r in results)
+    summary = f"{len(results) - failed}/{len(results)} sites OK in {elapsed:.2f}s"
+    if failed:
+        print_warn(summary)
+    else:
+        print_success(summary)
 
 
 # =============================================================================
@@ -495,11 +827,14 @@ WAPRO Network Mock - CLI Commands
 
 DISCOVERY:
   discover [--full]         Scan network for devices (quick or full)
+  sync [sqlite-file]        Upsert discovered printers into KonfiguracjaDrukarek
+                            (MSSQL container, or a local SQLite stand-in)
 
 CONFIGURATION:
   config list               List all configuration values
   config get <key>          Get specific config value
-  config set <key> <value>  Set config value
+  config set <key> <value>  Set config value (validated against .env.example)
+  config check              Validate whole .env (types, ports, hosts, required)
   config edit               Interactive config editor
   config suggest            Apply discovered device values
 
@@ -508,8 +843,24 @@ SERVICES (Development - all containers):
   stop                      Stop all services
   restart                   Restart all services
   status                    Show service status
-  logs [service]            Show logs (optional: specific service)
-  health                    Check health of all services
+  logs [service...]         Follow logs (optional: specific services)
+    --grep RE               only lines matching regex
+    --level LEVEL           only lines at/above debug|info|warn|error|fatal
+    --tail N                lines of history per service (default: 100)
+    --stats [N]             lines/sec and error rate per service every N s
+  health                    Check health of all services (with latency)
+  health --watch [N]        Refresh health every N seconds (default: 5)
+  watch [N]                 Live dashboard: jobs/sec, SQL, containers, make log
+
+FLEET (many sites, via webenv admin API - inventory: fleet.conf):
+  fleet health              Health of every site, concurrently
+  fleet status              webenv make job state of every site
+  fleet config get [key...] Config values of every site
+  fleet config set <k> <v>  Set config value on every site
+  fleet discover            Quick network scan on every site
+    --inventory FILE        'name url [token]' per line (default: fleet.conf)
+    --timeout S             per-site timeout (default: 10)
+    --json                  machine-readable results
 
 SERVICES (Production - only RPI Server):
   start --prod              Start production mode
@@ -518,6 +869,11 @@ SERVICES (Production - only RPI Server):
   logs --prod               Show production logs
 
 OTHER:
+  batch [FILE|-] [-k]       Run commands from FILE or stdin in one process;
+                            config changes are written once (atomic), -k keeps
+                            going after errors
+  serve                     Run resident command server on .wapro-cli.sock -
+                            later 'wapro-cli.py <command>' calls run inside it
   help                      Show this help
   exit / quit               Exit CLI
 
@@ -527,10 +883,249 @@ SHORTCUTS:
   s                         status
   l                         logs
   h                         health
+  w                         watch
   ?                         help
 """, Colors.CYAN))
 
 
+# =============================================================================
+# BATCH MODE - many commands, one process, one .env write
+# =============================================================================
+
+# Commands that only touch config in memory; anything else sees .env on disk
+# (docker-compose reads it), so pending changes are written before it runs
+TXN_COMMANDS = {'config', 'c', 'help', '?'}
+
+
+def save_batch_config(where):
+    """commit_config() with errors reported; None if nothing could be written"""
+    try:
+        return commit_config()
+    except Exception as e:
+        print_error(f"{where}: failed to save config: {e}")
+        return None
+
+
+def read_batch(path):
+    """Command lines from file or stdin ('-'), without blanks and # comments"""
+    import shlex
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    commands = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            commands.append((number, shlex.split(line)))
+    return commands
+
+
+def cmd_batch(args):
+    """Run commands from a file or stdin in one process with one config transaction"""
+    path = next((a for a in args if not a.startswith('-') or a == '-'), '-')
+    keep_going = '--keep-going' in args or '-k' in args
+    if path != '-':
+        path = os.path.join(START_DIR, path)
+    try:
+        commands = read_batch(path)
+    except (OSError, ValueError) as e:
+        print_error(f"Cannot read batch: {e}")
+        sys.exit(1)
+    
+    timings = []
+    writes = 0
+    failed = None
+    save_failed = False
+    started = time.perf_counter()
+    begin_config()
+    try:
+        for number, argv in commands:
+            if argv[0].lower() in ('batch', 'serve') or is_local_command(argv):
+                print_error(f"line {number}: '{argv[0]}' is not allowed in batch mode")
+                code = 1
+                elapsed = 0.0
+            else:
+                cmd = argv[0].lower()
+                if cmd in COMMANDS and cmd not in TXN_COMMANDS and _config_txn['changes']:
+                    if save_batch_config(f"line {number}") is None:
+                        timings.append((number, argv, 0.0, 1))
+                        failed = number
+                        break
+                    writes += 1
+                    begin_config()
+                t = time.perf_counter()
+                try:
+                    code = execute(argv)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 1
+                except Exception as e:
+                    print_error(f"line {number}: {e}")
+                    code = 1
+                elapsed = time.perf_counter() - t
+            timings.append((number, argv, elapsed, code))
+            if code and not keep_going:
+                failed = number
+                break
+    except BaseException:
+        rollback_config()
+        raise
+    if failed is None:
+        written = save_batch_config('end of batch')
+        save_failed = written is None
+        writes += bool(written)
+    else:
+        rollback_config()
+    
+    total = time.perf_counter() - started
+    print("")
+    print_info(f"Batch: {len(timings)}/{len(commands)} commands in {total * 1000:.1f} ms, "
+               f"{writes} .env write{'s' if writes != 1 else ''}")
+    for number, argv, elapsed, code in timings:
+        mark = color('ok ', Colors.GREEN) if not code else color('ERR', Colors.RED)
+        print(f"  {mark} {elapsed * 1000:>8.2f} ms  {number:>4}: {' '.join(argv)}")
+    if failed is not None:
+        print_error(f"Stopped at line {failed} - pending config changes discarded")
+        sys.exit(1)
+    if save_failed or any(code for *_, code in timings):
+        sys.exit(1)
+
+
+# =============================================================================
+# RESIDENT MODE - command server on a Unix socket, thin client in run_single
+# =============================================================================
+
+SERVER_SOCKET = os.environ.get('WAPRO_CLI_SOCKET') or os.path.join(PROJECT_DIR, '.wapro-cli.sock')
+EXIT_MARKER = b'\0EXIT:'
+# Interactive or never-ending commands, and fleet (caller's inventory path and
+# WEBENV_ADMIN_TOKEN), always run in the calling process
+LOCAL_COMMANDS = {'serve', 'batch', 'watch', 'w', 'logs', 'l', 'fleet'}
+WATCH_FLAGS = {'--watch', '-w'}          # endless loops - never run inside the server
+
+
+def is_local_command(args):
+    return (args[0].lower() in LOCAL_COMMANDS or any(a in WATCH_FLAGS for a in args)
+            or [a.lower() for a in args[:2]] == ['config', 'edit'])
+
+
+def connect_server():
+    """Socket connected to the resident server, None if no server listens"""
+    if not os.path.exists(SERVER_SOCKET):
+        return None
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SERVER_SOCKET)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def run_remote(args):
+    """Send command to the resident server, relay its output; None if no server listens"""
+    sock = connect_server()
+    if sock is None:
+        return None
+    import socket
+    
+    out = sys.stdout.buffer
+    pending = b''
+    with sock:
+        sock.sendall('\0'.join(args).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            pending += chunk
+            # hold back the tail - it may be the start of the exit marker
+            if len(pending) > 64:
+                out.write(pending[:-64])
+                out.flush()
+                pending = pending[-64:]
+    head, marker, code = pending.rpartition(EXIT_MARKER)
+    if not marker:
+        out.write(pending)
+        out.flush()
+        return 1
+    out.write(head)
+    out.flush()
+    return int(code or 1)
+
+
+def serve_client(conn):
+    """Execute one request with stdout/stderr sent back over the connection"""
+    import contextlib
+    
+    data = b''
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    args = data.decode('utf-8', errors='replace').split('\0')
+    if not args or not args[0]:
+        return
+    
+    stream = conn.makefile('w', encoding='utf-8', errors='replace', buffering=1)
+    code = 1
+    try:
+        with contextlib.redirect_stdout(stream), contextlib.redirect_stderr(stream):
+            try:
+                code = execute(args)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print_error(f"{args[0]} failed: {e}")
+        stream.flush()
+        conn.sendall(EXIT_MARKER + str(code).encode())
+    except OSError:
+        pass                            # client went away (Ctrl+C)
+    finally:
+        stream.close()
+
+
+def cmd_serve(args):
+    """Resident command server - config, HTTP sessions and discovery state stay warm"""
+    import signal
+    import socket
+    
+    probe = connect_server()
+    if probe is not None:
+        probe.close()
+        print_error(f"Server already running on {SERVER_SOCKET}")
+        return
+    if os.path.exists(SERVER_SOCKET):
+        os.unlink(SERVER_SOCKET)            # stale socket of a killed server
+    
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SERVER_SOCKET)
+    os.chmod(SERVER_SOCKET, 0o600)
+    server.listen(16)
+    load_env()
+    print_info(f"Command server listening on {SERVER_SOCKET} (Ctrl+C to stop)")
+    print_info("wapro-cli.py <command> now runs here")
+    
+    def on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, on_sigterm)
+    
+    # One command at a time - commands share stdout redirection and state
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                serve_client(conn)
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        server.close()
+        os.unlink(SERVER_SOCKET)
+        print_info("Command server stopped")
+
+
 # =============================================================================
 # MAIN LOOP
 # =============================================================================
@@ -538,6 +1133,7 @@ SHORTCUTS:
 COMMANDS = {
     'discover': cmd_discover,
     'd': cmd_discover,
+    'sync': cmd_sync,
     'config': cmd_config,
     'c': lambda args: cmd_config(['list']),
     'start': cmd_start,
@@ -549,7 +1145,12 @@ COMMANDS = {
     'l': cmd_logs,
     'health': cmd_health,
     'h': cmd_health,
+    'watch': cmd_watch,
+    'w': cmd_watch,
+    'fleet': cmd_fleet,
     'help': cmd_help,
+    'serve': cmd_serve,
+    'batch': cmd_batch,
     '?': cmd_help,
 }
 
@@ -565,6 +1166,9 @@ def complete(text, state):
 
 def run_interactive():
     """Run interactive mode"""
+    import readline
+    import shlex
+    
     print_header()
     
     # Setup readline
@@ -620,16 +1224,26 @@ def run_interactive():
         pass
 
 
-def run_single(args):
-    """Run single command"""
+def execute(args):
+    """Run one command, return exit code"""
     cmd = args[0].lower()
-    cmd_args = args[1:]
-    
-    if cmd in COMMANDS:
-        COMMANDS[cmd](cmd_args)
-    else:
+    if cmd not in COMMANDS:
         print_error(f"Unknown command: {cmd}")
-        sys.exit(1)
+        return 1
+    code = COMMANDS[cmd](args[1:])
+    return code if isinstance(code, int) else 0
+
+
+def run_single(args):
+    """Run single command - in the resident server if one is listening"""
+    if not is_local_command(args):
+        code = run_remote(args)
+        if code is not None:
+            sys.exit(code)
+    sys.exit(execute(args))
+
+
+START_DIR = os.getcwd()
 
 
 def main():
@@ -1,25 +1,71 @@
 #!/usr/bin/env python3
 """
 Web-based .env editor for WAPRO Network Mock
-Usage: python3 webenv.py [port]
+Usage: python3 webenv.py [port] [--threaded]
 Default port: 8888
+
+Default server is asyncio: HTTP/1.1 keep-alive, gzip (or br, if the brotli
+module is installed) for HTML/JSON, ETag + If-None-Match -> 304. Cheap GETs
+are answered on the event loop, the rest in a small thread pool.
+--threaded runs the same handler on ThreadingHTTPServer.
 """
 
+import io
 import os
+import re
 import sys
+import gzip
+import html
 import json
+import hashlib
+import time
+import traceback
+import queue
+import asyncio
 import threading
-import subprocess
-from datetime import datetime
+import http.client
+from http import HTTPStatus
+from collections import OrderedDict, deque
+from dataclasses import replace
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
 from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 
+try:
+    import brotli
+except ImportError:             # optional - gzip only
+    brotli = None
+
+from envstore import EnvConflict, get_store, parse_env, revision
+from envschema import REQUIRED_KEYS, Issue, get_schema
+from makejobs import JobQueue, MakeLog, QueueFull
+
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
-ENV_FILE = os.path.join(PROJECT_DIR, '.env')
+ENV_FILE = os.getenv('WEBENV_ENV_FILE') or os.path.join(PROJECT_DIR, '.env')
 ENV_EXAMPLE = os.path.join(PROJECT_DIR, '.env.example')
+DEVICES_FILE = os.path.join(PROJECT_DIR, 'logs', 'discovered_devices.json')
 DEFAULT_PORT = 8888
+KEEPALIVE_TIMEOUT = 15          # idle seconds before a kept-alive connection is closed
+MAX_REQUESTS_PER_CONNECTION = 1000
+MAX_BODY_SIZE = 1024 * 1024
+REQUEST_WORKERS = 8             # threads for slow routes (health, saves)
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript')
+# GET routes cheap enough to answer on the event loop (cached reads, no subprocess)
+INLINE_ROUTES = {'/', '/load', '/history', '/devices', '/admin/status', '/admin/logs', '/admin/config',
+                 '/admin/stream', '/admin/jobs', '/admin/runs', '/discover', '/discover/stream'}
+JOB_LOG_RE = re.compile(r'^/admin/jobs/(\d+)/log$')
+# GET routes HEAD must not run: /discover starts a scan, the others are endless streams
+GET_ONLY_ROUTES = {'/discover', '/discover/stream', '/admin/stream'}
+STREAM_QUEUE_SIZE = 1000        # events buffered per SSE client before it is dropped
+STREAM_REPLAY_BYTES = 64 * 1024 # recent make log kept in memory for Last-Event-ID resume
+STREAM_TAIL_BYTES = 20000       # log sent to a new SSE client (same as /admin/logs)
+DISCOVERY_EVENTS = ('scan_started', 'device', 'progress', 'fingerprint')   # forwarded to clients
+DISCOVERY_TASKS_KEPT = 5        # finished scans still answerable by task id
+STREAM_HEARTBEAT = 15
 
 ADMIN_TOKEN = os.getenv('WEBENV_ADMIN_TOKEN', '')
 ALLOWED_MAKE_TARGETS = [
@@ -36,83 +82,288 @@ ALLOWED_MAKE_TARGETS = [
     'prod-build',
 ]
 MAKE_LOG_FILE = os.path.join(PROJECT_DIR, 'logs', 'webenv_make.log')
-MAKE_STATE_LOCK = threading.Lock()
-MAKE_STATE = {
-    'running': False,
-    'target': None,
-    'pid': None,
-    'exit_code': None,
-    'started_at': None,
-    'ended_at': None,
-}
-MAKE_PROCESS = None
+MAKE_LOG_LOCK = threading.Lock()
+DISCOVERY_SCANNER = None
+HEALTH_SESSION = None
+
+
+class StreamSubscriber:
+    """Bounded event queue of one SSE client; wake() tells an asyncio consumer
+
+    None in the queue ends the stream (finish()).
+    """
+
+    def __init__(self, wake=None):
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.wake = wake
+        self.dropped = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped = True         # too slow - ends its stream, the browser resumes by id
+        if self.wake:
+            self.wake()
+        return not self.dropped
+
+    def finish(self):
+        self.push(None)
+
+
+class MakeLogStream:
+    """Fan-out of make log chunks and state changes to SSE subscribers
+
+    Log events carry the offset of their end in the make log as id, so a
+    client reconnecting with Last-Event-ID gets exactly the part it missed -
+    from the in-memory replay buffer, or one read of the log if it is older.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.recent = deque()           # (start, end, bytes)
+        self.recent_bytes = 0
+        self.offset = log.end
+
+    def append(self, data, end):
+        """Record bytes just written to the log, ending at offset end, and push them"""
+        with self.lock:
+            start = end - len(data)
+            self.offset = end
+            self.recent.append((start, self.offset, data))
+            self.recent_bytes += len(data)
+            while self.recent_bytes > STREAM_REPLAY_BYTES and len(self.recent) > 1:
+                self.recent_bytes -= len(self.recent.popleft()[2])
+            self._publish(('log', self.offset, data.decode('utf-8', errors='replace')))
+
+    def publish_state(self, state):
+        with self.lock:
+            self._publish(('state', None, state))
+
+    def _publish(self, event):
+        for subscriber in list(self.subscribers):
+            if not subscriber.push(event):
+                self.subscribers.discard(subscriber)
+
+    def subscribe(self, last_id=None, wake=None):
+        """(subscriber, backlog events) - backlog is what the client has not seen yet"""
+        subscriber = StreamSubscriber(wake)
+        with self.lock:
+            end = self.offset
+            self.subscribers.add(subscriber)
+            start = max(0, end - STREAM_TAIL_BYTES) if last_id is None else last_id
+            if start > end:             # log was truncated since
+                start = max(0, end - STREAM_TAIL_BYTES)
+                last_id = None
+            replay = b''
+            if self.recent and self.recent[0][0] <= start:
+                replay = b''.join(data[max(0, start - s):] for s, e, data in self.recent if e > start)
+        if start < end and not replay:
+            # Older than the replay buffer - one read of the missing range
+            try:
+                replay = self.log.read(max(start, end - STREAM_REPLAY_BYTES), end)
+            except OSError:
+                replay = b''
+        backlog = [] if last_id is not None else [('reset', None, '')]
+        if replay:
+            backlog.append(('log', end, replay.decode('utf-8', errors='replace')))
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+
+MAKE_LOG = MakeLog(MAKE_LOG_FILE)
+MAKE_LOG_STREAM = MakeLogStream(MAKE_LOG)
+
+
+SSE_HEADERS = [
+    ('Content-Type', 'text/event-stream'),
+    ('Cache-Control', 'no-cache'),
+    ('X-Accel-Buffering', 'no'),
+]
+
+
+def format_event(event):
+    """SSE wire format - data is one JSON line"""
+    name, event_id, data = event
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def _publish_make_state() -> None:
+    MAKE_LOG_STREAM.publish_state(MAKE_JOBS.state())
 
 
 def _append_make_log(text: str) -> None:
-    os.makedirs(os.path.dirname(MAKE_LOG_FILE), exist_ok=True)
-    with open(MAKE_LOG_FILE, 'a', encoding='utf-8', errors='replace') as f:
-        f.write(text)
+    # Jobs run in parallel - log order and stream offsets must agree
+    data = text.encode('utf-8', errors='replace')
+    with MAKE_LOG_LOCK:
+        MAKE_LOG_STREAM.append(data, MAKE_LOG.write(data))
 
 
 def _read_make_log_tail(max_bytes: int = 20000) -> str:
     try:
-        with open(MAKE_LOG_FILE, 'rb') as f:
-            f.seek(0, os.SEEK_END)
-            size = f.tell()
-            f.seek(max(0, size - max_bytes))
-            data = f.read()
-        return data.decode('utf-8', errors='replace')
-    except FileNotFoundError:
-        return ''
+        return MAKE_LOG.tail(max_bytes)
     except Exception as e:
         return f'[webenv] Error reading log: {e}'
 
 
-def _run_make_target_in_background(target: str) -> None:
-    global MAKE_PROCESS
+MAKE_JOBS = JobQueue(ALLOWED_MAKE_TARGETS, on_output=_append_make_log, on_change=_publish_make_state)
 
-    started_at = datetime.now().isoformat(timespec='seconds')
-    _append_make_log(f"\n===== {started_at} | make {target} =====\n")
 
-    try:
-        proc = subprocess.Popen(
-            ['make', target],
-            cwd=PROJECT_DIR,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-        )
-
-        with MAKE_STATE_LOCK:
-            MAKE_PROCESS = proc
-            MAKE_STATE['pid'] = proc.pid
-
-        if proc.stdout:
-            for line in proc.stdout:
-                _append_make_log(line)
-
-        exit_code = proc.wait()
-
-        ended_at = datetime.now().isoformat(timespec='seconds')
-        _append_make_log(f"\n===== {ended_at} | exit={exit_code} =====\n")
-
-        with MAKE_STATE_LOCK:
-            MAKE_STATE['running'] = False
-            MAKE_STATE['exit_code'] = exit_code
-            MAKE_STATE['ended_at'] = ended_at
-            MAKE_STATE['pid'] = None
-            MAKE_PROCESS = None
+def _get_discovery_scanner():
+    """Discovery scanner shared by requests (worker pool and networks reused)"""
+    global DISCOVERY_SCANNER
+    if DISCOVERY_SCANNER is None:
+        from discover import Scanner
+        DISCOVERY_SCANNER = Scanner(quick=True, results_file=DEVICES_FILE)
+    return DISCOVERY_SCANNER
+
+
+class DiscoveryTask:
+    """One background quick scan; its events are kept for clients joining late
+
+    Events: scan_started, device, progress, fingerprint (from Scanner), then
+    done (with the full result) or scan_failed. Event ids count from 0 per task.
+    """
+
+    def __init__(self, task_id):
+        self.id = task_id
+        self.state = 'running'
+        self.started_at = time.time()
+        self.ended_at = None
+        self.result = None
+        self.error = None
+        self.output = []
+        self.events = []
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def publish(self, name, data):
+        with self.lock:
+            event = (name, len(self.events), data)
+            self.events.append(event)
+            for subscriber in list(self.subscribers):
+                if not subscriber.push(event):
+                    self.subscribers.discard(subscriber)
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        if error is None:
+            self.publish('done', {'devices': result, 'output': '\n'.join(self.output)})
+        else:
+            self.publish('scan_failed', {'error': error})
+        with self.lock:
+            self.state = 'done' if error is None else 'error'
+            self.ended_at = time.time()
+            for subscriber in self.subscribers:
+                subscriber.finish()
+            self.subscribers.clear()
+
+    def subscribe(self, last_id=None, wake=None):
+        """(subscriber, backlog) - everything after last_id; ends with the scan"""
+        subscriber = StreamSubscriber(wake)
+        with self.lock:
+            backlog = self.events[0 if last_id is None else last_id + 1:]
+            if self.state == 'running':
+                self.subscribers.add(subscriber)
+            else:
+                subscriber.finish()
+        return subscriber, list(backlog)
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def to_dict(self):
+        return {'id': self.id, 'state': self.state, 'started_at': round(self.started_at, 3),
+                'ended_at': self.ended_at and round(self.ended_at, 3), 'error': self.error}
+
+
+class DiscoveryService:
+    """Deduplicated background discovery - requests during a scan join it"""
+
+    def __init__(self, results_file=DEVICES_FILE):
+        self.results_file = results_file
+        self.lock = threading.Lock()
+        self.tasks = OrderedDict()      # id -> DiscoveryTask, newest last
+        self.next_id = 1
+        self._cache = (None, None)      # (file stamp, parsed results)
+
+    def start(self):
+        """(task, joined) - the running scan, or a new one"""
+        with self.lock:
+            if self.tasks:
+                task = next(reversed(self.tasks.values()))
+                if task.state == 'running':
+                    return task, True
+            task = DiscoveryTask(self.next_id)
+            self.next_id += 1
+            self.tasks[task.id] = task
+            while len(self.tasks) > DISCOVERY_TASKS_KEPT:
+                self.tasks.popitem(last=False)
+        threading.Thread(target=self._run, args=(task,), name=f'discover-{task.id}', daemon=True).start()
+        return task, False
+
+    def get(self, task_id):
+        with self.lock:
+            return self.tasks.get(task_id)
+
+    def _run(self, task):
+        scanner = _get_discovery_scanner()
+        previous = scanner.log, scanner.on_event
+        scanner.log = task.output.append
+        scanner.on_event = lambda event, **fields: (
+            task.publish(event, fields) if event in DISCOVERY_EVENTS else None)
+        try:
+            result = scanner.run(quick=True)
+        except Exception as e:
+            task.finish(error=str(e))
+        else:
+            task.finish(result.to_dict())
+        finally:
+            # The scanner is shared - the next task must not log into this one
+            scanner.log, scanner.on_event = previous
+
+    def cached(self):
+        """Last saved results with their age in seconds, None if there are none"""
+        try:
+            st = os.stat(self.results_file)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._cache[0] != stamp:
+            try:
+                with open(self.results_file, 'r') as f:
+                    self._cache = (stamp, json.load(f))
+            except (OSError, ValueError):
+                return None
+        return {'devices': self._cache[1], 'age': round(time.time() - st.st_mtime)}
+
+
+DISCOVERY = DiscoveryService()
+
+
+def _run_health_checks():
+    """Health of this site's services (fleet mode), HTTP session kept between requests"""
+    global HEALTH_SESSION
+    from health import HealthChecker, HttpSession, checks_from_env
+    if HEALTH_SESSION is None:
+        HEALTH_SESSION = HttpSession()
+    checks = checks_from_env(get_store(ENV_FILE).load(), session=HEALTH_SESSION)
+    with HealthChecker(checks, close_sessions=False) as checker:
+        return [{'name': r.name, 'kind': r.kind, 'target': r.target, 'ok': r.ok,
+                 'status': r.status, 'latency_ms': r.latency_ms, 'error': r.error}
+                for r in checker.run()]
 
-    except Exception as e:
-        ended_at = datetime.now().isoformat(timespec='seconds')
-        _append_make_log(f"\n===== {ended_at} | ERROR: {e} =====\n")
-        with MAKE_STATE_LOCK:
-            MAKE_STATE['running'] = False
-            MAKE_STATE['exit_code'] = 1
-            MAKE_STATE['ended_at'] = ended_at
-            MAKE_STATE['pid'] = None
-            MAKE_PROCESS = None
 
 HTML_TEMPLATE = '''<!DOCTYPE html>
 <html lang="pl">
@@ -313,13 +564,14 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                     <span id="fileStatus"></span>
                 </div>
                 <div class="panel-body">
-                    <textarea id="envEditor" placeholder="Ladowanie...">{{env_content}}</textarea>
+                    <textarea id="envEditor" placeholder="Ladowanie..." data-revision="{{env_revision}}">{{env_content}}</textarea>
                     <div class="actions">
                         <button class="btn btn-primary" onclick="saveEnv()">Zapisz .env</button>
                         <button class="btn btn-secondary" onclick="reloadEnv()">Odśwież</button>
                         <button class="btn btn-danger" onclick="resetEnv()">Reset do .env.example</button>
                     </div>
                     <div id="status" class="status"></div>
+                    <div id="mergeView" style="display: none; margin-top: 10px;"></div>
                 </div>
             </div>
             
@@ -396,6 +648,9 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 <div style="margin-top: 10px; display: flex; gap: 10px; flex-wrap: wrap;">
                     <input type="password" id="adminToken" placeholder="Admin token (opcjonalnie)" style="flex: 1; min-width: 260px; padding: 8px; background: #0d0d1a; border: 1px solid #3d3d4d; border-radius: 4px; color: #e4e4e4;">
                     <button class="btn btn-secondary" onclick="saveAdminToken()">Zapisz token</button>
+                    <select id="makeRuns" onchange="showMakeRun()" onfocus="loadMakeRuns()" style="min-width: 260px; padding: 8px; background: #0d0d1a; border: 1px solid #3d3d4d; border-radius: 4px; color: #e4e4e4;">
+                        <option value="">Log na zywo</option>
+                    </select>
                 </div>
                 <textarea id="makeLog" readonly style="height: 220px; margin-top: 10px; opacity: 0.9;"></textarea>
             </div>
@@ -457,7 +712,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 localStorage.removeItem('webenv_admin_token');
                 showStatus('Usunieto token admina', 'success');
             }
-            refreshMakePanel();
+            if (!startMakeStream()) refreshMakePanel();
         }
 
         async function fetchMakeStatus() {
@@ -467,24 +722,102 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             return await response.json();
         }
 
-        async function fetchMakeLogs() {
+        async function fetchMakeLogs(run) {
             const token = getAdminToken();
             const headers = token ? { 'X-Admin-Token': token } : {};
-            const response = await fetch('/admin/logs', { headers });
+            const response = await fetch('/admin/logs' + (run ? '?run=' + run : ''), { headers });
             return await response.json();
         }
 
+        // Past runs from the header index of the make log; '' = live log
+        function selectedMakeRun() {
+            const select = document.getElementById('makeRuns');
+            return select ? select.value : '';
+        }
+
+        async function loadMakeRuns() {
+            const select = document.getElementById('makeRuns');
+            if (!select) return;
+            try {
+                const token = getAdminToken();
+                const headers = token ? { 'X-Admin-Token': token } : {};
+                const result = await (await fetch('/admin/runs', { headers })).json();
+                if (!result.success) return;
+                const current = select.value;
+                select.innerHTML = '<option value="">Log na zywo</option>';
+                for (const run of result.runs) {
+                    const option = document.createElement('option');
+                    option.value = run.offset;
+                    option.textContent = run.time + ' make ' + run.target + (run.job ? ' (job #' + run.job + ')' : '');
+                    select.appendChild(option);
+                }
+                select.value = current;
+            } catch (e) {
+                console.error('[webenv] Make runs error:', e);
+            }
+        }
+
+        async function showMakeRun() {
+            const logEl = document.getElementById('makeLog');
+            try {
+                const result = await fetchMakeLogs(selectedMakeRun());
+                if (logEl && result && result.success) {
+                    logEl.value = result.log || '';
+                    logEl.scrollTop = selectedMakeRun() ? 0 : logEl.scrollHeight;
+                } else if (result) {
+                    showStatus('Blad: ' + (result.error || 'unknown'), 'error');
+                }
+            } catch (e) {
+                showStatus('Blad: ' + e.message, 'error');
+            }
+        }
+
+        function showMakeState(st) {
+            const badge = document.getElementById('makeStatus');
+            if (!badge || !st) return;
+            let label = st.running ? 'running' : 'idle';
+            if (st.target) label += ' (' + st.target + ')';
+            if (st.queued) label += ' +' + st.queued + ' w kolejce';
+            badge.textContent = label;
+        }
+
+        // Push updates from /admin/stream (SSE); polling only if the stream is unavailable
+        let makeStream = null;
+        let makePoll = null;
+
+        function startMakeStream() {
+            if (makeStream) makeStream.close();
+            if (!window.EventSource) return false;
+            const token = getAdminToken();
+            makeStream = new EventSource('/admin/stream' + (token ? '?token=' + encodeURIComponent(token) : ''));
+            const logEl = document.getElementById('makeLog');
+            makeStream.addEventListener('reset', () => { if (logEl && !selectedMakeRun()) logEl.value = ''; });
+            makeStream.addEventListener('log', (e) => {
+                if (!logEl || selectedMakeRun()) return;
+                const atBottom = logEl.scrollTop + logEl.clientHeight >= logEl.scrollHeight - 5;
+                logEl.value = (logEl.value + JSON.parse(e.data)).slice(-200000);
+                if (atBottom) logEl.scrollTop = logEl.scrollHeight;
+            });
+            makeStream.addEventListener('state', (e) => showMakeState(JSON.parse(e.data)));
+            makeStream.onopen = () => { if (makePoll) { clearInterval(makePoll); makePoll = null; } };
+            makeStream.onerror = () => {
+                // CLOSED = refused (e.g. 403); otherwise the browser reconnects with Last-Event-ID
+                if (makeStream.readyState === EventSource.CLOSED && !makePoll) {
+                    refreshMakePanel();
+                    makePoll = setInterval(refreshMakePanel, 3000);
+                }
+            };
+            return true;
+        }
+
         async function refreshMakePanel() {
             try {
                 const statusResult = await fetchMakeStatus();
-                const badge = document.getElementById('makeStatus');
-                if (badge && statusResult && statusResult.success) {
-                    const st = statusResult.state;
-                    let label = st.running ? 'running' : 'idle';
-                    if (st.target) label += ' (' + st.target + ')';
-                    badge.textContent = label;
+                if (statusResult && statusResult.success) {
+                    showMakeState(statusResult.state);
                 }
 
+                if (selectedMakeRun()) return;
                 const logsResult = await fetchMakeLogs();
                 const logEl = document.getElementById('makeLog');
                 if (logEl && logsResult && logsResult.success) {
@@ -509,7 +842,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 });
                 const result = await response.json();
                 if (result.success) {
-                    showStatus('Uruchomiono: make ' + target, 'success');
+                    showStatus('Dodano do kolejki: make ' + target + ' (job #' + result.job.id + ')', 'success');
                 } else {
                     showStatus('Blad: ' + (result.error || 'unknown'), 'error');
                 }
@@ -517,7 +850,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 showStatus('Blad: ' + e.message, 'error');
             }
 
-            refreshMakePanel();
+            if (makePoll) refreshMakePanel();
         }
         
         function showStatus(message, type) {
@@ -548,43 +881,296 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             }
         }
         
+        // Discovery runs in the background on the server - requests join the running scan,
+        // cached results are shown at once and devices stream in as they are found
+        let discoverStream = null;
+        let discoverPoll = null;
+        let discoverText = '';
+
+        function scanAge(seconds) {
+            if (seconds < 60) return seconds + ' s';
+            if (seconds < 3600) return Math.round(seconds / 60) + ' min';
+            return Math.round(seconds / 3600) + ' h';
+        }
+
+        function showDiscoverProgress(text) {
+            discoverText = text;
+            let el = document.getElementById('discoverProgress');
+            if (!el) {
+                el = document.createElement('p');
+                el.id = 'discoverProgress';
+                el.style.color = '#667eea';
+                document.getElementById('devicesList').prepend(el);
+            }
+            el.textContent = text;
+        }
+
+        function stopDiscovery() {
+            if (discoverStream) { discoverStream.close(); discoverStream = null; }
+            if (discoverPoll) { clearInterval(discoverPoll); discoverPoll = null; }
+        }
+
+        function finishDiscovery(devices) {
+            stopDiscovery();
+            displayDevices(devices);
+            updateSuggestionsFromDevices(devices);
+            showStatus('Skanowanie zakonczone!', 'success');
+        }
+
+        function failDiscovery(error) {
+            stopDiscovery();
+            document.getElementById('devicesList').innerHTML =
+                '<p style="color: #ef4444;">Blad: ' + error + '</p>';
+        }
+
+        function handleDiscoveryTask(result) {
+            if (result.task.state === 'running') return false;
+            if (result.task.state === 'done') finishDiscovery(result.devices);
+            else failDiscovery(result.task.error);
+            return true;
+        }
+
+        async function pollDiscovery(taskId) {
+            try {
+                const result = await (await fetch('/discover?task=' + taskId)).json();
+                if (!result.success) failDiscovery(result.error);
+                else handleDiscoveryTask(result);
+            } catch (e) {
+                console.error('[webenv] Discovery poll error:', e);
+            }
+        }
+
+        function watchDiscovery(taskId) {
+            stopDiscovery();
+            if (!window.EventSource) {
+                discoverPoll = setInterval(() => pollDiscovery(taskId), 2000);
+                return;
+            }
+            const groups = { zebra: 'zebra_printers', mssql: 'mssql_servers', http: 'http_services' };
+            const live = { devices: { zebra_printers: [], mssql_servers: [], http_services: [] } };
+            let found = 0;
+            discoverStream = new EventSource('/discover/stream?task=' + taskId);
+            discoverStream.addEventListener('device', (e) => {
+                const device = JSON.parse(e.data).device;
+                if (!groups[device.type]) return;
+                live.devices[groups[device.type]].push(device);
+                found++;
+                displayDevices(live);
+                showDiscoverProgress(discoverText);
+            });
+            discoverStream.addEventListener('progress', (e) => {
+                const p = JSON.parse(e.data);
+                showDiscoverProgress('Skanowanie sieci: ' + p.stage + ' ' + p.percent + '% (znaleziono: ' + found + ')');
+            });
+            discoverStream.addEventListener('done', (e) => finishDiscovery(JSON.parse(e.data).devices));
+            discoverStream.addEventListener('scan_failed', (e) => failDiscovery(JSON.parse(e.data).error));
+            discoverStream.onerror = () => {
+                // CLOSED = task gone (e.g. server restarted); otherwise the browser resumes by Last-Event-ID
+                if (discoverStream && discoverStream.readyState === EventSource.CLOSED) {
+                    stopDiscovery();
+                    pollDiscovery(taskId);
+                }
+            };
+        }
+
         async function discoverDevices() {
             console.log('[webenv] Starting discovery...');
-            document.getElementById('devicesList').innerHTML = 
-                '<p style="color: #667eea;">Skanowanie sieci... (moze potrwac do 60 sekund)</p>';
             try {
                 const response = await fetch('/discover');
                 const result = await response.json();
                 console.log('[webenv] Discovery response:', result);
-                if (result.success) {
-                    displayDevices(result.devices);
-                    updateSuggestionsFromDevices(result.devices);
-                    showStatus('Skanowanie zakonczone!', 'success');
+                if (!result.success) {
+                    failDiscovery(result.error);
+                    return;
+                }
+                if (result.cached) {
+                    displayDevices(result.cached.devices);
+                    showDiscoverProgress('Skanowanie sieci... (ponizej wyniki sprzed ' + scanAge(result.cached.age) + ')');
                 } else {
-                    document.getElementById('devicesList').innerHTML = 
-                        '<p style="color: #ef4444;">' + result.error + '</p>';
+                    document.getElementById('devicesList').innerHTML = '';
+                    showDiscoverProgress('Skanowanie sieci... (moze potrwac do 60 sekund)');
                 }
+                if (!handleDiscoveryTask(result)) watchDiscovery(result.task.id);
             } catch (e) {
                 console.error('[webenv] Discovery error:', e);
-                document.getElementById('devicesList').innerHTML = 
-                    '<p style="color: #ef4444;">Blad: ' + e.message + '</p>';
+                failDiscovery(e.message);
             }
         }
         
+        // Saves send key-level changes against the revision the editor was loaded from;
+        // a 409 means someone else changed the same keys - shown in the merge view
+        const envEditorEl = document.getElementById('envEditor');
+        let envBase = { revision: envEditorEl.dataset.revision, content: envEditorEl.value };
+        let envMerge = null;
+
+        function setEnvBase(content, revision) {
+            envBase = { revision: revision, content: content };
+            document.getElementById('envEditor').value = content;
+            hideMergeView();
+        }
+
+        function envDiff(oldText, newText) {
+            const oldConfig = parseEnvContent(oldText);
+            const newConfig = parseEnvContent(newText);
+            const changes = {};
+            const keys = oldConfig._keyOrder.concat(newConfig._keyOrder.filter(k => !(k in oldConfig)));
+            keys.forEach(key => {
+                const oldValue = key in oldConfig ? oldConfig[key] : null;
+                const newValue = key in newConfig ? newConfig[key] : null;
+                if (oldValue !== newValue) changes[key] = [oldValue, newValue];
+            });
+            return changes;
+        }
+
+        function envComments(text) {
+            // Everything but KEY=VALUE lines - a patch cannot carry edits of these
+            return text.split('\\n').filter(line => {
+                const trimmed = line.trim();
+                return !trimmed || trimmed.startsWith('#') || trimmed.indexOf('=') <= 0;
+            }).join('\\n');
+        }
+
+        async function postSave(body) {
+            const response = await fetch('/save', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+                body: body
+            });
+            return await response.json();
+        }
+
+        function handleSaveResult(result) {
+            if (result.success) {
+                envBase = { revision: result.revision, content: result.content !== null ? result.content : document.getElementById('envEditor').value };
+                if (result.content !== null && result.content !== document.getElementById('envEditor').value) {
+                    document.getElementById('envEditor').value = result.content;
+                }
+                hideMergeView();
+                if (result.warnings && result.warnings.length) {
+                    showStatus('Zapisano (ostrzezenia: ' + result.warnings.join('; ') + ')', 'success');
+                } else {
+                    showStatus('Zapisano pomyslnie!', 'success');
+                }
+            } else if (result.conflict) {
+                showMergeView(result);
+                showStatus('Konflikt: plik zmienil sie na serwerze - wybierz wartosci ponizej', 'error');
+            } else {
+                showStatus('Blad: ' + result.error, 'error');
+            }
+        }
+
         async function saveEnv() {
             const content = document.getElementById('envEditor').value;
+            let body = 'base=' + encodeURIComponent(envBase.revision || '');
+            if (envComments(content) === envComments(envBase.content)) {
+                const changes = envDiff(envBase.content, content);
+                if (!Object.keys(changes).length) {
+                    showStatus('Brak zmian do zapisania', 'success');
+                    return;
+                }
+                body += '&patch=' + encodeURIComponent(JSON.stringify(changes));
+            } else {
+                body += '&content=' + encodeURIComponent(content);
+            }
             try {
-                const response = await fetch('/save', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-                    body: 'content=' + encodeURIComponent(content)
+                handleSaveResult(await postSave(body));
+            } catch (e) {
+                showStatus('Blad polaczenia: ' + e.message, 'error');
+            }
+        }
+
+        function mergeCell(value) {
+            const el = document.createElement('td');
+            el.textContent = value === null ? '(brak)' : value;
+            el.style.padding = '4px 8px';
+            return el;
+        }
+
+        function showMergeView(result) {
+            envMerge = { revision: result.revision, content: result.content, mine: document.getElementById('envEditor').value };
+            const view = document.getElementById('mergeView');
+            view.innerHTML = '';
+            const title = document.createElement('p');
+            title.textContent = result.conflicts.length
+                ? 'Te klucze zmienil ktos inny - wybierz wartosc:'
+                : 'Plik zmienil sie na serwerze, bez konfliktow kluczy - zapisz ponownie, aby nalozyc swoje zmiany.';
+            view.appendChild(title);
+            if (result.conflicts.length) {
+                const table = document.createElement('table');
+                const head = document.createElement('tr');
+                ['Klucz', 'Bazowa', 'Na serwerze', 'Twoja'].forEach(label => {
+                    const th = document.createElement('th');
+                    th.textContent = label;
+                    th.style.textAlign = 'left';
+                    th.style.padding = '4px 8px';
+                    head.appendChild(th);
                 });
-                const result = await response.json();
-                if (result.success) {
-                    showStatus('Zapisano pomyslnie!', 'success');
-                } else {
-                    showStatus('Blad: ' + result.error, 'error');
-                }
+                table.appendChild(head);
+                result.conflicts.forEach((c, i) => {
+                    const row = document.createElement('tr');
+                    row.appendChild(mergeCell(c.key));
+                    row.appendChild(mergeCell(c.base));
+                    ['theirs', 'mine'].forEach(side => {
+                        const cell = mergeCell(c[side]);
+                        const radio = document.createElement('input');
+                        radio.type = 'radio';
+                        radio.name = 'merge' + i;
+                        radio.value = side;
+                        radio.dataset.key = c.key;
+                        radio.checked = side === 'mine';
+                        cell.prepend(radio);
+                        row.appendChild(cell);
+                    });
+                    table.appendChild(row);
+                });
+                view.appendChild(table);
+            }
+            const actions = document.createElement('div');
+            actions.className = 'actions';
+            const apply = document.createElement('button');
+            apply.className = 'btn btn-primary';
+            apply.textContent = 'Zapisz scalone';
+            apply.onclick = saveMerged;
+            const discard = document.createElement('button');
+            discard.className = 'btn btn-secondary';
+            discard.textContent = 'Odrzuc moje zmiany';
+            discard.onclick = () => setEnvBase(envMerge.content, envMerge.revision);
+            actions.appendChild(apply);
+            actions.appendChild(discard);
+            view.appendChild(actions);
+            view.style.display = 'block';
+        }
+
+        function hideMergeView() {
+            envMerge = null;
+            const view = document.getElementById('mergeView');
+            view.style.display = 'none';
+            view.innerHTML = '';
+        }
+
+        async function saveMerged() {
+            if (!envMerge) return;
+            // My changes, re-based on the server version; keys resolved to theirs are dropped
+            const keepTheirs = new Set();
+            document.querySelectorAll('#mergeView input[type=radio]:checked').forEach(radio => {
+                if (radio.value === 'theirs') keepTheirs.add(radio.dataset.key);
+            });
+            const theirs = parseEnvContent(envMerge.content);
+            const changes = {};
+            Object.entries(envDiff(envBase.content, envMerge.mine)).forEach(([key, change]) => {
+                if (keepTheirs.has(key)) return;
+                const current = key in theirs ? theirs[key] : null;
+                if (current !== change[1]) changes[key] = [current, change[1]];
+            });
+            const merge = envMerge;
+            if (!Object.keys(changes).length) {
+                setEnvBase(merge.content, merge.revision);
+                showStatus('Zostawiono wersje z serwera', 'success');
+                return;
+            }
+            try {
+                handleSaveResult(await postSave('base=' + encodeURIComponent(merge.revision) +
+                                                '&patch=' + encodeURIComponent(JSON.stringify(changes))));
             } catch (e) {
                 showStatus('Blad polaczenia: ' + e.message, 'error');
             }
@@ -595,7 +1181,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 const response = await fetch('/load');
                 const result = await response.json();
                 if (result.success) {
-                    document.getElementById('envEditor').value = result.content;
+                    setEnvBase(result.content, result.revision);
                     showStatus('Odswiezono!', 'success');
                 } else {
                     showStatus('Blad: ' + result.error, 'error');
@@ -611,7 +1197,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 const response = await fetch('/reset', { method: 'POST' });
                 const result = await response.json();
                 if (result.success) {
-                    document.getElementById('envEditor').value = result.content;
+                    setEnvBase(result.content, result.revision);
                     showStatus('Zresetowano do .env.example!', 'success');
                 } else {
                     showStatus('Blad: ' + result.error, 'error');
@@ -989,22 +1575,228 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
         loadDevices();
         const tokenInput = document.getElementById('adminToken');
         if (tokenInput) tokenInput.value = getAdminToken();
-        refreshMakePanel();
-        setInterval(refreshMakePanel, 3000);
+        if (!startMakeStream()) {
+            refreshMakePanel();
+            makePoll = setInterval(refreshMakePanel, 3000);
+        }
     </script>
 </body>
 </html>
 '''
 
+# =============================================================================
+# PAGE - template compiled once, file contents cached by mtime
+# =============================================================================
+
+SLOT_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+class PageTemplate:
+    """Template split into static byte segments and {{slot}} names"""
+
+    def __init__(self, template=''):
+        self.segments = []
+        pos = 0
+        for match in SLOT_RE.finditer(template):
+            self.segments.append(template[pos:match.start()].encode())
+            self.segments.append(match.group(1))
+            pos = match.end()
+        self.segments.append(template[pos:].encode())
+
+    def bind(self, **values):
+        """Copy with these slots filled in and merged into the static segments"""
+        bound = PageTemplate()
+        for segment in self.segments:
+            if isinstance(segment, str) and segment in values:
+                segment = html.escape(str(values[segment]), quote=False).encode()
+            if isinstance(segment, bytes) and bound.segments and isinstance(bound.segments[-1], bytes):
+                bound.segments[-1] += segment
+            else:
+                bound.segments.append(segment)
+        return bound
+
+    def render(self, values):
+        """Page bytes - values maps the remaining slots to already escaped bytes"""
+        return b''.join(s if isinstance(s, bytes) else values[s] for s in self.segments)
+
+
+class CachedFile:
+    """HTML-escaped content of a file, re-read only when mtime/size/inode change"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = None
+        self.data = b''
+        self.revision = b''
+        self.lock = threading.Lock()
+
+    def bytes(self):
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        with self.lock:
+            if stamp != self.stamp:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                except FileNotFoundError:
+                    text = ''
+                except Exception as e:
+                    text = f'# Error reading file: {e}'
+                self.data = html.escape(text, quote=False).encode()
+                self.revision = revision(text).encode()
+                self.stamp = stamp
+            return self.data
+
+
+PAGE_TEMPLATE = PageTemplate(HTML_TEMPLATE)
+PAGE_FILES = {'env_content': CachedFile(ENV_FILE), 'example_content': CachedFile(ENV_EXAMPLE)}
+_PAGES = {}                     # server port -> template with port and path bound
+
+
+def render_page(port):
+    page = _PAGES.get(port)
+    if page is None:
+        page = _PAGES[port] = PAGE_TEMPLATE.bind(port=port, env_path=ENV_FILE)
+    values = {slot: cached.bytes() for slot, cached in PAGE_FILES.items()}
+    values['env_revision'] = PAGE_FILES['env_content'].revision
+    return page.render(values)
+
+
+# =============================================================================
+# HTTP - compression, ETag
+# =============================================================================
+
+_COMPRESSED = OrderedDict()     # (etag, encoding) -> compressed body
+_COMPRESSED_MAX = 32
+_COMPRESSED_LOCK = threading.Lock()
+
+
+def _accepted_encoding(accept_encoding):
+    """br or gzip if the client accepts it (q=0 excluded), else None"""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding, etag):
+    key = (etag, encoding)
+    with _COMPRESSED_LOCK:
+        if key in _COMPRESSED:
+            _COMPRESSED.move_to_end(key)
+            return _COMPRESSED[key]
+    if encoding == 'br':
+        data = brotli.compress(body, quality=5)
+    else:
+        data = gzip.compress(body, compresslevel=6, mtime=0)
+    with _COMPRESSED_LOCK:
+        _COMPRESSED[key] = data
+        while len(_COMPRESSED) > _COMPRESSED_MAX:
+            _COMPRESSED.popitem(last=False)
+    return data
+
+
+def encode_response(method, request_headers, status, content_type, body, headers=None):
+    """(status, headers, body) ready to send: ETag/304 for GET, compression if accepted"""
+    headers = list(headers or [])
+    headers.append(('Content-Type', content_type))
+    compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+    etag = None
+    if status == 200 and method in ('GET', 'HEAD'):
+        # Weak ETag - the same for the plain and the compressed representation
+        etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        headers += [('ETag', etag), ('Cache-Control', 'no-cache')]
+        if compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+        candidates = [t.strip() for t in request_headers.get('If-None-Match', '').split(',')]
+        if etag in candidates or etag[2:] in candidates or '*' in candidates:
+            return 304, headers, b''
+
+    if compressible and len(body) >= COMPRESS_MIN_SIZE:
+        encoding = _accepted_encoding(request_headers.get('Accept-Encoding'))
+        if encoding:
+            body = _compress(body, encoding, etag or hashlib.blake2b(body, digest_size=12).hexdigest())
+            headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    return status, headers, body
+
+
+# =============================================================================
+# HANDLER
+# =============================================================================
+
 class EnvEditorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    disable_nagle_algorithm = True      # headers and body are separate writes
+
     def log_message(self, format, *args):
         print(f"[{self.log_date_time_string()}] {args[0]}")
     
-    def send_json(self, data, status=200):
+    def respond(self, status, content_type, body, headers=None):
+        """Single exit point of every route"""
+        status, headers, body = encode_response(self.command, self.headers, status,
+                                                content_type, body, headers)
         self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
+        for key, value in headers:
+            self.send_header(key, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def stream_wake(self):
+        """Callback for new stream events - threads just block on the queue"""
+        return None
+
+    def send_events(self, source, subscriber, backlog):
+        """SSE response; blocks until the stream ends or the client goes away or falls behind"""
+        self.close_connection = True
+        self.send_response(200)
+        for key, value in SSE_HEADERS:
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(b''.join(format_event(event) for event in backlog))
+            while True:
+                try:
+                    event = subscriber.queue.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    if subscriber.dropped:
+                        break
+                    self.wfile.write(b': ping\n\n')
+                    continue
+                if event is None:
+                    break
+                self.wfile.write(format_event(event))
+        except OSError:
+            pass
+        finally:
+            source.unsubscribe(subscriber)
+
+    def send_json(self, data, status=200):
+        self.respond(status, 'application/json', json.dumps(data).encode())
+
+    def send_not_found(self):
+        self.respond(404, 'text/plain; charset=utf-8', b'Not Found')
+
+    def check_issues(self, issues):
+        """Reply 400 with the schema errors, if there are any"""
+        errors = [str(i) for i in issues if i.level == 'error']
+        if not errors:
+            return True
+        self.send_json({'success': False, 'error': 'Invalid configuration: ' + '; '.join(errors),
+                        'issues': errors}, 400)
+        return False
 
     def is_admin_authorized(self, token=''):
         client_ip = self.client_address[0]
@@ -1017,10 +1809,7 @@ class EnvEditorHandler(BaseHTTPRequestHandler):
         return client_ip in ('127.0.0.1', '::1')
     
     def send_html(self, html):
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html.encode())
+        self.respond(200, 'text/html; charset=utf-8', html.encode())
     
     def read_file(self, path):
         try:
@@ -1038,29 +1827,22 @@ class EnvEditorHandler(BaseHTTPRequestHandler):
         token = query.get('token', [''])[0]
 
         if path == '/':
-            env_content = self.read_file(ENV_FILE)
-            example_content = self.read_file(ENV_EXAMPLE)
-            
-            html = HTML_TEMPLATE.replace(
-                '{{env_content}}', env_content
-            ).replace(
-                '{{example_content}}', example_content
-            ).replace(
-                '{{port}}', str(self.server.server_port)
-            ).replace(
-                '{{env_path}}', ENV_FILE
-            )
-            self.send_html(html)
+            self.respond(200, 'text/html; charset=utf-8', render_page(self.server.server_port))
 
         elif path == '/load':
-            content = self.read_file(ENV_FILE)
-            self.send_json({'success': True, 'content': content})
+            content, rev = get_store(ENV_FILE).snapshot()
+            self.send_json({'success': True, 'content': content, 'revision': rev})
+
+        elif path == '/history':
+            limit = query.get('limit', [''])[0]
+            history = get_store(ENV_FILE).history
+            self.send_json({'success': True,
+                            'revisions': history.log(int(limit)) if limit.isdigit() else history.log()})
 
         elif path == '/devices':
             # Load discovered devices from JSON
-            devices_file = os.path.join(PROJECT_DIR, 'logs', 'discovered_devices.json')
             try:
-                with open(devices_file, 'r') as f:
+                with open(DEVICES_FILE, 'r') as f:
                     devices = json.load(f)
                 self.send_json({'success': True, 'devices': devices})
             except FileNotFoundError:
@@ -1069,39 +1851,118 @@ class EnvEditorHandler(BaseHTTPRequestHandler):
                 self.send_json({'success': False, 'error': str(e)})
 
         elif path == '/discover':
-            # Run discovery script
-            import subprocess
-            try:
-                result = subprocess.run(
-                    ['python3', os.path.join(SCRIPT_DIR, 'discover.py'), '-q'],
-                    capture_output=True, text=True, timeout=60
-                )
-                devices_file = os.path.join(PROJECT_DIR, 'logs', 'discovered_devices.json')
-                with open(devices_file, 'r') as f:
-                    devices = json.load(f)
-                self.send_json({'success': True, 'devices': devices, 'output': result.stdout})
-            except Exception as e:
-                self.send_json({'success': False, 'error': str(e)})
+            # Background quick scan - ?task=ID only reports on a scan, without starting one
+            task_id = query.get('task', [''])[0]
+            if task_id:
+                task = DISCOVERY.get(int(task_id)) if task_id.isdigit() else None
+                if task is None:
+                    self.send_json({'success': False, 'error': 'Unknown discovery task'}, 404)
+                    return
+                joined = True
+            else:
+                task, joined = DISCOVERY.start()
+            reply = {'success': True, 'task': task.to_dict(), 'joined': joined, 'cached': DISCOVERY.cached()}
+            if task.state != 'running':
+                reply['devices'] = task.result
+            self.send_json(reply)
+
+        elif path == '/discover/stream':
+            task_id = query.get('task', [''])[0]
+            task = DISCOVERY.get(int(task_id)) if task_id.isdigit() else None
+            if task is None:
+                self.send_json({'success': False, 'error': 'Unknown discovery task'}, 404)
+                return
+            last_id = self.headers.get('Last-Event-ID', '').strip()
+            subscriber, backlog = task.subscribe(int(last_id) if last_id.isdigit() else None,
+                                                 wake=self.stream_wake())
+            self.send_events(task, subscriber, backlog)
 
         elif path == '/admin/status':
             if not self.is_admin_authorized(token=token):
                 self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
                 return
 
-            with MAKE_STATE_LOCK:
-                state = dict(MAKE_STATE)
-            self.send_json({'success': True, 'state': state})
+            self.send_json({'success': True, 'state': MAKE_JOBS.state()})
 
         elif path == '/admin/logs':
             if not self.is_admin_authorized(token=token):
                 self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
                 return
 
-            self.send_json({'success': True, 'log': _read_make_log_tail()})
+            run = query.get('run', [''])[0]
+            if not run:
+                self.send_json({'success': True, 'log': _read_make_log_tail()})
+                return
+            # A past run - its job's own log, or one seek to its indexed header (job-less runs)
+            log = MAKE_LOG.run_log(int(run)) if run.isdigit() else None
+            if log is None:
+                self.send_json({'success': False, 'error': 'Unknown run'}, 404)
+                return
+            self.send_json({'success': True, 'log': log})
+
+        elif path == '/admin/runs':
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            limit = query.get('limit', [''])[0]
+            runs = MAKE_LOG.run_list(int(limit)) if limit.isdigit() else MAKE_LOG.run_list()
+            self.send_json({'success': True, 'runs': runs})
+
+        elif path == '/admin/jobs':
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            limit = query.get('limit', [''])[0]
+            jobs = MAKE_JOBS.jobs(int(limit)) if limit.isdigit() else MAKE_JOBS.jobs()
+            self.send_json({'success': True, 'jobs': jobs})
+
+        elif JOB_LOG_RE.match(path):
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            max_bytes = query.get('bytes', [''])[0]
+            log = MAKE_JOBS.read_log(int(JOB_LOG_RE.match(path).group(1)),
+                                     int(max_bytes) if max_bytes.isdigit() else 20000)
+            if log is None:
+                self.send_json({'success': False, 'error': 'Unknown job'}, 404)
+                return
+            self.send_json({'success': True, 'log': log})
+
+        elif path == '/admin/stream':
+            # EventSource cannot send headers - token comes in the query string
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            last_id = self.headers.get('Last-Event-ID', '').strip()
+            last_id = int(last_id) if last_id.isdigit() else None
+            subscriber, backlog = MAKE_LOG_STREAM.subscribe(last_id, wake=self.stream_wake())
+            backlog.append(('state', None, MAKE_JOBS.state()))
+            self.send_events(MAKE_LOG_STREAM, subscriber, backlog)
+
+        elif path == '/admin/config':
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            config = get_store(ENV_FILE).load()
+            keys = query.get('key')
+            if keys:
+                config = {key: config[key] for key in keys if key in config}
+            self.send_json({'success': True, 'config': config})
+
+        elif path == '/admin/health':
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            self.send_json({'success': True, 'checks': _run_health_checks()})
 
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.send_not_found()
     
     def do_POST(self):
         parsed = urlparse(self.path)
@@ -1112,25 +1973,97 @@ class EnvEditorHandler(BaseHTTPRequestHandler):
         params = parse_qs(post_data)
 
         if path == '/save':
+            # patch={"KEY": [old, new]} + base=REV (key-level), or content=... + base=REV (whole file)
+            store = get_store(ENV_FILE)
+            base = params.get('base', [''])[0] or None
+            if not base:
+                self.send_json({'success': False, 'error': 'base revision required (GET /load)'}, 400)
+                return
             try:
-                content = params.get('content', [''])[0]
-                with open(ENV_FILE, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                self.send_json({'success': True})
-                print(f"[+] Saved .env file")
+                if 'patch' in params:
+                    changes = json.loads(params['patch'][0])
+                    if not isinstance(changes, dict) or any(
+                            not isinstance(change, list) or len(change) != 2 or
+                            any(value is not None and not isinstance(value, str) for value in change)
+                            for change in changes.values()):
+                        self.send_json({'success': False,
+                                        'error': 'patch needs {"KEY": [old, new]} with string or null values'}, 400)
+                        return
+                    config = dict(store.load(), **{k: new for k, (old, new) in changes.items() if new is not None})
+                    for key, (old, new) in changes.items():
+                        if new is None:
+                            config.pop(key, None)
+                    # Only the patched keys can block the save, as in /admin/config
+                    schema = get_schema()
+                    issues = schema.validate(config, [k for k, (old, new) in changes.items() if new is not None])
+                    issues += [Issue(k, "required key is missing") for k, (old, new) in changes.items()
+                               if new is None and k in REQUIRED_KEYS]
+                    if not self.check_issues(issues):
+                        return
+                    issues += [replace(i, level='warning') for i in schema.validate(config) if i.key not in changes]
+                    rev = store.patch(base, changes, source='webenv')
+                else:
+                    content = params.get('content', [''])[0]
+                    issues = get_schema().validate(parse_env(content))
+                    if not self.check_issues(issues):
+                        return
+                    rev = store.write_text(content, base, source='webenv')
+            except EnvConflict as e:
+                # Merge view: per key the base, the value on disk and the edited one
+                content, current = store.snapshot()
+                self.send_json({'success': False, 'error': f'Conflict: {e}', 'conflict': True,
+                                'revision': current, 'content': content, 'conflicts': e.conflicts}, 409)
+                return
+            except ValueError as e:
+                self.send_json({'success': False, 'error': f'Invalid patch: {e}'}, 400)
+                return
             except Exception as e:
                 self.send_json({'success': False, 'error': str(e)}, 500)
+                return
+            content, current = store.snapshot()
+            self.send_json({'success': True, 'warnings': [str(i) for i in issues], 'revision': rev,
+                            'content': content if current == rev else None})
+            print(f"[+] Saved .env file ({rev})")
 
         elif path == '/reset':
             try:
                 content = self.read_file(ENV_EXAMPLE)
-                with open(ENV_FILE, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                self.send_json({'success': True, 'content': content})
+                rev = get_store(ENV_FILE).write_text(content, source='webenv reset')
+                self.send_json({'success': True, 'content': content, 'revision': rev})
                 print(f"[+] Reset .env to .env.example")
             except Exception as e:
                 self.send_json({'success': False, 'error': str(e)}, 500)
 
+        elif path == '/admin/config':
+            token = params.get('token', [''])[0]
+            if not self.is_admin_authorized(token=token):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 403)
+                return
+
+            # set=KEY=VALUE (repeatable) - one locked, atomic update
+            values = {}
+            for item in params.get('set', []):
+                key, sep, value = item.partition('=')
+                if not sep or not key.strip():
+                    self.send_json({'success': False, 'error': f'Invalid set: {item}'}, 400)
+                    return
+                values[key.strip()] = value.strip()
+            store = get_store(ENV_FILE)
+            issues = get_schema().validate(dict(store.load(), **values), list(values))
+            if not self.check_issues(issues):
+                return
+            try:
+                changed = store.update(values, source='admin/config')
+            except ValueError as e:
+                self.send_json({'success': False, 'error': str(e)}, 400)
+                return
+            except Exception as e:
+                self.send_json({'success': False, 'error': str(e)}, 500)
+                return
+            self.send_json({'success': True, 'changed': changed, 'keys': sorted(values)})
+            if changed:
+                print(f"[+] Updated .env: {', '.join(sorted(values))}")
+
         elif path == '/admin/run':
             token = params.get('token', [''])[0]
             if not self.is_admin_authorized(token=token):
@@ -1141,29 +2074,190 @@ class EnvEditorHandler(BaseHTTPRequestHandler):
             if target not in ALLOWED_MAKE_TARGETS:
                 self.send_json({'success': False, 'error': 'Target not allowed'}, 400)
                 return
-            with MAKE_STATE_LOCK:
-                if MAKE_STATE['running']:
-                    self.send_json({'success': False, 'error': 'Make already running'}, 409)
-                    return
+            try:
+                job = MAKE_JOBS.submit(target)
+            except QueueFull as e:
+                self.send_json({'success': False, 'error': f'Queue full: {e}'}, 429)
+                return
+            self.send_json({'success': True, 'target': target, 'job': job.to_dict()})
+
+        else:
+            self.send_not_found()
+
+    def do_HEAD(self):
+        if urlparse(self.path).path in GET_ONLY_ROUTES:
+            self.respond(405, 'text/plain; charset=utf-8', b'Method Not Allowed', [('Allow', 'GET')])
+            return
+        self.do_GET()
+
 
-                MAKE_STATE['running'] = True
-                MAKE_STATE['target'] = target
-                MAKE_STATE['exit_code'] = None
-                MAKE_STATE['started_at'] = datetime.now().isoformat(timespec='seconds')
-                MAKE_STATE['ended_at'] = None
-                MAKE_STATE['pid'] = None
+# =============================================================================
+# ASYNC SERVER
+# =============================================================================
 
-            thread = threading.Thread(target=_run_make_target_in_background, args=(target,), daemon=True)
-            thread.start()
-            self.send_json({'success': True, 'target': target})
+class AsyncRequest(EnvEditorHandler):
+    """Routes of EnvEditorHandler for one request of the asyncio server - no socket I/O"""
 
+    def __init__(self, method, target, version, headers, body, client_address, server):
+        self.command = method
+        self.path = target
+        self.request_version = version
+        self.requestline = f"{method} {target} {version}"
+        self.headers = headers
+        self.rfile = io.BytesIO(body)
+        self.client_address = client_address
+        self.server = server
+        self.response = None
+        self.stream = None
+        self.wake_event = None
+
+    def respond(self, status, content_type, body, headers=None):
+        self.response = encode_response(self.command, self.headers, status, content_type, body, headers)
+
+    def stream_wake(self):
+        # Streams run on the event loop; events are published from make and scan threads
+        loop = asyncio.get_running_loop()
+        self.wake_event = asyncio.Event()
+        return lambda: loop.call_soon_threadsafe(self.wake_event.set)
+
+    def send_events(self, source, subscriber, backlog):
+        self.stream = (source, subscriber, backlog)
+
+    def run(self):
+        if self.command == 'GET':
+            self.do_GET()
+        elif self.command == 'HEAD':
+            self.do_HEAD()
+        elif self.command == 'POST':
+            self.do_POST()
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.respond(501, 'text/plain; charset=utf-8', b'Not Implemented')
+        return self.response
+
+
+class AsyncEnvServer:
+    """HTTP/1.1 keep-alive server on asyncio; slow routes go to a thread pool"""
+
+    def __init__(self, host, port, workers=REQUEST_WORKERS):
+        self.host = host
+        self.server_port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webenv')
+
+    async def _read_request(self, reader):
+        """(method, target, version, headers, body) or None when the client is gone"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            return None
+        request_line, _, header_block = head.partition(b'\r\n')
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise ValueError('malformed request line')
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        length = int(headers.get('Content-Length') or 0)
+        if length < 0 or length > MAX_BODY_SIZE:
+            raise ValueError('request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return parts[0].upper(), parts[1], parts[2], headers, body
+
+    def _keep_alive(self, version, headers):
+        connection = (headers.get('Connection') or '').lower()
+        if version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    async def handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info('peername')[:2]
+        loop = asyncio.get_running_loop()
+        try:
+            for _ in range(MAX_REQUESTS_PER_CONNECTION):
+                try:
+                    request = await self._read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                handler = AsyncRequest(method, target, version, headers, body, client_address, self)
+                route = urlparse(target).path
+                failed = False
+                try:
+                    if method in ('GET', 'HEAD') and (route in INLINE_ROUTES or JOB_LOG_RE.match(route)):
+                        handler.run()
+                    else:
+                        await loop.run_in_executor(self.executor, handler.run)
+                except Exception:
+                    # A route without its own error handling - answer 500, not a dropped socket
+                    handler.log_error('Exception in "%s"\n%s', handler.requestline, traceback.format_exc())
+                    handler.stream = None
+                    handler.respond(500, 'text/plain; charset=utf-8', b'Internal Server Error')
+                    failed = True
+                if handler.stream is not None:
+                    handler.log_message('"%s" %s %s', handler.requestline, '200', '-')
+                    await self._send_events(writer, handler)
+                    break
+                status, response_headers, payload = handler.response
+
+                keep_alive = not failed and self._keep_alive(version, headers)
+                lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                         f"Date: {formatdate(usegmt=True)}",
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                lines += [f"{key}: {value}" for key, value in response_headers]
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(payload)
+                await writer.drain()
+                handler.log_message('"%s" %s %s', handler.requestline, str(status), str(len(payload)))
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _send_events(self, writer, handler):
+        """SSE response until the client goes away or falls behind"""
+        source, subscriber, backlog = handler.stream
+        lines = ["HTTP/1.1 200 OK", f"Date: {formatdate(usegmt=True)}", "Connection: close"]
+        lines += [f"{key}: {value}" for key, value in SSE_HEADERS]
+        try:
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            writer.write(b''.join(format_event(event) for event in backlog))
+            await writer.drain()
+            while not subscriber.dropped:
+                try:
+                    await asyncio.wait_for(handler.wake_event.wait(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(b': ping\n\n')
+                    await writer.drain()
+                    continue
+                handler.wake_event.clear()
+                events = []
+                while True:
+                    try:
+                        events.append(subscriber.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                finished = None in events
+                writer.write(b''.join(format_event(event) for event in events if event is not None))
+                await writer.drain()
+                if finished:
+                    break
+        finally:
+            source.unsubscribe(subscriber)
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.server_port)
+        async with server:
+            await server.serve_forever()
 
 
 def main():
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    threaded = '--threaded' in sys.argv[1:]
+    port = int(args[0]) if args else DEFAULT_PORT
     
     print("============================================================")
     print("     WAPRO Network Mock - Web .env Editor")
@@ -1178,6 +2272,16 @@ def main():
     print(f"  Ctrl+C aby zakonczyc")
     print("============================================================")
     
+    if not threaded:
+        server = AsyncEnvServer('0.0.0.0', port)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("\n[i] Zamykanie serwera...")
+        finally:
+            server.executor.shutdown(wait=False)
+        return
+
     server = ThreadingHTTPServer(('0.0.0.0', port), EnvEditorHandler)
     
     try: